@@ -0,0 +1,173 @@
+# app/admission.py
+"""
+Control de admisión de los mensajes de texto que atiende message_handler,
+para que una ráfaga (un usuario insistente, un grupo con muchos miembros)
+no se convierta en trabajo sin límite:
+
+- un balde de fichas por usuario limita el ritmo de cada uno;
+- la cantidad de mensajes admitidos y sin terminar está acotada: la
+  sobrecarga se detecta por la cola, no por el ritmo total, así que muchos
+  usuarios que escriben a un ritmo normal no se rechazan mientras el bot
+  dé abasto;
+- opcionalmente, un balde global limita el ritmo total;
+- de los mensajes pendientes de un mismo usuario que llegan con menos de
+  VENTANA_COALESCENCIA segundos entre sí solo se atiende el último.
+
+Lo que no se admite recibe una respuesta amable (a lo sumo una cada
+AVISO_INTERVALO segundos por usuario) en lugar de quedar encolado. La
+decisión se toma al llegar el update, en PerUserUpdateProcessor, antes de
+que espere su turno detrás de los mensajes anteriores del mismo usuario.
+"""
+import itertools
+import time
+
+from app import metrics
+
+# --- Configuración ---
+RAFAGA_USUARIO = 5            # mensajes seguidos que se aceptan de un usuario
+RITMO_USUARIO = 1.0           # mensajes por segundo sostenidos por usuario
+RAFAGA_GLOBAL = None          # balde global opcional (mensajes seguidos en total); None = sin límite
+RITMO_GLOBAL = None           # mensajes por segundo en total, si hay balde global
+MAX_PENDIENTES = 256          # mensajes admitidos esperando turno o en curso
+VENTANA_COALESCENCIA = 2.0    # segundos
+AVISO_INTERVALO = 10.0        # segundos entre avisos de rechazo a un mismo usuario
+PURGA_INTERVALO = 60.0        # cada cuánto se olvidan los usuarios inactivos
+
+AVISO_LIMITE_USUARIO = "⏳ Vas muy rápido. Espera unos segundos y vuelve a intentarlo."
+AVISO_SOBRECARGA = "⏳ Estoy atendiendo muchas consultas en este momento. Intenta de nuevo en unos segundos."
+
+admision_resultados = metrics.counter(
+    "bot_admision_total", "Mensajes de texto por decisión de admisión.", ("resultado",))
+admision_pendientes = metrics.gauge(
+    "bot_admision_pendientes", "Mensajes admitidos esperando turno o en curso.")
+
+
+def is_plain_text(update):
+    """True para los updates que atiende message_handler: texto que no es un comando."""
+    texto = getattr(getattr(update, "message", None), "text", None)
+    return bool(texto) and not texto.startswith("/")
+
+
+class TokenBucket:
+    """Balde de `capacidad` fichas que se rellena a `ritmo` fichas por segundo."""
+
+    __slots__ = ("capacidad", "ritmo", "fichas", "actualizado")
+
+    def __init__(self, capacidad, ritmo, ahora):
+        self.capacidad = capacidad
+        self.ritmo = ritmo
+        self.fichas = float(capacidad)
+        self.actualizado = ahora
+
+    def _rellenar(self, ahora):
+        if ahora > self.actualizado:
+            self.fichas = min(self.capacidad, self.fichas + (ahora - self.actualizado) * self.ritmo)
+            self.actualizado = ahora
+
+    def take(self, ahora):
+        """Toma una ficha si hay; devuelve si pudo."""
+        self._rellenar(ahora)
+        if self.fichas >= 1:
+            self.fichas -= 1
+            return True
+        return False
+
+    def full(self, ahora):
+        self._rellenar(ahora)
+        return self.fichas >= self.capacidad
+
+
+class Ticket:
+    """Mensaje admitido: de quién es y cuándo llegó."""
+
+    __slots__ = ("user_id", "secuencia", "llegada")
+
+    def __init__(self, user_id, secuencia, llegada):
+        self.user_id = user_id
+        self.secuencia = secuencia
+        self.llegada = llegada
+
+
+class AdmissionControl:
+    """
+    Decide qué mensajes se atienden. `arrive()` se llama al llegar cada
+    mensaje; `superseded()`, justo antes de atenderlo; `done()`, al
+    terminar o descartarlo. Todo corre en el event loop, sin candados.
+    """
+
+    def __init__(self, rafaga_usuario=RAFAGA_USUARIO, ritmo_usuario=RITMO_USUARIO,
+                 rafaga_global=RAFAGA_GLOBAL, ritmo_global=RITMO_GLOBAL,
+                 max_pendientes=MAX_PENDIENTES, ventana=VENTANA_COALESCENCIA,
+                 aviso_intervalo=AVISO_INTERVALO, reloj=time.monotonic):
+        if rafaga_global and not ritmo_global:
+            raise ValueError("El balde global necesita un ritmo (ritmo_global).")
+        self.rafaga_usuario = rafaga_usuario
+        self.ritmo_usuario = ritmo_usuario
+        self.max_pendientes = max_pendientes
+        self.ventana = ventana
+        self.aviso_intervalo = aviso_intervalo
+        self.reloj = reloj
+        self.pendientes = 0
+        self._global = TokenBucket(rafaga_global, ritmo_global, reloj()) if rafaga_global else None
+        self._baldes = {}     # user_id -> TokenBucket
+        self._ultimos = {}    # user_id -> Ticket más reciente sin terminar
+        self._avisos = {}     # user_id -> momento del último aviso de rechazo
+        self._secuencia = itertools.count()
+        self._purga = reloj()
+
+    def arrive(self, user_id):
+        """
+        (ticket, None) si el mensaje se admite, o (None, aviso) si se
+        rechaza; `aviso` es el texto a responder o None si ya se le avisó
+        hace poco a ese usuario.
+        """
+        ahora = self.reloj()
+        if ahora - self._purga >= PURGA_INTERVALO:
+            self._purgar(ahora)
+
+        balde = self._baldes.get(user_id)
+        if balde is None:
+            balde = self._baldes[user_id] = TokenBucket(self.rafaga_usuario, self.ritmo_usuario, ahora)
+        if not balde.take(ahora):
+            return None, self._rechazar(user_id, ahora, "limite_usuario", AVISO_LIMITE_USUARIO)
+        if self.pendientes >= self.max_pendientes:
+            return None, self._rechazar(user_id, ahora, "cola_llena", AVISO_SOBRECARGA)
+        if self._global is not None and not self._global.take(ahora):
+            return None, self._rechazar(user_id, ahora, "limite_global", AVISO_SOBRECARGA)
+
+        ticket = Ticket(user_id, next(self._secuencia), ahora)
+        self._ultimos[user_id] = ticket
+        self.pendientes += 1
+        admision_pendientes.set(valor=self.pendientes)
+        admision_resultados.inc("admitido")
+        return ticket, None
+
+    def superseded(self, ticket):
+        """True si llegó otro mensaje del mismo usuario dentro de la ventana: se atiende ese en su lugar."""
+        ultimo = self._ultimos.get(ticket.user_id)
+        if ultimo is None or ultimo is ticket or ultimo.llegada - ticket.llegada > self.ventana:
+            return False
+        admision_resultados.inc("combinado")
+        return True
+
+    def done(self, ticket):
+        self.pendientes -= 1
+        admision_pendientes.set(valor=self.pendientes)
+        if self._ultimos.get(ticket.user_id) is ticket:
+            del self._ultimos[ticket.user_id]
+
+    def _rechazar(self, user_id, ahora, motivo, aviso):
+        admision_resultados.inc(motivo)
+        ultimo = self._avisos.get(user_id)
+        if ultimo is not None and ahora - ultimo < self.aviso_intervalo:
+            return None
+        self._avisos[user_id] = ahora
+        return aviso
+
+    def _purgar(self, ahora):
+        """Olvida a los usuarios con el balde lleno y sin mensajes pendientes."""
+        self._purga = ahora
+        for user_id in [u for u, balde in self._baldes.items() if balde.full(ahora) and u not in self._ultimos]:
+            del self._baldes[user_id]
+        for user_id in [u for u, momento in self._avisos.items() if ahora - momento >= self.aviso_intervalo]:
+            del self._avisos[user_id]
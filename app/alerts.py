@@ -0,0 +1,108 @@
+# app/alerts.py
+import time
+
+# --- Configuración de alertas ---
+ALERTAS_DEFECTO = {'pct': 1.0}  # sin configuración: avisar si el paralelo se mueve 1%
+ALERTA_COOLDOWN = 900           # segundos mínimos entre alertas al mismo chat
+HISTERESIS_IAC = 1.0            # puntos que el IAC debe bajar del umbral para rearmarse
+
+TIPOS_ALERTA = {
+    'bs': "Movimiento del paralelo en Bs/USD",
+    'pct': "Movimiento del paralelo en %",
+    'iac': "Nivel del IAC (%)",
+}
+
+
+def evaluar_chat(prefs, tasa_bcv, tasa_paralelo, ahora, cooldown=ALERTA_COOLDOWN, histeresis_iac=HISTERESIS_IAC):
+    """
+    Compara las tasas actuales con el estado guardado de un suscriptor.
+
+    Devuelve (motivos, cambios): la lista de motivos de alerta y el estado a
+    guardar. Si hay motivos pero el chat está en cooldown devuelve
+    (None, {}) para que se vuelva a evaluar más tarde.
+    """
+    alertas = prefs.get('alertas', ALERTAS_DEFECTO)
+    iac = ((tasa_paralelo / tasa_bcv) - 1) * 100
+    ref = prefs.get('ref_paralelo')
+    arriba = prefs.get('iac_arriba')
+
+    if ref is None or arriba is None:
+        # Primera lectura: fijar la referencia sin avisar
+        return [], {'ref_paralelo': tasa_paralelo, 'iac_arriba': 'iac' in alertas and iac >= alertas['iac']}
+
+    motivos = []
+    delta = tasa_paralelo - ref
+    if 'bs' in alertas and abs(delta) >= alertas['bs']:
+        motivos.append(f"El paralelo se movió {delta:+.2f} Bs/USD (de {ref:.2f} a {tasa_paralelo:.2f}).")
+    if 'pct' in alertas and abs(delta) / ref * 100 >= alertas['pct']:
+        motivos.append(f"El paralelo se movió {delta / ref * 100:+.2f}% (de {ref:.2f} a {tasa_paralelo:.2f}).")
+
+    if 'iac' in alertas:
+        umbral = alertas['iac']
+        if not arriba and iac >= umbral:
+            motivos.append(f"El IAC subió a {iac:.2f}% (umbral {umbral:.2f}%).")
+            arriba = True
+        elif arriba and iac <= umbral - histeresis_iac:
+            motivos.append(f"El IAC bajó a {iac:.2f}% (umbral {umbral:.2f}%).")
+            arriba = False
+
+    if not motivos:
+        return [], {}
+    if ahora - prefs.get('ultima_alerta', 0) < cooldown:
+        return None, {}
+    return motivos, {'ref_paralelo': tasa_paralelo, 'iac_arriba': arriba, 'ultima_alerta': ahora}
+
+
+class RateWatcher:
+    """
+    Compara cada consulta de tasas con la anterior y decide a qué
+    suscriptores hay que avisar. Si las tasas no cambiaron solo se vuelven
+    a evaluar los chats que quedaron pendientes por el cooldown.
+    """
+
+    def __init__(self, registry, cooldown=ALERTA_COOLDOWN, histeresis_iac=HISTERESIS_IAC):
+        self.registry = registry
+        self.cooldown = cooldown
+        self.histeresis_iac = histeresis_iac
+        self.ultimo = None
+        self._pendientes = set()
+
+    def check(self, tasa_bcv, tasa_paralelo, ahora=None):
+        """Devuelve [(chat_id, motivos), ...] para los chats que deben recibir alerta."""
+        ahora = ahora if ahora is not None else time.time()
+        actual = (tasa_bcv, tasa_paralelo)
+        if actual == self.ultimo:
+            if not self._pendientes:
+                return []
+            candidatos = [(chat_id, prefs) for chat_id, prefs in self.registry.items() if chat_id in self._pendientes]
+        else:
+            candidatos = self.registry.items()
+        self.ultimo = actual
+        self._pendientes = set()
+
+        avisos = []
+        cambios = {}
+        for chat_id, prefs in candidatos:
+            motivos, cambio = evaluar_chat(prefs, tasa_bcv, tasa_paralelo, ahora, self.cooldown, self.histeresis_iac)
+            if motivos is None:
+                self._pendientes.add(chat_id)
+                continue
+            if cambio:
+                cambios[chat_id] = cambio
+            if motivos:
+                avisos.append((chat_id, motivos))
+
+        self.registry.update_many(cambios)
+        return avisos
+
+
+def describe_alertas(prefs):
+    """Texto con la configuración de alertas de un suscriptor."""
+    alertas = prefs.get('alertas', ALERTAS_DEFECTO)
+    if not alertas:
+        return "No tienes alertas activas."
+    lineas = []
+    for tipo, umbral in alertas.items():
+        unidad = " Bs/USD" if tipo == 'bs' else "%"
+        lineas.append(f"- {TIPOS_ALERTA[tipo]}: {umbral:.2f}{unidad}")
+    return "\n".join(lineas)
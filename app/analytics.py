@@ -0,0 +1,194 @@
+# app/analytics.py
+"""
+Estadísticas móviles de las tasas y de la brecha entre el BCV y el
+paralelo, actualizadas en O(1) con cada consulta nueva: ventanas
+deslizantes con sumas acumuladas y colas monótonas para mínimo y máximo,
+y una EWMA por tiempo. Del historial solo se leen las consultas que las
+ventanas todavía no vieron.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+# --- Configuración ---
+VENTANAS = (("24h", 86400), ("7d", 7 * 86400))
+EWMA_VIDA_MEDIA = 3600    # segundos en que una observación pierde la mitad de su peso
+
+
+class RollingWindow:
+    """
+    Ventana deslizante de `duracion` segundos. Media y desviación salen de
+    sumas acumuladas (centradas en el primer valor para no perder
+    precisión); mínimo y máximo, de colas monótonas.
+    """
+
+    def __init__(self, duracion):
+        self.duracion = duracion
+        self._puntos = deque()    # (ts, x)
+        self._minimos = deque()   # (ts, x) con x creciente
+        self._maximos = deque()   # (ts, x) con x decreciente
+        self._ref = None
+        self._suma = 0.0
+        self._suma_cuadrados = 0.0
+
+    def add(self, ts, x):
+        self._expirar(ts)
+        if self._ref is None:
+            self._ref = x
+        self._puntos.append((ts, x))
+        d = x - self._ref
+        self._suma += d
+        self._suma_cuadrados += d * d
+        while self._minimos and self._minimos[-1][1] >= x:
+            self._minimos.pop()
+        self._minimos.append((ts, x))
+        while self._maximos and self._maximos[-1][1] <= x:
+            self._maximos.pop()
+        self._maximos.append((ts, x))
+
+    def _expirar(self, ahora):
+        limite = ahora - self.duracion
+        while self._puntos and self._puntos[0][0] <= limite:
+            _, x = self._puntos.popleft()
+            d = x - self._ref
+            self._suma -= d
+            self._suma_cuadrados -= d * d
+        while self._minimos and self._minimos[0][0] <= limite:
+            self._minimos.popleft()
+        while self._maximos and self._maximos[0][0] <= limite:
+            self._maximos.popleft()
+        if not self._puntos:
+            self._ref, self._suma, self._suma_cuadrados = None, 0.0, 0.0
+
+    def __len__(self):
+        return len(self._puntos)
+
+    @property
+    def first(self):
+        return self._puntos[0][1] if self._puntos else None
+
+    @property
+    def mean(self):
+        n = len(self._puntos)
+        return self._ref + self._suma / n if n else None
+
+    @property
+    def std(self):
+        n = len(self._puntos)
+        if n < 2:
+            return None
+        media = self._suma / n
+        return math.sqrt(max(0.0, (self._suma_cuadrados - n * media * media) / (n - 1)))
+
+    @property
+    def min(self):
+        return self._minimos[0][1] if self._minimos else None
+
+    @property
+    def max(self):
+        return self._maximos[0][1] if self._maximos else None
+
+
+class SeriesStats:
+    """Estadísticas de una serie: una ventana por duración, EWMA y volatilidad de los retornos."""
+
+    def __init__(self, ventanas=VENTANAS, vida_media=EWMA_VIDA_MEDIA, retornos=True):
+        self.ventanas = {nombre: RollingWindow(segundos) for nombre, segundos in ventanas}
+        # Retornos logarítmicos entre consultas seguidas, para la volatilidad
+        self.retornos = {nombre: RollingWindow(segundos) for nombre, segundos in ventanas} if retornos else None
+        self.tau = vida_media / math.log(2)
+        self.ewma = None
+        self.ultimo = None
+        self.ultimo_ts = None
+
+    def add(self, ts, x):
+        if self.ultimo_ts is not None and ts <= self.ultimo_ts:
+            return   # fuera de orden o repetida
+        if self.ewma is None:
+            self.ewma = x
+        else:
+            alfa = 1 - math.exp(-(ts - self.ultimo_ts) / self.tau)
+            self.ewma += alfa * (x - self.ewma)
+            if self.retornos is not None and self.ultimo > 0 and x > 0:
+                r = math.log(x / self.ultimo)
+                for ventana in self.retornos.values():
+                    ventana.add(ts, r)
+        for ventana in self.ventanas.values():
+            ventana.add(ts, x)
+        self.ultimo, self.ultimo_ts = x, ts
+
+    def summary(self):
+        resumen = {'ultimo': self.ultimo, 'ewma': self.ewma}
+        for nombre, ventana in self.ventanas.items():
+            primero = ventana.first
+            datos = {
+                'n': len(ventana),
+                'media': ventana.mean,
+                'min': ventana.min,
+                'max': ventana.max,
+                'desviacion': ventana.std,
+                'cambio': self.ultimo - primero if primero is not None else None,
+                'cambio_pct': (self.ultimo / primero - 1) * 100 if primero else None,
+            }
+            if self.retornos is not None:
+                volatilidad = self.retornos[nombre].std
+                datos['volatilidad'] = volatilidad * 100 if volatilidad is not None else None
+            resumen[nombre] = datos
+        return resumen
+
+
+class RateAnalytics:
+    """Estadísticas de la tasa oficial, la paralela y la brecha (IAC, %) entre ambas."""
+
+    def __init__(self, ventanas=VENTANAS, vida_media=EWMA_VIDA_MEDIA):
+        self._lock = threading.Lock()
+        self.series = {
+            'oficial': SeriesStats(ventanas, vida_media),
+            'paralelo': SeriesStats(ventanas, vida_media),
+            'brecha': SeriesStats(ventanas, vida_media, retornos=False),
+        }
+
+    def update(self, tasa_bcv, tasa_paralelo, ts=None):
+        """Agrega una consulta. O(1) amortizado."""
+        if not tasa_bcv or not tasa_paralelo:
+            return
+        ts = ts if ts is not None else time.time()
+        with self._lock:
+            self.series['oficial'].add(ts, tasa_bcv)
+            self.series['paralelo'].add(ts, tasa_paralelo)
+            self.series['brecha'].add(ts, (tasa_paralelo / tasa_bcv - 1) * 100)
+
+    def load(self, history, ahora=None):
+        """
+        Agrega desde el historial las consultas posteriores a la última que
+        vieron las ventanas. Al arrancar las llena; después trae lo que
+        guardaron otros procesos (solo el shard 0 consulta las tasas).
+        """
+        ahora = ahora if ahora is not None else time.time()
+        desde = ahora - max(segundos for _, segundos in VENTANAS)
+        with self._lock:
+            ultimo = self.series['paralelo'].ultimo_ts
+        if ultimo is not None:
+            desde = max(desde, math.floor(ultimo) + 1)
+        oficial = dict(history.range("oficial", desde, ahora))
+        for ts, paralelo in history.range("paralelo", desde, ahora):
+            if ts in oficial:
+                self.update(oficial[ts], paralelo, ts)
+
+    def summary(self):
+        with self._lock:
+            return {nombre: serie.summary() for nombre, serie in self.series.items()}
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_analytics():
+    """Devuelve las estadísticas compartidas del proceso."""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = RateAnalytics()
+        return _analytics
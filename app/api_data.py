@@ -1,24 +1,380 @@
 # app/api_data.py
-import requests
+import asyncio
+import os
+import threading
+import time
 
-def get_exchange_rates():
-    """Obtiene las tasas de cambio del BCV y Paralelo de la API y redondea la tasa de mercado."""
-    api_url = "https://ve.dolarapi.com/v1/dolares"
+import httpx
+
+from app import metrics
+from app.analytics import get_analytics
+from app.history import record_rates
+from app.providers import DolarApiFuentesProvider, DolarApiProvider, JsonProvider, ProviderError, RateAggregator
+from app.snapshot import describe_age, load_snapshot, save_snapshot
+
+API_URL = "https://ve.dolarapi.com/v1/dolares"
+
+# --- Configuración de la caché de tasas ---
+CACHE_TTL = 60          # segundos en que una consulta se considera fresca
+CACHE_STALE_TTL = 240   # segundos extra en que se sirve la consulta vieja mientras se refresca
+
+# --- Configuración de red ---
+CONNECT_TIMEOUT = 3.0   # segundos para establecer la conexión
+READ_TIMEOUT = 5.0      # segundos para recibir la respuesta
+RETRY_ATTEMPTS = 3      # intentos totales por consulta
+RETRY_BACKOFF = 0.5     # espera base entre intentos, se duplica en cada uno
+MAX_CONNECTIONS = 10
+MAX_KEEPALIVE = 5
+
+OFFLINE = False         # usar solo la última instantánea guardada, sin red (ver set_offline)
+_instantanea = None     # última instantánea leída del disco (ver load_last_known_good)
+
+
+# --- Proveedores de tasas ---
+# Los dos primeros salen de ve.dolarapi.com y caen juntos si ese servicio
+# cae. Una fuente independiente se suma con PROVEEDOR_EXTRA_URL y las rutas
+# de cada tasa en su JSON (ver JsonProvider).
+PROVEEDOR_EXTRA_URL = os.environ.get("PROVEEDOR_EXTRA_URL", "")
+PROVEEDOR_EXTRA_BCV = os.environ.get("PROVEEDOR_EXTRA_BCV", "")             # p. ej. "monitors.bcv.price"
+PROVEEDOR_EXTRA_PARALELO = os.environ.get("PROVEEDOR_EXTRA_PARALELO", "")   # p. ej. "monitors.enparalelovzla.price"
+
+providers = [
+    DolarApiProvider(url=API_URL, prioridad=0),
+    DolarApiFuentesProvider(url=API_URL, prioridad=1),
+]
+if PROVEEDOR_EXTRA_URL:
+    providers.append(JsonProvider("extra", PROVEEDOR_EXTRA_URL, PROVEEDOR_EXTRA_BCV, PROVEEDOR_EXTRA_PARALELO))
+aggregator = RateAggregator(providers)
+
+
+def configure_providers(nuevos, **opciones):
+    """Reemplaza los proveedores y la política (p. ej. por StaticProvider en pruebas)."""
+    global providers, aggregator
+    providers = list(nuevos)
+    aggregator = RateAggregator(providers, **opciones)
+    rate_cache.invalidate()
+
+
+def redondear_tasa_mercado(tasa_mercado_cruda):
+    """Redondea la tasa de mercado a la próxima decena."""
+    return (int(tasa_mercado_cruda // 10) * 10) + 10
+
+
+def set_offline(activo=True):
+    """Activa o desactiva el modo sin conexión; al activarlo lee la instantánea una sola vez."""
+    global OFFLINE
+    OFFLINE = activo
+    if activo:
+        load_last_known_good()
+
+
+def _persistir(tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada):
+    record_rates(tasa_bcv, tasa_mercado_cruda)
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()
-        data = response.json()
-        
-        tasa_bcv = next(item for item in data if item["fuente"] == "oficial")["promedio"]
-        tasa_mercado_cruda = next(item for item in data if item["fuente"] == "paralelo")["promedio"]
-        
-        # Redondear la tasa de mercado a la próxima decena
-        tasa_mercado_redondeada = (int(tasa_mercado_cruda // 10) * 10) + 10
-        
-        return tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada
-    except requests.exceptions.RequestException as e:
-        print(f"Error al obtener los datos de la API: {e}")
-        return None, None, None
-    except (KeyError, StopIteration):
-        print("Error: La estructura de la API ha cambiado o los datos no están disponibles.")
-        return None, None, None
\ No newline at end of file
+        save_snapshot(tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada)
+    except OSError as e:
+        print(f"Error al guardar la última tasa: {e}")
+
+
+def _new_http_client():
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE,
+        ),
+        headers={"Accept": "application/json"},
+    )
+
+
+async def _fetch_with_retries(client):
+    """Consulta el agregador con reintentos y espera exponencial entre rondas."""
+    error = None
+    inicio = time.perf_counter()
+    for intento in range(RETRY_ATTEMPTS):
+        try:
+            quote = await aggregator.fetch(client)
+        except ProviderError as e:
+            error = e
+        else:
+            metrics.fetch_latencia.observe("ok", valor=time.perf_counter() - inicio)
+            tasas = quote.tasa_bcv, quote.tasa_mercado, redondear_tasa_mercado(quote.tasa_mercado)
+            get_analytics().update(tasas[0], tasas[1])
+            # Historial e instantánea en un hilo aparte para no frenar el event loop
+            await asyncio.to_thread(_persistir, *tasas)
+            return tasas
+
+        if intento < RETRY_ATTEMPTS - 1:
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** intento)
+
+    metrics.fetch_latencia.observe("error", valor=time.perf_counter() - inicio)
+    print(f"Error al obtener los datos de la API: {error}")
+    return None, None, None
+
+
+def fetch_exchange_rates():
+    """Consulta los proveedores sin pasar por la caché y redondea la tasa de mercado."""
+    async def consultar():
+        async with _new_http_client() as client:
+            return await _fetch_with_retries(client)
+
+    return asyncio.run(consultar())
+
+
+# --- Cliente HTTP asíncrono para el bot ---
+_http_client = None
+
+
+def get_http_client():
+    """Devuelve el cliente asíncrono compartido, con conexiones persistentes."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _new_http_client()
+    return _http_client
+
+
+async def close_http_client():
+    """Cierra el cliente compartido (llamar al apagar el bot)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def fetch_exchange_rates_async():
+    """Versión asíncrona de `fetch_exchange_rates`, con el cliente persistente."""
+    return await _fetch_with_retries(get_http_client())
+
+
+class _Vuelo:
+    """Consulta en curso compartida por todos los que llegan mientras dura."""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = (None, None, None)
+
+
+class RateCache:
+    """
+    Caché de proceso para las tasas con TTL, stale-while-revalidate y
+    coalescencia de consultas: mientras hay una consulta en vuelo, el resto
+    de los llamadores espera su resultado en lugar de lanzar otra.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, stale_ttl=CACHE_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0      # consultas forzadas con refresh_async; no cuentan como fallos
+        self._lock = threading.Lock()
+        self._valor = None
+        self._obtenido_en = 0.0
+        self._ts = None         # momento (epoch) de la consulta guardada
+        self._semilla = False   # valor de una instantánea: se sirve aunque sea vieja
+        self._vuelo = None
+        self._tarea = None
+
+    def _edad(self):
+        return time.monotonic() - self._obtenido_en
+
+    def _servible(self, edad):
+        return self._valor is not None and (self._semilla or edad < self.ttl + self.stale_ttl)
+
+    def seed(self, valor, ts):
+        """
+        Carga una consulta guardada en `ts` (epoch). Se sirve de inmediato
+        aunque sea vieja, y la primera llamada dispara el refresco en
+        segundo plano; queda hasta que una consulta a la API salga bien.
+        """
+        with self._lock:
+            if self._valor is not None and not self._semilla:
+                return
+            self._valor = tuple(valor)
+            self._ts = ts
+            self._obtenido_en = time.monotonic() - max(0.0, time.time() - ts)
+            self._semilla = True
+
+    def age(self):
+        """Segundos desde que se consultaron las tasas guardadas, o None si no hay."""
+        with self._lock:
+            if self._valor is None:
+                return None
+            return max(0.0, time.time() - self._ts)
+
+    def get(self, fetcher):
+        """Devuelve las tasas en caché o las consulta con `fetcher` si hace falta."""
+        with self._lock:
+            edad = self._edad()
+            if self._servible(edad):
+                self.hits += 1
+                if edad >= self.ttl and self._vuelo is None:
+                    # Servir la tasa vieja y refrescar sin bloquear al llamador
+                    vuelo = self._vuelo = _Vuelo()
+                    threading.Thread(target=self._ejecutar, args=(fetcher, vuelo), daemon=True).start()
+                return self._valor
+
+            self.misses += 1
+            vuelo = self._vuelo
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelo = _Vuelo()
+
+        if lider:
+            self._ejecutar(fetcher, vuelo)
+        else:
+            vuelo.evento.wait()
+        return vuelo.resultado
+
+    async def get_async(self, fetcher):
+        """Igual que `get`, pero con un `fetcher` asíncrono y sin bloquear el event loop."""
+        with self._lock:
+            edad = self._edad()
+            if self._servible(edad):
+                self.hits += 1
+                if edad >= self.ttl and self._tarea is None:
+                    self._tarea = asyncio.ensure_future(self._ejecutar_async(fetcher))
+                return self._valor
+
+            self.misses += 1
+            if self._tarea is None:
+                self._tarea = asyncio.ensure_future(self._ejecutar_async(fetcher))
+            tarea = self._tarea
+
+        # shield: si un llamador se cancela, la consulta sigue para los demás
+        return await asyncio.shield(tarea)
+
+    async def refresh_async(self, fetcher):
+        """
+        Consulta con `fetcher` aunque la tasa guardada siga fresca y guarda
+        el resultado. Si ya hay una consulta en vuelo, espera esa.
+        """
+        with self._lock:
+            self.refreshes += 1
+            if self._tarea is None:
+                self._tarea = asyncio.ensure_future(self._ejecutar_async(fetcher))
+            tarea = self._tarea
+        return await asyncio.shield(tarea)
+
+    def _ejecutar(self, fetcher, vuelo):
+        try:
+            vuelo.resultado = fetcher()
+        finally:
+            with self._lock:
+                self._guardar(vuelo.resultado)
+                self._vuelo = None
+            vuelo.evento.set()
+
+    async def _ejecutar_async(self, fetcher):
+        resultado = (None, None, None)
+        try:
+            resultado = await fetcher()
+        finally:
+            with self._lock:
+                self._guardar(resultado)
+                self._tarea = None
+        return resultado
+
+    def _guardar(self, resultado):
+        # Las consultas fallidas no se guardan
+        if all(resultado):
+            self._valor = resultado
+            self._obtenido_en = time.monotonic()
+            self._ts = time.time()
+            self._semilla = False
+
+    def invalidate(self):
+        """Descarta la tasa guardada; la próxima llamada irá a la API."""
+        with self._lock:
+            self._valor = None
+            self._obtenido_en = 0.0
+            self._ts = None
+            self._semilla = False
+
+    def stats(self):
+        """Contadores de aciertos y fallos de la caché, y de consultas forzadas."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'refreshes': self.refreshes,
+        }
+
+
+rate_cache = RateCache()
+
+metrics.callback("tasas_cache_hits_total", "Consultas de tasas servidas desde la caché.",
+                 lambda: rate_cache.hits, tipo="counter")
+metrics.callback("tasas_cache_misses_total", "Consultas de tasas que tuvieron que ir a la API.",
+                 lambda: rate_cache.misses, tipo="counter")
+metrics.callback("tasas_cache_refrescos_total", "Consultas forzadas a la API (sondeo de alertas), fuera de la caché.",
+                 lambda: rate_cache.refreshes, tipo="counter")
+metrics.callback("tasas_cache_hit_ratio", "Proporción de aciertos de la caché de tasas.",
+                 lambda: rate_cache.stats()['hit_ratio'])
+
+
+def load_last_known_good():
+    """
+    Carga en la caché la última instantánea guardada para responder al
+    instante mientras se consulta la API. Devuelve la instantánea o None.
+    """
+    global _instantanea
+    guardada = load_snapshot()
+    if guardada is not None:
+        _instantanea = guardada
+        rate_cache.seed(guardada[:3], guardada.ts)
+    return guardada
+
+
+def rates_age():
+    """Segundos desde la consulta de las tasas que se están sirviendo, o None."""
+    return rate_cache.age()
+
+
+def describe_staleness(umbral=CACHE_TTL + CACHE_STALE_TTL):
+    """Aviso de antigüedad si las tasas tienen más de `umbral` segundos (siempre sin conexión), o cadena vacía."""
+    edad = rates_age()
+    if edad is None or (edad < umbral and not OFFLINE):
+        return ""
+    origen = "modo sin conexión" if OFFLINE else "actualizando"
+    return f"Tasas consultadas {describe_age(edad)} ({origen})"
+
+
+def _sin_conexion():
+    return _instantanea[:3] if _instantanea is not None else (None, None, None)
+
+
+def _ultima_conocida(tasas):
+    """`tasas` si la consulta salió bien; si no, las de la última instantánea guardada."""
+    if all(tasas):
+        return tasas
+    guardada = load_last_known_good()
+    return guardada[:3] if guardada is not None else tasas
+
+
+def get_exchange_rates():
+    """
+    Obtiene las tasas de cambio del BCV y Paralelo de la API y redondea la
+    tasa de mercado. Si la API no responde, devuelve la última instantánea.
+    """
+    if OFFLINE:
+        return _sin_conexion()
+    return _ultima_conocida(rate_cache.get(fetch_exchange_rates))
+
+
+async def get_exchange_rates_async():
+    """Versión para el bot: no bloquea el event loop mientras consulta la API."""
+    if OFFLINE:
+        return _sin_conexion()
+    tasas = await rate_cache.get_async(fetch_exchange_rates_async)
+    if all(tasas):
+        return tasas
+    return await asyncio.to_thread(_ultima_conocida, tasas)
+
+
+async def refresh_exchange_rates_async():
+    """Tasas recién consultadas a la API (no las de la caché), que quedan guardadas en la caché."""
+    if OFFLINE:
+        return _sin_conexion()
+    return await rate_cache.refresh_async(fetch_exchange_rates_async)
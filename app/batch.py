@@ -0,0 +1,172 @@
+# app/batch.py
+import argparse
+import csv
+import itertools
+import json
+import math
+import sys
+import time
+
+import numpy as np
+
+from app.api_data import describe_staleness, get_exchange_rates, redondear_tasa_mercado, set_offline
+from app.render import COLUMNAS_LOTE, batch_columns, batch_jsonl
+from app.scenarios import conversion_grid, opportunity_grid, purchase_grid, rate_ladder
+
+CHUNK = 10_000   # ítems por bloque; la memoria no depende del tamaño del archivo
+
+
+def _numero(valor):
+    if valor is None or valor == "":
+        return math.nan
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _invalido(invalidos, numero, motivo):
+    print(f"Línea {numero}: {motivo}; se omite.", file=sys.stderr)
+    invalidos.append(numero)
+
+
+def _leer(archivo, formato, invalidos):
+    """Ítems de la entrada; los que no se pueden leer se omiten y su línea se agrega a `invalidos`."""
+    if formato == "csv":
+        yield from csv.DictReader(archivo)
+    else:
+        for numero, linea in enumerate(archivo, 1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError as e:
+                _invalido(invalidos, numero, f"JSON inválido ({e})")
+                continue
+            if not isinstance(fila, dict):
+                _invalido(invalidos, numero, "no es un objeto JSON")
+                continue
+            yield fila
+
+
+def _bloques(filas, tamano):
+    filas = iter(filas)
+    while True:
+        bloque = list(itertools.islice(filas, tamano))
+        if not bloque:
+            return
+        yield bloque
+
+
+def process_chunk(filas, tasas, tasa_bcv, tasa_max):
+    """
+    Calcula un bloque de ítems contra las `tasas` dadas. Devuelve las
+    columnas de salida (app/render.py, COLUMNAS_LOTE), con una fila por
+    ítem y tasa.
+    """
+    ids = [fila.get("sku", fila.get("id", "")) for fila in filas]
+    precios = np.array([_numero(fila.get("precio_usd")) for fila in filas])
+    costos = np.array([_numero(fila.get("costo")) for fila in filas])
+    divisas = np.array([_numero(fila.get("divisas")) for fila in filas])
+
+    conversion = conversion_grid(precios[None, :], tasa_bcv, tasas[:, None])
+    compra = purchase_grid(tasas, costos, divisas, tasa_bcv)
+    oportunidad = opportunity_grid(tasas, divisas, tasa_max, tasa_bcv)
+    return batch_columns(ids, tasas, conversion, compra, oportunidad)
+
+
+def run_batch(entrada, salida, tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada,
+              formato_entrada="csv", formato_salida="csv", escalera=False, chunk=CHUNK, invalidos=None):
+    """
+    Procesa `entrada` por bloques y escribe en `salida`. Devuelve la
+    cantidad de ítems procesados. Las líneas que no son un ítem válido se
+    omiten sin cortar el lote y sus números se agregan a `invalidos`.
+    """
+    if invalidos is None:
+        invalidos = []
+    if escalera:
+        tasas = rate_ladder(tasa_mercado_redondeada)
+    else:
+        tasas = np.array([tasa_mercado_cruda], dtype=np.float64)
+
+    escritor = None
+    if formato_salida == "csv":
+        escritor = csv.writer(salida)
+        escritor.writerow(COLUMNAS_LOTE)
+
+    total = 0
+    for bloque in _bloques(_leer(entrada, formato_entrada, invalidos), chunk):
+        columnas = process_chunk(bloque, tasas, tasa_bcv, tasa_mercado_redondeada)
+        if escritor is not None:
+            escritor.writerows(zip(*columnas))
+        else:
+            salida.write(batch_jsonl(columnas))
+        total += len(bloque)
+    return total
+
+
+def _formato(ruta, formato):
+    if formato:
+        return formato
+    return "jsonl" if ruta and ruta.endswith((".jsonl", ".json")) else "csv"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.main batch",
+        description="Conversión masiva de precios y análisis de compra desde CSV/JSONL. "
+                    "Cada ítem puede traer precio_usd, costo y/o divisas (y un sku o id opcional).",
+    )
+    parser.add_argument("entrada", nargs="?", default="-", help="archivo de entrada, o - para stdin")
+    parser.add_argument("-o", "--salida", default="-", help="archivo de salida, o - para stdout")
+    parser.add_argument("--formato", choices=("csv", "jsonl"), help="formato de entrada (por defecto según extensión)")
+    parser.add_argument("--formato-salida", choices=("csv", "jsonl"), help="formato de salida (por defecto según extensión)")
+    parser.add_argument("--escalera", action="store_true",
+                        help="evaluar cada ítem en la escalera de tasas en lugar de solo la tasa de mercado")
+    parser.add_argument("--tasas", nargs=2, type=float, metavar=("BCV", "MERCADO"),
+                        help="usar estas tasas en lugar de consultar la API")
+    parser.add_argument("--offline", action="store_true",
+                        help="usar la última tasa guardada en lugar de consultar la API")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="ítems por bloque")
+    args = parser.parse_args(argv)
+
+    if args.tasas:
+        tasa_bcv, tasa_mercado_cruda = args.tasas
+        tasa_mercado_redondeada = redondear_tasa_mercado(tasa_mercado_cruda)
+    else:
+        if args.offline:
+            set_offline()
+        tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada = get_exchange_rates()
+        if not all([tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada]):
+            print("No se pudo obtener la información de las tasas de cambio.", file=sys.stderr)
+            return 1
+        antiguedad = describe_staleness()
+        if antiguedad:
+            print(antiguedad, file=sys.stderr)
+
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada, newline="", encoding="utf-8")
+    salida = sys.stdout if args.salida == "-" else open(args.salida, "w", newline="", encoding="utf-8")
+    invalidos = []
+    inicio = time.perf_counter()
+    try:
+        total = run_batch(
+            entrada, salida, tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada,
+            formato_entrada=_formato(args.entrada, args.formato),
+            formato_salida=_formato(args.salida, args.formato_salida),
+            escalera=args.escalera,
+            chunk=args.chunk,
+            invalidos=invalidos,
+        )
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+
+    print(f"{total} ítems procesados en {time.perf_counter() - inicio:.2f} s "
+          f"(BCV {tasa_bcv:.4f}, mercado {tasa_mercado_cruda:.4f}).", file=sys.stderr)
+    if invalidos:
+        print(f"{len(invalidos)} líneas inválidas omitidas.", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,143 @@
+# app/broadcast.py
+import asyncio
+import datetime
+import logging
+import time
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter, TelegramError
+
+from app import metrics
+
+# --- Límites de envío de Telegram ---
+GLOBAL_RATE = 25          # mensajes por segundo en total (Telegram admite ~30)
+PER_CHAT_INTERVAL = 1.0   # segundos mínimos entre mensajes al mismo chat
+CONCURRENCIA = 50         # envíos simultáneos en vuelo
+MAX_REINTENTOS = 3
+
+
+class RateLimiter:
+    """Token bucket asíncrono que además se puede pausar ante un 429 de Telegram."""
+
+    def __init__(self, rate=GLOBAL_RATE, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = float(self.capacity)
+        self._actualizado = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                if ahora < self._pausa_hasta:
+                    await asyncio.sleep(self._pausa_hasta - ahora)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (ahora - self._actualizado) * self.rate)
+                self._actualizado = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, segundos):
+        """Detiene todos los envíos durante `segundos` (flood control de Telegram)."""
+        self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+        self._tokens = 0.0
+
+
+def _segundos(retry_after):
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class Broadcaster:
+    """
+    Envía un mismo mensaje a muchos chats en paralelo respetando el límite
+    global y el límite por chat. Los errores se manejan por destinatario.
+
+    Los chats que bloquearon el bot y los grupos que migraron a un
+    supergrupo se juntan durante el envío y se informan una sola vez al
+    terminar: `on_blocked([chat_id, ...])` y `on_migrated({viejo: nuevo})`.
+    """
+
+    def __init__(self, bot, limiter=None, concurrencia=CONCURRENCIA, on_blocked=None, on_migrated=None):
+        self.bot = bot
+        self.limiter = limiter or RateLimiter()
+        self.on_blocked = on_blocked
+        self.on_migrated = on_migrated
+        self._semaforo = asyncio.Semaphore(concurrencia)
+        self._ultimo_envio = {}
+        self._bloqueados = []
+        self._migrados = {}
+
+    async def _esperar_chat(self, chat_id):
+        espera = self._ultimo_envio.get(chat_id, 0.0) + PER_CHAT_INTERVAL - time.monotonic()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        self._ultimo_envio[chat_id] = time.monotonic()
+
+    async def send(self, chat_id, text, **kwargs):
+        """
+        Envía a un chat. Devuelve 'ok', 'bloqueado' o 'error'. Los cambios
+        de chats se aplican en `send_many`, o a mano con `await flush_changes()`.
+        """
+        async with self._semaforo:
+            for intento in range(MAX_REINTENTOS):
+                await self._esperar_chat(chat_id)
+                await self.limiter.acquire()
+                try:
+                    await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                    return 'ok'
+                except RetryAfter as e:
+                    metrics.envio_errores.inc("RetryAfter")
+                    self.limiter.pause(_segundos(e.retry_after))
+                except Forbidden:
+                    metrics.envio_errores.inc("Forbidden")
+                    # El usuario bloqueó el bot o lo sacaron del grupo
+                    self._bloqueados.append(chat_id)
+                    return 'bloqueado'
+                except ChatMigrated as e:
+                    metrics.envio_errores.inc("ChatMigrated")
+                    # El grupo pasó a ser un supergrupo: se reintenta con el id nuevo
+                    self._migrados[chat_id] = e.new_chat_id
+                    chat_id = e.new_chat_id
+                except BadRequest as e:
+                    metrics.envio_errores.inc("BadRequest")
+                    logging.warning("No se pudo enviar a %s: %s", chat_id, e)
+                    return 'error'
+                except NetworkError as e:
+                    metrics.envio_errores.inc(type(e).__name__)
+                    logging.warning("Error de red enviando a %s (intento %s): %s", chat_id, intento + 1, e)
+                    await asyncio.sleep(2 ** intento)
+                except TelegramError as e:
+                    metrics.envio_errores.inc(type(e).__name__)
+                    logging.warning("No se pudo enviar a %s: %s", chat_id, e)
+                    return 'error'
+            return 'error'
+
+    async def flush_changes(self):
+        """
+        Informa de una vez los chats bloqueados y migrados desde la última
+        llamada. Los callbacks escriben en disco: corren fuera del event loop.
+        """
+        bloqueados, self._bloqueados = self._bloqueados, []
+        migrados, self._migrados = self._migrados, {}
+        if bloqueados and self.on_blocked is not None:
+            await asyncio.to_thread(self.on_blocked, bloqueados)
+        if migrados and self.on_migrated is not None:
+            await asyncio.to_thread(self.on_migrated, migrados)
+
+    async def broadcast(self, chat_ids, text, **kwargs):
+        """Envía `text` a todos los `chat_ids` y devuelve el conteo por resultado."""
+        return await self.send_many([(chat_id, text) for chat_id in chat_ids], **kwargs)
+
+    async def send_many(self, mensajes, **kwargs):
+        """Envía cada (chat_id, text) de `mensajes` y devuelve el conteo por resultado."""
+        resultados = await asyncio.gather(*(self.send(chat_id, text, **kwargs) for chat_id, text in mensajes))
+        await self.flush_changes()
+        conteo = {'ok': 0, 'bloqueado': 0, 'error': 0}
+        for resultado in resultados:
+            conteo[resultado] += 1
+        return conteo
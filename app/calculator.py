@@ -13,39 +13,44 @@
 #         print(f"Tasa de Mercado (redondeada): {self.tasa_mercado_redondeada:.4f} Bs/USD")
 # app/calculator.py
 
-from app.api_data import get_exchange_rates
+from app.api_data import describe_staleness, get_exchange_rates, load_last_known_good, set_offline
+from app.rate_tables import rate_tables
+from app.render import rates_report, terminal_opportunity, terminal_purchase
+
+class RatesUnavailableError(Exception):
+    """No hay tasas: la API no respondió y no hay una instantánea guardada."""
 
 class DivisaCalculator:
-    def __init__(self):
-        self.tasa_bcv, self.tasa_mercado_cruda, self.tasa_mercado_redondeada = get_exchange_rates()
-        if not all([self.tasa_bcv, self.tasa_mercado_cruda, self.tasa_mercado_redondeada]):
-            print("No se pudo obtener la información de las tasas de cambio. Saliendo.")
-            exit()
+    def __init__(self, offline=False):
+        # Con una instantánea guardada arranca al instante y la API se consulta en segundo plano
+        if offline:
+            set_offline()
+        load_last_known_good()
+        self.tablas = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Toma las tasas más recientes de la caché (sin esperar a la API si ya
+        hay alguna). Si no hay tasas nuevas sigue con las que ya tenía.
+        """
+        tasas = get_exchange_rates()
+        if not all(tasas):
+            if self.tablas is None:
+                raise RatesUnavailableError("No se pudo obtener la información de las tasas de cambio.")
+            antiguedad = describe_staleness(umbral=0)
+            print("⏳ No se pudieron actualizar las tasas; se usan las anteriores"
+                  + (f" ({antiguedad})." if antiguedad else "."))
+            return
+        self.tasa_bcv, self.tasa_mercado_cruda, self.tasa_mercado_redondeada = tasas
+        self.tablas = rate_tables(*tasas)
         
     def get_exchange_rates_report(self):
         """Genera un reporte completo de las tasas de cambio."""
-        
-        # Diferencia cambiaria en cifras
-        diferencia_cifras = self.tasa_mercado_cruda - self.tasa_bcv
-        
-        # Diferencia cambiaria en porcentaje
-        diferencia_porcentaje = (diferencia_cifras / self.tasa_bcv) * 100
-        
-        # IAC (Índice de Ahorro para el Comprador)
-        iac = ((self.tasa_mercado_cruda / self.tasa_bcv) - 1) * 100
-        
-        # FPC (Factor de Poder de Compra)
-        fpc = self.tasa_mercado_cruda / self.tasa_bcv
-
-        reporte = (
-            f"📊 *Reporte de Tasas de Cambio*\n\n"
-            f"Tasa Oficial (BCV): {self.tasa_bcv:.4f} Bs/USD\n"
-            f"Tasa Mercado (Cruda): {self.tasa_mercado_cruda:.4f} Bs/USD\n"
-            f"Tasa Mercado (Redondeada): {self.tasa_mercado_redondeada:.4f} Bs/USD\n\n"
-            f"Diferencia Cambiaria: {diferencia_cifras:.4f} Bs/USD ({diferencia_porcentaje:.2f}%)\n"
-            f"IAC (%): {iac:.2f}%\n"
-            f"FPC: {fpc:.4f}\n"
-        )
+        reporte = rates_report(self.tablas)
+        antiguedad = describe_staleness()
+        if antiguedad:
+            reporte += f"\n⏳ {antiguedad}\n"
         return reporte
 
     def display_current_rates(self):
@@ -60,36 +65,7 @@ class DivisaCalculator:
             print("Por favor, ingresa un número válido.")
             return
 
-        tasas_a_evaluar = [self.tasa_mercado_redondeada - (i * 10) for i in range(6)]
-        
-        print("\n" + "=" * 115)
-        print(f"Análisis de Compra | Producto: ${costo_producto:.2f} | Divisas: ${dolares_disponibles:.2f}")
-        print("=" * 115)
-        print("{:<12} | {:<8} | {:<8} | {:<18} | {:<18} | {:<25}".format(
-            "Tasa", "IAC (%)", "FPC", "Poder de Compra", "Monto Exacto", "Resultado"
-        ))
-        print("-" * 115)
-
-        for tasa in tasas_a_evaluar:
-            poder_compra = dolares_disponibles * (tasa / self.tasa_bcv)
-            suficiente = poder_compra >= costo_producto
-            diferencia = poder_compra - costo_producto
-
-            IAC = ((tasa / self.tasa_bcv) - 1) * 100
-            FPC = tasa / self.tasa_bcv
-            monto_exacto = costo_producto * (self.tasa_bcv / tasa)
-
-            estado = "Sí (Sobra: ${:.4f})".format(diferencia) if suficiente else "No (Falta: ${:.4f})".format(abs(diferencia))
-
-            print("{:<12.4f} | {:<8.4f} | {:<8.4f} | {:<18.4f} | {:<18.4f} | {:<25}".format(
-                tasa,
-                IAC,
-                FPC,
-                poder_compra,
-                monto_exacto,
-                estado
-            ))
-        print("=" * 115)
+        print(terminal_purchase(self.tablas.purchase(costo_producto, dolares_disponibles)))
 
     def run_costo_de_oportunidad(self):
         try:
@@ -98,33 +74,4 @@ class DivisaCalculator:
             print("Por favor, ingresa un número válido.")
             return
 
-        tasas_a_evaluar = [self.tasa_mercado_redondeada - (i * 10) for i in range(1, 6)]
-        
-        print("\n" + "=" * 135)
-        print(f"Costo de Oportunidad por Negociación | Divisas: ${dolares_a_evaluar:.2f}")
-        print("=" * 135)
-        print("{:<12} | {:<12} | {:<15} | {:<15} | {:<12} | {:<18} | {:<25}".format(
-            "Tasa", "Pérdida (Bs)", "Pérdida ($BCV)", "Pérdida ($Merc.)", "IAC (%)", "Factor de Pérdida", "Costo de Oportunidad"
-        ))
-        print("-" * 135)
-
-        valor_max_bolivares = dolares_a_evaluar * self.tasa_mercado_redondeada
-
-        for tasa_actual in tasas_a_evaluar:
-            valor_actual_bolivares = dolares_a_evaluar * tasa_actual
-            perdida_bolivares = valor_max_bolivares - valor_actual_bolivares
-            perdida_usd_bcv = perdida_bolivares / self.tasa_bcv
-            perdida_usd_mercado = perdida_bolivares / self.tasa_mercado_redondeada
-            factor_perdida = 1 - (tasa_actual / self.tasa_mercado_redondeada)
-            IAC = ((self.tasa_mercado_redondeada / tasa_actual) - 1) * 100
-
-            print("{:<12.4f} | {:<12.2f} | {:<15.4f} | {:<15.4f} | {:<12.4f} | {:<18.4f} | {:<25}".format(
-                tasa_actual,
-                perdida_bolivares,
-                perdida_usd_bcv,
-                perdida_usd_mercado,
-                IAC,
-                factor_perdida,
-                "Pérdida por no vender a la mejor tasa"
-            ))
-        print("=" * 135)
\ No newline at end of file
+        print(terminal_opportunity(self.tablas.opportunity(dolares_a_evaluar)))
@@ -0,0 +1,220 @@
+# app/charts.py
+"""
+Gráficos del historial para /chart: el paralelo y el BCV arriba y la
+brecha (%) abajo, en PNG.
+
+Cada imagen se guarda en disco con el rango y la versión de los datos en
+el nombre. La versión es el momento de la última instantánea de tasas
+(app/snapshot.py), que se escribe junto con cada fila nueva del historial,
+así que cada gráfico se dibuja una sola vez por cambio de datos y todos
+los shards comparten la caché. El dibujo corre en un pool de procesos que
+lee el historial por su cuenta: el event loop solo espera el resultado.
+
+matplotlib es opcional: sin él, CHARTS_AVAILABLE es False y el bot
+responde que los gráficos no están disponibles.
+"""
+import asyncio
+import concurrent.futures
+import datetime
+import glob
+import importlib.util
+import math
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+
+from app import history, metrics
+from app.snapshot import load_snapshot
+from app.storage import DATA_DIR, atomic_write
+
+# --- Configuración ---
+CHARTS_DIR = os.path.join(DATA_DIR, "graficos")
+RANGOS = {"24h": 86400, "7d": 7 * 86400, "30d": 30 * 86400}
+RANGO_DEFECTO = "24h"
+CHART_WORKERS = 2        # procesos que dibujan
+MAX_PUNTOS = 1500        # puntos por serie; más que eso se promedia por tramos
+ZONA_HORARIA = "America/Caracas"
+
+CHARTS_AVAILABLE = importlib.util.find_spec("matplotlib") is not None
+
+graficos_resultados = metrics.counter(
+    "bot_graficos_total", "Pedidos de gráficos por origen de la imagen.", ("origen",))
+
+
+def _reducir(ts, valores, maximo=MAX_PUNTOS):
+    """Promedia tramos consecutivos para dejar a lo sumo `maximo` puntos."""
+    if len(ts) <= maximo:
+        return ts, valores
+    paso = math.ceil(len(ts) / maximo)
+    inicios = np.arange(0, len(ts), paso)
+    cantidades = np.diff(np.append(inicios, len(ts)))
+    return ts[inicios], np.add.reduceat(valores, inicios) / cantidades
+
+
+def _version(ruta, rango):
+    """Versión de los datos en el nombre `<rango>-<version>.png`, o None si no tiene esa forma."""
+    nombre = os.path.basename(ruta)
+    try:
+        return int(nombre[len(rango) + 1:-len(".png")])
+    except ValueError:
+        return None
+
+
+def _podar(destino, rango):
+    """
+    Borra las versiones de `rango` más viejas que la inmediatamente anterior
+    a `destino`. Esa anterior queda para los envíos que la eligieron antes
+    del cambio de datos, y las más nuevas no se tocan: un dibujo lento de
+    una versión vieja no borra el de otra más reciente.
+    """
+    version = _version(destino, rango)
+    anteriores = []
+    for ruta in glob.glob(os.path.join(os.path.dirname(destino), f"{rango}-*.png")):
+        otra = _version(ruta, rango)
+        if otra is not None and otra < version:
+            anteriores.append((otra, ruta))
+    for _, ruta in sorted(anteriores)[:-1]:
+        try:
+            os.unlink(ruta)
+        except FileNotFoundError:
+            pass
+
+
+def draw_chart(rango, desde, hasta, history_path, destino, zona=ZONA_HORARIA):
+    """
+    Dibuja el gráfico de `desde` a `hasta` leyendo el historial de
+    `history_path` y lo escribe en `destino` de forma atómica. De las
+    versiones anteriores del mismo rango conserva solo la última. Devuelve
+    False si no hay datos. Corre en los procesos del pool.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+    import pytz
+
+    historial = history.RateHistory(history_path)
+    try:
+        series = {}
+        for fuente in history.FUENTES:
+            filas = historial.range(fuente, desde, hasta)
+            series[fuente] = np.array(filas, dtype=np.float64).reshape(-1, 2)
+    finally:
+        historial.close()
+    oficial, paralelo = series["oficial"], series["paralelo"]
+    if not len(oficial) or not len(paralelo):
+        return False
+
+    # Brecha en los momentos en que se guardaron ambas tasas
+    _, i, j = np.intersect1d(oficial[:, 0], paralelo[:, 0], assume_unique=True, return_indices=True)
+    brecha = (paralelo[j, 1] / oficial[i, 1] - 1) * 100
+
+    tz = pytz.timezone(zona)
+
+    def fechas(ts):
+        return [datetime.datetime.fromtimestamp(t, tz) for t in ts]
+
+    figura, (arriba, abajo) = plt.subplots(2, 1, figsize=(9, 6), sharex=True,
+                                           gridspec_kw={"height_ratios": (2, 1)})
+    try:
+        for datos, nombre, color in ((paralelo, "Paralelo", "tab:red"), (oficial, "BCV", "tab:blue")):
+            ts, valores = _reducir(datos[:, 0], datos[:, 1])
+            arriba.plot(fechas(ts), valores, label=nombre, color=color, linewidth=1.4)
+        arriba.set_ylabel("Bs/USD")
+        arriba.set_title(f"Paralelo vs BCV — últimas {rango}")
+        arriba.legend(loc="upper left")
+        arriba.grid(alpha=0.3)
+
+        ts, valores = _reducir(oficial[i, 0], brecha)
+        abajo.plot(fechas(ts), valores, color="tab:purple", linewidth=1.2)
+        abajo.fill_between(fechas(ts), valores, alpha=0.15, color="tab:purple")
+        abajo.set_ylabel("Brecha (%)")
+        abajo.grid(alpha=0.3)
+        abajo.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M" if rango == "24h" else "%d/%m", tz=tz))
+        figura.tight_layout()
+
+        with atomic_write(destino, "wb") as f:
+            figura.savefig(f, format="png", dpi=100)
+    finally:
+        plt.close(figura)
+
+    _podar(destino, rango)
+    return True
+
+
+class ChartRenderer:
+    """
+    Devuelve la ruta del PNG de un rango para la versión actual de los
+    datos, dibujándolo en el pool solo si no está en disco. Si varios
+    pedidos llegan mientras se dibuja, todos esperan el mismo dibujo.
+    """
+
+    def __init__(self, directorio=None, workers=CHART_WORKERS):
+        self.directorio = directorio or CHARTS_DIR
+        self.workers = workers
+        self._pool = None
+        self._en_curso = {}   # ruta -> asyncio.Future
+
+    def path_for(self, rango, version):
+        return os.path.join(self.directorio, f"{rango}-{version}.png")
+
+    async def render(self, rango, version=None):
+        """Ruta del gráfico de `rango`, o None si no hay datos."""
+        if version is None:
+            instantanea = load_snapshot()
+            if instantanea is None:
+                return None
+            version = instantanea.ts
+        ruta = self.path_for(rango, version)
+        if os.path.exists(ruta):
+            graficos_resultados.inc("cache")
+            return ruta
+
+        tarea = self._en_curso.get(ruta)
+        if tarea is None:
+            tarea = self._en_curso[ruta] = asyncio.ensure_future(self._dibujar(rango, version, ruta))
+            tarea.add_done_callback(lambda _: self._en_curso.pop(ruta, None))
+        else:
+            graficos_resultados.inc("en_curso")
+        return await asyncio.shield(tarea)
+
+    async def _dibujar(self, rango, version, ruta):
+        loop = asyncio.get_running_loop()
+        dibujado = await loop.run_in_executor(
+            self._get_pool(), draw_chart, rango, version - RANGOS[rango], version, history.HISTORY_DB, ruta)
+        graficos_resultados.inc("dibujado" if dibujado else "sin_datos")
+        return ruta if dibujado else None
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: el bot tiene hilos en marcha y un fork podría heredar candados tomados
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_chart_renderer():
+    """Devuelve el renderizador de gráficos compartido del proceso."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ChartRenderer()
+        return _renderer
+
+
+def shutdown_charts():
+    """Detiene los procesos del pool, si se llegaron a crear."""
+    with _renderer_lock:
+        if _renderer is not None:
+            _renderer.shutdown()
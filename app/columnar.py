@@ -0,0 +1,207 @@
+# app/columnar.py
+"""
+Exportación del historial de tasas a archivos columnares de ancho fijo
+para leer rangos largos sin pasar fila por fila por SQLite.
+
+Por cada fuente hay dos columnas contiguas, `<fuente>.ts.i8` (int64,
+segundos epoch) y `<fuente>.promedio.f8` (float64), más `<fuente>.len`
+con la cantidad de filas confirmadas. Solo se agrega al final: primero
+se escriben las columnas y después se reemplaza `.len` de forma atómica,
+así que un lector que se guía por `.len` nunca ve una fila a medias
+aunque haya una compactación en curso. Se admite un solo escritor.
+
+Uso:
+    python -m app.columnar compactar
+    python -m app.columnar info
+    python -m app.columnar rango paralelo 2025-01-01 2025-06-30 [-o salida.csv]
+"""
+import argparse
+import datetime
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from app.history import FUENTES, get_history
+from app.storage import DATA_DIR, atomic_write
+
+COLUMNAR_DIR = os.path.join(DATA_DIR, "columnas")
+
+TS_DTYPE = np.dtype("<i8")
+PROMEDIO_DTYPE = np.dtype("<f8")
+
+
+def _rutas(directorio, fuente):
+    base = os.path.join(directorio, fuente)
+    return base + ".ts.i8", base + ".promedio.f8", base + ".len"
+
+
+def _leer_largo(ruta):
+    try:
+        with open(ruta, encoding="ascii") as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _escribir_largo(ruta, largo):
+    with atomic_write(ruta, encoding="ascii", fsync=True) as f:
+        f.write(str(largo))
+
+
+class ColumnarSeries:
+    """
+    Lector de una fuente. Las columnas se abren con memoria mapeada y los
+    rangos se devuelven como vistas, sin copiar. `refresh()` incorpora lo
+    que se haya agregado desde que se abrió.
+    """
+
+    def __init__(self, fuente, directorio=None):
+        self.fuente = fuente
+        self.directorio = directorio or COLUMNAR_DIR
+        self._ruta_ts, self._ruta_promedio, self._ruta_largo = _rutas(self.directorio, fuente)
+        self.ts = np.empty(0, dtype=TS_DTYPE)
+        self.promedio = np.empty(0, dtype=PROMEDIO_DTYPE)
+        self.refresh()
+
+    def refresh(self):
+        """Vuelve a leer la cantidad de filas confirmadas y remapea si crecieron."""
+        largo = _leer_largo(self._ruta_largo)
+        if largo != len(self.ts):
+            if largo:
+                self.ts = np.memmap(self._ruta_ts, dtype=TS_DTYPE, mode="r", shape=(largo,))
+                self.promedio = np.memmap(self._ruta_promedio, dtype=PROMEDIO_DTYPE, mode="r", shape=(largo,))
+            else:
+                self.ts = np.empty(0, dtype=TS_DTYPE)
+                self.promedio = np.empty(0, dtype=PROMEDIO_DTYPE)
+        return largo
+
+    def __len__(self):
+        return len(self.ts)
+
+    def range(self, desde, hasta):
+        """(ts, promedio) entre `desde` y `hasta` incluidos, como vistas de las columnas."""
+        i = np.searchsorted(self.ts, int(desde), side="left")
+        j = np.searchsorted(self.ts, int(hasta), side="right")
+        return self.ts[i:j], self.promedio[i:j]
+
+    def at(self, momento):
+        """(ts, promedio) vigente en `momento`, o None."""
+        i = np.searchsorted(self.ts, int(momento), side="right")
+        if not i:
+            return None
+        return int(self.ts[i - 1]), float(self.promedio[i - 1])
+
+
+class ColumnarWriter:
+    """Agrega filas al final de las columnas de cada fuente y confirma el nuevo largo."""
+
+    def __init__(self, directorio=None):
+        self.directorio = directorio or COLUMNAR_DIR
+        os.makedirs(self.directorio, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def last_ts(self, fuente):
+        """Último momento exportado de `fuente`, o None."""
+        ruta_ts, _, ruta_largo = _rutas(self.directorio, fuente)
+        largo = _leer_largo(ruta_largo)
+        if not largo:
+            return None
+        with open(ruta_ts, "rb") as f:
+            f.seek((largo - 1) * TS_DTYPE.itemsize)
+            return int(np.frombuffer(f.read(TS_DTYPE.itemsize), dtype=TS_DTYPE)[0])
+
+    def append(self, fuente, ts, promedio):
+        """Agrega filas ordenadas por ts y posteriores a las ya exportadas. Devuelve cuántas agregó."""
+        ts = np.ascontiguousarray(ts, dtype=TS_DTYPE)
+        promedio = np.ascontiguousarray(promedio, dtype=PROMEDIO_DTYPE)
+        if len(ts) != len(promedio):
+            raise ValueError("ts y promedio deben tener el mismo largo")
+        if not len(ts):
+            return 0
+        if np.any(np.diff(ts) <= 0):
+            raise ValueError("ts debe ser estrictamente creciente")
+
+        with self._lock:
+            ultimo = self.last_ts(fuente)
+            if ultimo is not None and ts[0] <= ultimo:
+                raise ValueError(f"{fuente}: solo se puede agregar después de {ultimo}")
+            ruta_ts, ruta_promedio, ruta_largo = _rutas(self.directorio, fuente)
+            largo = _leer_largo(ruta_largo)
+            for ruta, columna in ((ruta_ts, ts), (ruta_promedio, promedio)):
+                with open(ruta, "ab") as f:
+                    # Descarta lo que haya quedado sin confirmar de una escritura interrumpida
+                    f.truncate(largo * columna.itemsize)
+                    f.write(columna.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            _escribir_largo(ruta_largo, largo + len(ts))
+        return len(ts)
+
+
+def compact(history=None, directorio=None, hasta=None):
+    """
+    Exporta a las columnas lo que el historial tenga después de lo ya
+    exportado. Conviene correrla antes de que el historial resuma los datos
+    viejos para conservar la resolución original. Devuelve {fuente: filas}.
+    """
+    history = history or get_history()
+    escritor = ColumnarWriter(directorio)
+    hasta = hasta if hasta is not None else time.time()
+    agregadas = {}
+    for fuente in FUENTES:
+        ultimo = escritor.last_ts(fuente)
+        filas = history.range(fuente, ultimo + 1 if ultimo is not None else 0, hasta)
+        if filas:
+            ts, promedio = zip(*filas)
+            agregadas[fuente] = escritor.append(fuente, ts, promedio)
+        else:
+            agregadas[fuente] = 0
+    return agregadas
+
+
+def _fecha(texto):
+    return datetime.datetime.strptime(texto, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.columnar",
+                                     description="Exportación columnar del historial de tasas.")
+    parser.add_argument("--directorio", default=None, help=f"por defecto {COLUMNAR_DIR}")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("compactar", help="exportar lo nuevo del historial")
+    sub.add_parser("info", help="filas y rango de fechas por fuente")
+    rango = sub.add_parser("rango", help="volcar un rango de fechas (UTC) en CSV")
+    rango.add_argument("fuente", choices=FUENTES)
+    rango.add_argument("desde", type=_fecha, help="AAAA-MM-DD")
+    rango.add_argument("hasta", type=_fecha, help="AAAA-MM-DD (incluido)")
+    rango.add_argument("-o", "--salida", default="-")
+    args = parser.parse_args(argv)
+
+    if args.comando == "compactar":
+        for fuente, filas in compact(directorio=args.directorio).items():
+            print(f"{fuente}: {filas} filas nuevas")
+    elif args.comando == "info":
+        for fuente in FUENTES:
+            serie = ColumnarSeries(fuente, args.directorio)
+            if not len(serie):
+                print(f"{fuente}: sin datos")
+                continue
+            primera, ultima = (datetime.datetime.fromtimestamp(int(t), datetime.timezone.utc) for t in (serie.ts[0], serie.ts[-1]))
+            print(f"{fuente}: {len(serie)} filas, {primera:%Y-%m-%d %H:%M} a {ultima:%Y-%m-%d %H:%M} UTC")
+    else:
+        ts, promedio = ColumnarSeries(args.fuente, args.directorio).range(args.desde, args.hasta + 86399)
+        salida = sys.stdout if args.salida == "-" else open(args.salida, "w", encoding="utf-8")
+        try:
+            salida.write("ts,promedio\n")
+            np.savetxt(salida, np.column_stack((ts, promedio)), fmt=("%d", "%.6f"), delimiter=",")
+        finally:
+            if salida is not sys.stdout:
+                salida.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
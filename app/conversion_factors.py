@@ -1,15 +1,19 @@
-import requests
+import sys
 
-# URL del endpoint de dolarapi.com que contiene ambas tasas
-api_url = "https://ve.dolarapi.com/v1/dolares"
+from app.api_data import describe_staleness, get_exchange_rates, load_last_known_good, set_offline
 
-try:
-    response = requests.get(api_url)
-    data = response.json()
 
-    # Buscar la tasa oficial (BCV) y la tasa paralela en el JSON
-    tasa_bcv = next(item for item in data if item["fuente"] == "oficial")["promedio"]
-    tasa_mercado = next(item for item in data if item["fuente"] == "paralelo")["promedio"]
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--offline" in argv:
+        set_offline()
+    load_last_known_good()
+
+    # Tasa oficial (BCV) y paralela, de la API o de la última consulta guardada
+    tasa_bcv, tasa_mercado, _ = get_exchange_rates()
+    if not tasa_bcv or not tasa_mercado:
+        print("Error al obtener los datos de la API y no hay una tasa guardada.")
+        return 1
 
     # Calcular los factores de conversión
     factor_para_vender = tasa_bcv / tasa_mercado
@@ -18,6 +22,9 @@ try:
     print("--- Resultados de la API ---")
     print(f"Tasa Oficial (BCV): {tasa_bcv:.2f} Bs/USD")
     print(f"Tasa Paralela: {tasa_mercado:.2f} Bs/USD")
+    antiguedad = describe_staleness()
+    if antiguedad:
+        print(antiguedad)
 
     print("\n--- Factores Calculados ---")
     print(f"Factor para vender tus dólares (ahorro): {factor_para_vender:.2f}")
@@ -30,8 +37,8 @@ try:
     print("\n--- Ejemplo con $1000 ---")
     print(f"Para una compra de $1000 (a tasa BCV), solo necesitas vender {dolares_a_vender_por_1000:.2f} dólares en el mercado.")
     print(f"Si vendes $1000 en el mercado, obtienes el poder de compra de ${poder_compra_con_1000:.2f} (a tasa BCV).")
+    return 0
+
 
-except requests.exceptions.RequestException as e:
-    print(f"Error al obtener los datos de la API: {e}")
-except (KeyError, StopIteration):
-    print("La estructura de la API ha cambiado o los datos no están disponibles.")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
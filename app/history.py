@@ -0,0 +1,145 @@
+# app/history.py
+import os
+import sqlite3
+import threading
+import time
+
+from app.storage import DATA_DIR
+
+# --- Configuración del historial ---
+HISTORY_DB = os.path.join(DATA_DIR, "historial.db")
+RETENCION_DIAS = 365          # se borra todo lo que sea más viejo
+DOWNSAMPLE_DIAS = 7           # lo más viejo que esto se resume por hora
+DOWNSAMPLE_INTERVALO = 3600   # tamaño del resumen en segundos
+
+FUENTES = ("oficial", "paralelo")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasas (
+    fuente   TEXT    NOT NULL,
+    ts       INTEGER NOT NULL,  -- segundos epoch UTC
+    promedio REAL    NOT NULL,
+    PRIMARY KEY (fuente, ts)
+) WITHOUT ROWID;
+"""
+
+
+class RateHistory:
+    """
+    Historial de tasas en SQLite, solo de agregado, indexado por fuente y
+    momento de la consulta para responder rangos y consultas puntuales.
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def record(self, tasa_bcv, tasa_mercado_cruda, ts=None):
+        """Guarda una consulta de tasas. `ts` por defecto es el momento actual."""
+        ts = int(ts if ts is not None else time.time())
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasas (fuente, ts, promedio) VALUES (?, ?, ?)",
+                [("oficial", ts, tasa_bcv), ("paralelo", ts, tasa_mercado_cruda)],
+            )
+
+    def range(self, fuente, desde, hasta):
+        """Devuelve [(ts, promedio), ...] de `fuente` entre `desde` y `hasta` (incluidos)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT ts, promedio FROM tasas WHERE fuente = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                (fuente, int(desde), int(hasta)),
+            ).fetchall()
+
+    def at(self, fuente, momento):
+        """Devuelve (ts, promedio) vigente en `momento`, es decir, la última consulta anterior."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT ts, promedio FROM tasas WHERE fuente = ? AND ts <= ? ORDER BY ts DESC LIMIT 1",
+                (fuente, int(momento)),
+            ).fetchone()
+
+    def latest(self, fuente):
+        """Última consulta guardada para `fuente`, o None."""
+        return self.at(fuente, 2 ** 62)
+
+    def summary(self, fuente, desde, hasta):
+        """Primera, última, mínima, máxima y promedio de `fuente` en el rango."""
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT COUNT(*), MIN(promedio), MAX(promedio), AVG(promedio) "
+                "FROM tasas WHERE fuente = ? AND ts BETWEEN ? AND ?",
+                (fuente, int(desde), int(hasta)),
+            ).fetchone()
+        if not fila[0]:
+            return None
+        puntos = self.range(fuente, desde, hasta)
+        return {
+            'consultas': fila[0],
+            'primera': puntos[0][1],
+            'ultima': puntos[-1][1],
+            'minima': fila[1],
+            'maxima': fila[2],
+            'promedio': fila[3],
+        }
+
+    def apply_retention(self, dias=RETENCION_DIAS, ahora=None):
+        """Borra las consultas más viejas que `dias`. Devuelve cuántas filas borró."""
+        limite = int((ahora if ahora is not None else time.time()) - dias * 86400)
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM tasas WHERE ts < ?", (limite,)).rowcount
+
+    def downsample(self, dias=DOWNSAMPLE_DIAS, intervalo=DOWNSAMPLE_INTERVALO, ahora=None):
+        """
+        Reemplaza las consultas más viejas que `dias` por su promedio en
+        intervalos de `intervalo` segundos, fechado al inicio del intervalo.
+        """
+        limite = int((ahora if ahora is not None else time.time()) - dias * 86400)
+        limite -= limite % intervalo  # no partir el intervalo en curso
+        with self._lock, self._conn:
+            resumen = self._conn.execute(
+                "SELECT fuente, (ts / ?) * ?, AVG(promedio) FROM tasas "
+                "WHERE ts < ? GROUP BY fuente, ts / ?",
+                (intervalo, intervalo, limite, intervalo),
+            ).fetchall()
+            self._conn.execute("DELETE FROM tasas WHERE ts < ?", (limite,))
+            self._conn.executemany(
+                "INSERT INTO tasas (fuente, ts, promedio) VALUES (?, ?, ?)", resumen
+            )
+        return len(resumen)
+
+    def maintenance(self):
+        """Aplica retención y resumen de datos viejos."""
+        borradas = self.apply_retention()
+        resumidas = self.downsample()
+        return borradas, resumidas
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    """Devuelve el historial compartido del proceso, abriéndolo la primera vez."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = RateHistory(HISTORY_DB)
+        return _history
+
+
+def record_rates(tasa_bcv, tasa_mercado_cruda):
+    """Guarda una consulta en el historial sin interrumpir al llamador si falla."""
+    try:
+        get_history().record(tasa_bcv, tasa_mercado_cruda)
+    except sqlite3.Error as e:
+        print(f"Error al guardar el historial de tasas: {e}")
@@ -0,0 +1,145 @@
+# app/inline.py
+"""
+Modo inline (`@bot 150` desde cualquier chat). Las respuestas se arman
+con las tablas del juego de tasas vigente y se guardan en una caché LRU
+por (versión de las tablas, montos normalizados): los montos populares se
+responden sin recalcular nada.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+from telegram import InlineQueryResultArticle, InputTextMessageContent
+
+from app import metrics
+from app.render import telegram
+
+# --- Configuración ---
+INLINE_CACHE_SIZE = 2048     # respuestas guardadas
+CACHE_TIME_MIN = 5           # segundos que Telegram guarda una respuesta con tasas viejas
+CACHE_TIME_MAX = 300
+MONTO_MAXIMO = 1e9
+
+_NUMERO = re.compile(r"^\$?(\d+(?:[.,]\d+)?)\$?$")
+
+
+class LRUCache:
+    """Caché de tamaño fijo que descarta lo usado hace más tiempo."""
+
+    def __init__(self, maxsize=INLINE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._datos = OrderedDict()
+
+    def get(self, clave):
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is None:
+                self.misses += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def put(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def __len__(self):
+        return len(self._datos)
+
+
+answer_cache = LRUCache()
+
+metrics.callback("inline_cache_hits_total", "Consultas inline respondidas desde la caché.",
+                 lambda: answer_cache.hits, tipo="counter")
+metrics.callback("inline_cache_misses_total", "Consultas inline que hubo que armar.",
+                 lambda: answer_cache.misses, tipo="counter")
+
+
+def normalize_query(texto):
+    """
+    '150', '$150', '150,5' o '300 150' -> tupla de montos redondeados a
+    centavos, o None si la consulta no es de uno o dos montos válidos.
+    """
+    partes = texto.split()
+    if not 1 <= len(partes) <= 2:
+        return None
+    montos = []
+    for parte in partes:
+        coincidencia = _NUMERO.match(parte)
+        if coincidencia is None:
+            return None
+        monto = round(float(coincidencia.group(1).replace(",", ".")), 2)
+        if not 0 < monto < MONTO_MAXIMO:
+            return None
+        montos.append(monto)
+    return tuple(montos)
+
+
+def _articulo(id_, titulo, descripcion, texto):
+    return InlineQueryResultArticle(
+        id=id_,
+        title=titulo,
+        description=descripcion,
+        input_message_content=InputTextMessageContent(texto, parse_mode="Markdown"),
+    )
+
+
+def build_results(tablas, montos):
+    """Resultados inline para los montos: conversión y costo de oportunidad, o análisis de compra con dos montos."""
+    clave = "-".join(f"{m:g}" for m in montos)
+    monto = montos[0]
+    conversion = tablas.conversion(monto)
+    resultados = []
+
+    if len(montos) == 2:
+        compra = tablas.purchase(*montos)
+        veredicto = "alcanza" if compra.suficiente[0] else "no alcanza"
+        resultados.append(_articulo(
+            f"compra-{clave}",
+            f"📊 Compra de ${compra.costo:.2f} con ${compra.dolares:.2f}: {veredicto}",
+            f"A {tablas.escalera[0]:.2f} Bs/USD tus divisas rinden ${compra.poder_compra[0]:.2f} a tasa BCV",
+            telegram(compra),
+        ))
+
+    resultados.append(_articulo(
+        f"conversion-{clave}",
+        f"💱 ${monto:.2f} = {conversion.precio_bcv:.2f} Bs (BCV)",
+        f"Mercado + IGTF: {conversion.precio_mercado_igtf:.2f} Bs | diferencia {conversion.diferencia_igtf:.2f} Bs",
+        telegram(conversion),
+    ))
+    if len(montos) == 1:
+        oportunidad = tablas.opportunity(monto)
+        resultados.append(_articulo(
+            f"oportunidad-{clave}",
+            f"📈 Costo de oportunidad de vender ${monto:.2f}",
+            f"Hasta {oportunidad.perdida_bolivares[-1]:.2f} Bs de pérdida vendiendo a {oportunidad.tasas[-1]:.2f} Bs/USD",
+            telegram(oportunidad),
+        ))
+    return resultados
+
+
+def inline_answer(tablas, montos, cache=answer_cache):
+    """Resultados desde la caché, o armados y guardados si no estaban."""
+    clave = (tablas.version, montos)
+    resultados = cache.get(clave)
+    if resultados is None:
+        resultados = build_results(tablas, montos)
+        cache.put(clave, resultados)
+    return resultados
+
+
+def cache_time_for(edad, ttl):
+    """
+    Segundos que Telegram puede guardar la respuesta: lo que le falta a las
+    tasas para vencer, con un mínimo corto si ya están viejas.
+    """
+    if edad is None:
+        return CACHE_TIME_MIN
+    return int(min(CACHE_TIME_MAX, max(CACHE_TIME_MIN, ttl - edad)))
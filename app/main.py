@@ -1,14 +1,34 @@
 # app/main.py
 
-from app.calculator import DivisaCalculator
+import argparse
+import sys
+
+from app.calculator import DivisaCalculator, RatesUnavailableError
 from app.menu import show_menu
 
-def main():
-    calculator = DivisaCalculator()
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "batch":
+        from app import batch
+        return batch.main(argv[1:])
+
+    parser = argparse.ArgumentParser(prog="python -m app.main", description="Calculadora de divisas.")
+    parser.add_argument("--offline", action="store_true",
+                        help="usar solo la última tasa guardada, sin consultar la API")
+    args = parser.parse_args(argv)
+
+    try:
+        calculator = DivisaCalculator(offline=args.offline)
+    except RatesUnavailableError as e:
+        print(f"{e} Saliendo.")
+        return 1
     print(calculator.get_exchange_rates_report())
 
     while True:
         opcion = show_menu()
+        if opcion in (1, 2):
+            # Si el refresco en segundo plano ya terminó, usar las tasas nuevas
+            calculator.refresh()
         if opcion == 1:
             calculator.run_analysis_de_compra()
         elif opcion == 2:
@@ -20,4 +40,4 @@ def main():
             print("Opción no válida. Inténtalo de nuevo.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,271 @@
+# app/metrics.py
+"""
+Métricas del proceso en formato de texto de Prometheus, sin dependencias
+externas, y trazas opcionales por update.
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuración ---
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+# Cada shard sirve sus métricas en su propio puerto: 9464, 9465, ... según SHARD_INDEX
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9464 + int(os.environ.get("SHARD_INDEX", "0"))))
+LATENCIA_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_INTERVALO = 0.5    # segundos entre mediciones del retraso del event loop
+
+TRACING = False         # activar con enable_tracing()
+
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = ",".join(f'{n}="{str(v)}"' for n, v in zip(nombres, valores))
+    return "{" + pares + "}"
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, valores):
+        if len(valores) != len(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+        return tuple(str(v) for v in valores)
+
+    def render(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(self._muestras())
+        return "\n".join(lineas)
+
+
+class Counter(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores = {}
+
+    def inc(self, *valores, cantidad=1):
+        clave = self._clave(valores)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def value(self, *valores):
+        return self._valores.get(self._clave(valores), 0)
+
+    def _muestras(self):
+        with self._lock:
+            return [f"{self.nombre}{_etiquetas(self.etiquetas, k)} {v}" for k, v in self._valores.items()]
+
+
+class Gauge(Counter):
+    tipo = "gauge"
+
+    def set(self, *valores, valor):
+        clave = self._clave(valores)
+        with self._lock:
+            self._valores[clave] = valor
+
+
+class CallbackMetric(_Metrica):
+    """Métrica cuyo valor se lee de una función al exportar."""
+
+    def __init__(self, nombre, ayuda, funcion, tipo="gauge"):
+        super().__init__(nombre, ayuda)
+        self.tipo = tipo
+        self.funcion = funcion
+
+    def _muestras(self):
+        return [f"{self.nombre} {self.funcion()}"]
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=LATENCIA_BUCKETS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, *valores, valor):
+        clave = self._clave(valores)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def _muestras(self):
+        lineas = []
+        with self._lock:
+            for clave, (conteos, suma, total) in self._series.items():
+                for limite, conteo in zip(self.buckets, conteos):
+                    le = _etiquetas(self.etiquetas + ("le",), clave + (limite,))
+                    lineas.append(f"{self.nombre}_bucket{le} {conteo}")
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas + ('le',), clave + ('+Inf',))} {total}")
+                lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {suma}")
+                lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {total}")
+        return lineas
+
+
+class Registry:
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def register(self, metrica):
+        with self._lock:
+            # Registrar dos veces el mismo nombre devuelve la métrica existente
+            return self._metricas.setdefault(metrica.nombre, metrica)
+
+    def render(self):
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return "\n".join(m.render() for m in metricas) + "\n"
+
+
+registry = Registry()
+
+
+def counter(nombre, ayuda, etiquetas=()):
+    return registry.register(Counter(nombre, ayuda, etiquetas))
+
+
+def gauge(nombre, ayuda, etiquetas=()):
+    return registry.register(Gauge(nombre, ayuda, etiquetas))
+
+
+def histogram(nombre, ayuda, etiquetas=(), buckets=LATENCIA_BUCKETS):
+    return registry.register(Histogram(nombre, ayuda, etiquetas, buckets))
+
+
+def callback(nombre, ayuda, funcion, tipo="gauge"):
+    return registry.register(CallbackMetric(nombre, ayuda, funcion, tipo))
+
+
+# --- Métricas del bot ---
+upstream_latencia = histogram(
+    "tasas_upstream_segundos", "Latencia de cada consulta a un proveedor de tasas.", ("proveedor", "resultado"))
+fetch_latencia = histogram(
+    "tasas_fetch_segundos", "Latencia total de una consulta de tasas, con reintentos.", ("resultado",))
+handler_latencia = histogram(
+    "bot_handler_segundos", "Latencia de cada handler del bot.", ("handler",))
+handler_errores = counter(
+    "bot_handler_errores_total", "Excepciones no manejadas por handler.", ("handler", "tipo"))
+job_retraso = histogram(
+    "bot_job_retraso_segundos", "Retraso entre la hora programada y la ejecución de un job.", ("job",))
+loop_retraso = histogram(
+    "bot_event_loop_retraso_segundos", "Retraso del event loop medido con un temporizador.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+envio_errores = counter(
+    "telegram_envio_errores_total", "Errores al enviar mensajes a Telegram por tipo.", ("tipo",))
+
+
+# --- Servidor /metrics ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Sirve /metrics en un hilo aparte. Devuelve el servidor para poder detenerlo."""
+    servidor = ThreadingHTTPServer((host, port), _MetricsHandler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+# --- Instrumentación ---
+async def monitor_event_loop(intervalo=LOOP_INTERVALO):
+    """Mide cuánto se atrasa un sleep de `intervalo`: es el tiempo que el loop estuvo ocupado."""
+    loop = asyncio.get_running_loop()
+    while True:
+        inicio = loop.time()
+        await asyncio.sleep(intervalo)
+        loop_retraso.observe(valor=max(0.0, loop.time() - inicio - intervalo))
+
+
+def instrument_handler(nombre, handler):
+    """Envuelve un handler async para medir su latencia, errores y abrir una traza."""
+    @functools.wraps(handler)
+    async def envuelto(update, context):
+        token = _traza.set(getattr(update, "update_id", None)) if TRACING else None
+        inicio = time.perf_counter()
+        try:
+            with span(nombre):
+                return await handler(update, context)
+        except Exception as e:
+            handler_errores.inc(nombre, type(e).__name__)
+            raise
+        finally:
+            handler_latencia.observe(nombre, valor=time.perf_counter() - inicio)
+            if token is not None:
+                _traza.reset(token)
+    return envuelto
+
+
+def instrument_job(nombre, callback_job, intervalo):
+    """Envuelve un job repetitivo para medir cuánto se atrasó respecto de su hora."""
+    @functools.wraps(callback_job)
+    async def envuelto(context):
+        siguiente = getattr(context.job, "next_t", None)
+        if siguiente is not None:
+            programado = siguiente.timestamp() - intervalo
+            job_retraso.observe(nombre, valor=max(0.0, time.time() - programado))
+        with span(nombre):
+            return await callback_job(context)
+    return envuelto
+
+
+# --- Trazas por update ---
+_traza = contextvars.ContextVar("traza", default=None)
+_logger_trazas = logging.getLogger("app.traza")
+
+
+def enable_tracing():
+    """Registra en el log la duración de cada tramo de cada update."""
+    global TRACING
+    TRACING = True
+    _logger_trazas.setLevel(logging.INFO)
+
+
+@contextlib.contextmanager
+def span(nombre):
+    """Tramo de una traza; no hace nada si las trazas están desactivadas."""
+    if not TRACING:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _logger_trazas.info(
+            "update=%s tramo=%s duracion_ms=%.2f", _traza.get(), nombre, (time.perf_counter() - inicio) * 1000
+        )
@@ -1,19 +1,39 @@
 # app/notifier.py
 
+import asyncio
 import logging
 import pytz
 import datetime
+from telegram.error import TelegramError
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, BotCommand
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
     ContextTypes,
     CallbackQueryHandler,
+    InlineQueryHandler,
     MessageHandler,
     filters,
     JobQueue
 )
-from app.api_data import get_exchange_rates
+from app import metrics
+from app.admission import AdmissionControl
+from app.analytics import VENTANAS, get_analytics
+from app.alerts import ALERTAS_DEFECTO, TIPOS_ALERTA, RateWatcher, describe_alertas
+from app.api_data import (
+    CACHE_TTL, close_http_client, describe_staleness, get_exchange_rates_async, load_last_known_good, rates_age,
+    refresh_exchange_rates_async,
+)
+from app.broadcast import Broadcaster
+from app.charts import CHARTS_AVAILABLE, RANGO_DEFECTO, RANGOS, get_chart_renderer, shutdown_charts
+from app.columnar import compact
+from app.history import get_history
+from app.inline import CACHE_TIME_MIN, cache_time_for, inline_answer, normalize_query
+from app.rate_tables import rate_tables
+from app.render import TITULO_REPORTE_AUTOMATICO, rates_report, telegram
+from app.sharding import SHARD_INDEX, PerUserUpdateProcessor
+from app.state import get_state_store
+from app.subscriptions import SubscriptionRegistry
 
 # Habilitar el logging para ver mensajes de error
 logging.basicConfig(
@@ -31,114 +51,70 @@ ANALISIS_COMPRA = 1
 COSTO_OPORTUNIDAD = 2
 CAMBIO_DIVISAS = 3 # NUEVA OPCIÓN
 
-# --- Funciones de Cálculo ---
-def calculate_metrics_compra(costo_producto, dolares_disponibles, tasa_bcv, tasa_mercado_redondeada):
-    tasas_a_evaluar = [tasa_mercado_redondeada - (i * 10) for i in range(6)]
-    
-    response = (
-        f"📊 *Análisis de Compra*\n"
-        f"Producto: ${costo_producto:.2f} | Divisas: ${dolares_disponibles:.2f}\n"
-        "=======================================\n"
-        "{:<10} | {:<8} | {:<12}\n".format("Tasa", "Poder Compra", "Resultado")
-    )
-    
-    for tasa in tasas_a_evaluar:
-        poder_compra = dolares_disponibles * (tasa / tasa_bcv)
-        suficiente = poder_compra >= costo_producto
-        estado = "Sí" if suficiente else "No"
-        response += "{:<10.2f} | {:<8.2f} | {:<12}\n".format(tasa, poder_compra, estado)
+TZ_CARACAS = pytz.timezone('America/Caracas')
 
-    return response
+# --- Suscriptores del reporte periódico ---
+subscriptions = SubscriptionRegistry()
 
-def calculate_metrics_oportunidad(dolares_a_vender, tasa_bcv, tasa_mercado_redondeada):
-    tasas_a_evaluar = [tasa_mercado_redondeada - (i * 10) for i in range(1, 6)]
-    valor_max_bolivares = dolares_a_vender * tasa_mercado_redondeada
-    
-    response = (
-        f"📊 *Costo de Oportunidad*\n"
-        f"Divisas: ${dolares_a_vender:.2f}\n"
-        "=======================================\n"
-        "{:<10} | {:<10} | {:<12} | {:<20}\n".format("Tasa", "Pérdida (Bs)", "Pérdida ($Merc)", "Poder de Compra (BCV USD)")
-    )
-    
-    for tasa_actual in tasas_a_evaluar:
-        valor_actual_bolivares = dolares_a_vender * tasa_actual
-        perdida_bolivares = valor_max_bolivares - valor_actual_bolivares
-        perdida_usd_mercado = perdida_bolivares / tasa_mercado_redondeada
-        poder_compra_bcv = (dolares_a_vender * tasa_actual) / tasa_bcv
-        
-        response += "{:<10.2f} | {:<10.2f} | {:<12.2f} | {:<20.2f}\n".format(tasa_actual, perdida_bolivares, perdida_usd_mercado, poder_compra_bcv)
-    
-    return response
-
-# NUEVA FUNCIÓN
+POLL_INTERVAL = 60                                  # segundos entre consultas para alertas
+HORA_REPORTE = datetime.time(hour=9, tzinfo=TZ_CARACAS)  # reporte completo diario
+ALERTA_EDAD_MAXIMA = 300                            # no alertar con tasas más viejas que esto (s)
 
-def calculate_price_conversion(usd_price, tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada):
-    precio_bcv = usd_price * tasa_bcv
-    precio_mercado = usd_price * tasa_mercado_cruda
-    tasa_mercado_con_igtf = tasa_mercado_cruda * 1.0348
-    
-    # Diferencia cambiaria (Mercado vs BCV)
-    diferencia_cifras = tasa_mercado_con_igtf - tasa_bcv
-    diferencia_porcentaje = (diferencia_cifras / tasa_bcv) * 100
-    
-    # Diferencia de precio (Mercado vs BCV)
-    diferencia_precio_mercado_bcv = precio_mercado - precio_bcv
+# --- Observabilidad ---
+METRICS_ENABLED = True    # sirve /metrics en metrics.METRICS_HOST:METRICS_PORT
+TRACE_UPDATES = False     # registra en el log la duración de cada tramo de cada update
 
-    # Nuevo cálculo de diferencia con IGTF
-    precio_mercado_con_igtf = precio_mercado * 1.0348
-    diferencia_con_igtf = precio_mercado_con_igtf - precio_bcv
+# --- Reportes ---
+# Los cálculos salen de app/rate_tables.py y los textos de app/render.py;
+# el reporte se arma una sola vez por juego de tasas.
+async def send_daily_report(context: ContextTypes.DEFAULT_TYPE):
+    """Genera el reporte de las tasas de cambio y lo envía a todos los suscriptores."""
+    tasas = await get_exchange_rates_async()
+    if not all(tasas):
+        logging.error("No se pudieron obtener las tasas de cambio para el reporte.")
+        return
 
-    response = (
-        f"💰 *Conversión de Divisas*\n"
-        f"Monto en USD: ${usd_price:.2f}\n"
-        f"Tasa BCV: {tasa_bcv:.2f} Bs/USD\n"
-        f"Tasa Mercado: {tasa_mercado_cruda:.2f} Bs/USD\n"
-        f"Tasa Mercado + IGTF: {tasa_mercado_con_igtf:.2f} Bs/USD\n"
-        f"  (Diferencia vs BCV: {diferencia_cifras:.2f} Bs/USD | {diferencia_porcentaje:.2f}%)\n"
-        f"=======================================\n\n"
-        f"Precio en Bs (BCV): {precio_bcv:.2f}\n"
-        f"Precio en Bs (Mercado con IGTF): {precio_mercado_con_igtf:.2f}\n"
-        f"Diferencia (con 3.48% IGTF): {diferencia_con_igtf:.2f}\n"
-        "---------------------------------------\n\n"
-        "Precios en un rango de tasas:\n"
-        "{:<10} | {:<12} | {:<15}\n".format("Tasa", "Precio (Bs)", "Diferencia (Bs)")
+    reporte = rates_report(rate_tables(*tasas), TITULO_REPORTE_AUTOMATICO)
+    reporte += "\n" + format_stats_breve(get_analytics().summary())
+    conteo = await context.bot_data['broadcaster'].broadcast(
+        await asyncio.to_thread(subscriptions.chat_ids), reporte, parse_mode="Markdown"
     )
+    logging.info("Reporte enviado: %s", conteo)
 
-    tasas_a_evaluar = [tasa_mercado_redondeada - (i * 10) for i in range(6)]
-    for tasa in tasas_a_evaluar:
-        precio_rango = usd_price * tasa
-        diferencia_precio = precio_rango - precio_bcv # Diferencia con el precio BCV
-        response += "{:<10.2f} | {:<12.2f} | {:<15.2f}\n".format(tasa, precio_rango, diferencia_precio)
-    
-    return response
+async def poll_rates(context: ContextTypes.DEFAULT_TYPE):
+    """Consulta las tasas a intervalo corto y avisa solo a quien cruzó su umbral."""
+    # Directo a la API: por la caché llegaría el valor de la consulta anterior
+    tasas = await refresh_exchange_rates_async()
+    if not all(tasas):
+        return
+    # Al arrancar se sirve la última instantánea guardada; no alertar con ella
+    if rates_age() > ALERTA_EDAD_MAXIMA:
+        return
 
-# --- Función para el reporte ---
-async def send_hourly_report(context: ContextTypes.DEFAULT_TYPE):
-    """Genera y envía un reporte completo de las tasas de cambio."""
-    chat_id = context.job.data
-    
-    tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada = get_exchange_rates()
-    if not all([tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada]):
-        await context.bot.send_message(chat_id=chat_id, text="No se pudieron obtener las tasas de cambio.")
+    avisos = await asyncio.to_thread(context.bot_data['watcher'].check, tasas[0], tasas[1])
+    if not avisos:
         return
 
-    diferencia_cifras = tasa_mercado_cruda - tasa_bcv
-    diferencia_porcentaje = (diferencia_cifras / tasa_bcv) * 100
-    iac = ((tasa_mercado_cruda / tasa_bcv) - 1) * 100
-    fpc = tasa_mercado_cruda / tasa_bcv
-
-    reporte = (
-        f"⏰ *Reporte de Tasas de Cambio (Automático)*\n\n"
-        f"Tasa Oficial (BCV): {tasa_bcv:.4f} Bs/USD\n"
-        f"Tasa Mercado (Cruda): {tasa_mercado_cruda:.4f} Bs/USD\n"
-        f"Tasa Mercado (Redondeada): {tasa_mercado_redondeada:.4f} Bs/USD\n\n"
-        f"Diferencia Cambiaria: {diferencia_cifras:.4f} Bs/USD ({diferencia_porcentaje:.2f}%)\n"
-        f"IAC (%): {iac:.2f}%\n"
-        f"FPC: {fpc:.4f}\n"
-    )
-    
-    await context.bot.send_message(chat_id=chat_id, text=reporte, parse_mode="Markdown")
+    reporte = rates_report(rate_tables(*tasas), TITULO_REPORTE_AUTOMATICO)
+    mensajes = [
+        (chat_id, "🔔 *Alerta de Tasas*\n" + "\n".join(motivos) + "\n\n" + reporte)
+        for chat_id, motivos in avisos
+    ]
+    conteo = await context.bot_data['broadcaster'].send_many(mensajes, parse_mode="Markdown")
+    logging.info("Alertas enviadas: %s", conteo)
+
+async def mantenimiento_historial(context: ContextTypes.DEFAULT_TYPE):
+    """Aplica retención al historial de tasas y lo exporta a columnas, fuera del event loop."""
+    # Exportar a las columnas antes de que el historial resuma los datos viejos
+    exportadas = await asyncio.to_thread(compact)
+    logging.info("Exportación columnar: %s", exportadas)
+    borradas, resumidas = await asyncio.to_thread(get_history().maintenance)
+    logging.info("Historial: %s consultas borradas, %s intervalos resumidos.", borradas, resumidas)
+
+async def purgar_estados(context: ContextTypes.DEFAULT_TYPE):
+    """Borra los estados de conversación caducados del almacén de este shard, fuera del event loop."""
+    caducados = await asyncio.to_thread(get_state_store().purge)
+    logging.info("Estados de conversación caducados: %s", caducados)
 
 # --- Funciones de Bot ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -157,85 +133,378 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     
     if query.data == 'analisis_compra':
-        context.user_data['state'] = ANALISIS_COMPRA
+        await asyncio.to_thread(get_state_store().put, update.effective_user.id, {'state': ANALISIS_COMPRA})
         await query.edit_message_text(
             text="Ingresa el costo del producto en USD y la cantidad de divisas que tienes, separados por un espacio (ej: `300 150`)"
         )
     elif query.data == 'costo_oportunidad':
-        context.user_data['state'] = COSTO_OPORTUNIDAD
+        await asyncio.to_thread(get_state_store().put, update.effective_user.id, {'state': COSTO_OPORTUNIDAD})
         await query.edit_message_text(
             text="Ingresa la cantidad de divisas que tienes para vender (ej: `300`)"
         )
     elif query.data == 'cambio_divisas': # NUEVA LÓGICA
-        context.user_data['state'] = CAMBIO_DIVISAS
+        await asyncio.to_thread(get_state_store().put, update.effective_user.id, {'state': CAMBIO_DIVISAS})
         await query.edit_message_text(
             text="Ingresa el precio del producto o servicio en USD (ej: `50`)"
         )
 
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Maneja los mensajes de texto del usuario según el estado actual."""
-    if 'state' not in context.user_data:
+    # SQLite puede esperar hasta 5 s por el bloqueo de otro shard: fuera del event loop
+    estado = (await asyncio.to_thread(get_state_store().get, update.effective_user.id)).get('state')
+    if estado is None:
         await update.message.reply_text("Por favor, elige una opción del menú primero usando /start.")
         return
 
     try:
         valores = [float(val) for val in update.message.text.split()]
-        tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada = get_exchange_rates()
+        with metrics.span("fetch_tasas"):
+            tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada = await get_exchange_rates_async()
         
         if not all([tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada]):
             await update.message.reply_text("No se pudieron obtener las tasas de cambio.")
             return
+        tablas = rate_tables(tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada)
 
-        if context.user_data['state'] == ANALISIS_COMPRA:
+        if estado == ANALISIS_COMPRA:
             if len(valores) != 2:
                 await update.message.reply_text("❌ Entrada incorrecta. Debes ingresar dos números: costo y divisas.")
                 return
-            response = calculate_metrics_compra(valores[0], valores[1], tasa_bcv, tasa_mercado_redondeada)
+            resultado = tablas.purchase(valores[0], valores[1])
         
-        elif context.user_data['state'] == COSTO_OPORTUNIDAD:
+        elif estado == COSTO_OPORTUNIDAD:
             if len(valores) != 1:
                 await update.message.reply_text("❌ Entrada incorrecta. Debes ingresar un solo número: la cantidad de divisas.")
                 return
-            response = calculate_metrics_oportunidad(valores[0], tasa_bcv, tasa_mercado_redondeada)
+            resultado = tablas.opportunity(valores[0])
 
-        elif context.user_data['state'] == CAMBIO_DIVISAS:
+        elif estado == CAMBIO_DIVISAS:
             if len(valores) != 1:
                 await update.message.reply_text("❌ Entrada incorrecta. Debes ingresar un solo número: el precio en USD.")
                 return
-            response = calculate_price_conversion(valores[0], tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada)
+            resultado = tablas.conversion(valores[0])
         
-        await update.message.reply_text(response, parse_mode="Markdown")
-        context.user_data.pop('state', None)
-        await start(update, context)
+        response = telegram(resultado)
+        antiguedad = describe_staleness()
+        if antiguedad:
+            response += f"\n⏳ _{antiguedad}_\n"
+
+        with metrics.span("respuesta"):
+            await update.message.reply_text(response, parse_mode="Markdown")
+            await asyncio.to_thread(get_state_store().delete, update.effective_user.id)
+            await start(update, context)
     
     except ValueError:
         await update.message.reply_text("❌ Formato incorrecto. Por favor, ingresa solo números.")
 
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Maneja `@bot 150` o `@bot 300 150` respondiendo con resultados inline."""
+    query = update.inline_query
+    montos = normalize_query(query.query)
+    if montos is None:
+        await query.answer([], cache_time=CACHE_TIME_MIN)
+        return
+
+    tasas = await get_exchange_rates_async()
+    if not all(tasas):
+        await query.answer([], cache_time=CACHE_TIME_MIN)
+        return
+
+    resultados = inline_answer(rate_tables(*tasas), montos)
+    await query.answer(resultados, cache_time=cache_time_for(rates_age(), CACHE_TTL))
+
+def format_historial_momento(momento, history):
+    """Arma la respuesta de /historial para una fecha y hora puntual."""
+    response = f"🕰 *Historial de Tasas*\nConsulta: {momento:%Y-%m-%d %H:%M}\n\n"
+    for fuente, nombre in (("oficial", "Tasa Oficial (BCV)"), ("paralelo", "Tasa Mercado")):
+        fila = history.at(fuente, momento.timestamp())
+        if fila is None:
+            response += f"{nombre}: sin datos\n"
+            continue
+        registrada = datetime.datetime.fromtimestamp(fila[0], TZ_CARACAS)
+        response += f"{nombre}: {fila[1]:.4f} Bs/USD (registrada {registrada:%Y-%m-%d %H:%M})\n"
+    return response
+
+def format_historial_dia(dia, history):
+    """Arma la respuesta de /historial con el resumen de un día completo."""
+    desde = dia.timestamp()
+    hasta = desde + 86400 - 1
+    response = f"🕰 *Historial de Tasas*\nDía: {dia:%Y-%m-%d}\n\n"
+    for fuente, nombre in (("oficial", "Tasa Oficial (BCV)"), ("paralelo", "Tasa Mercado")):
+        resumen = history.summary(fuente, desde, hasta)
+        if resumen is None:
+            response += f"{nombre}: sin datos\n\n"
+            continue
+        response += (
+            f"{nombre} ({resumen['consultas']} consultas)\n"
+            f"  Apertura: {resumen['primera']:.4f} | Cierre: {resumen['ultima']:.4f}\n"
+            f"  Mínima: {resumen['minima']:.4f} | Máxima: {resumen['maxima']:.4f}\n"
+            f"  Promedio: {resumen['promedio']:.4f} Bs/USD\n\n"
+        )
+    return response
+
+def _num(valor, formato, sufijo=""):
+    return "—" if valor is None else f"{valor:{formato}}{sufijo}"
+
+def format_stats(resumen):
+    """Arma la respuesta de /stats con las estadísticas móviles de cada ventana."""
+    brecha, paralelo, oficial = resumen['brecha'], resumen['paralelo'], resumen['oficial']
+    if brecha['ultimo'] is None:
+        return "📈 *Estadísticas de Tasas*\n\nTodavía no hay consultas suficientes."
+
+    response = (
+        f"📈 *Estadísticas de Tasas*\n"
+        f"Brecha actual: {_num(brecha['ultimo'], '.2f', '%')} (EWMA: {_num(brecha['ewma'], '.2f', '%')})\n"
+        f"Paralelo EWMA: {_num(paralelo['ewma'], '.4f')} | BCV EWMA: {_num(oficial['ewma'], '.4f')}\n"
+    )
+    for ventana, _ in VENTANAS:
+        b, p, o = brecha[ventana], paralelo[ventana], oficial[ventana]
+        response += (
+            f"\n*Últimas {ventana}* ({p['n']} consultas)\n"
+            f"Brecha: media {_num(b['media'], '.2f', '%')} | mín {_num(b['min'], '.2f', '%')} | "
+            f"máx {_num(b['max'], '.2f', '%')} | desv. {_num(b['desviacion'], '.2f')}\n"
+            f"Paralelo: media {_num(p['media'], '.2f')} | mín {_num(p['min'], '.2f')} | máx {_num(p['max'], '.2f')}\n"
+            f"  cambio {_num(p['cambio_pct'], '+.2f', '%')} | volatilidad {_num(p['volatilidad'], '.3f', '%')}\n"
+            f"BCV: media {_num(o['media'], '.2f')} | cambio {_num(o['cambio_pct'], '+.2f', '%')}\n"
+        )
+    return response
+
+def format_stats_breve(resumen):
+    """Resumen de una línea por ventana para el reporte periódico."""
+    brecha, paralelo = resumen['brecha'], resumen['paralelo']
+    if brecha['ultimo'] is None:
+        return ""
+    response = "📈 *Tendencia*\n"
+    for ventana, _ in VENTANAS:
+        b, p = brecha[ventana], paralelo[ventana]
+        response += (
+            f"{ventana}: paralelo {_num(p['cambio_pct'], '+.2f', '%')}, "
+            f"brecha {_num(b['min'], '.2f', '%')}–{_num(b['max'], '.2f', '%')} (media {_num(b['media'], '.2f', '%')})\n"
+        )
+    return response
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Maneja /stats con las estadísticas móviles de las tasas y la brecha."""
+    # Solo el shard 0 consulta las tasas: los demás se ponen al día desde el historial compartido
+    await asyncio.to_thread(get_analytics().load, get_history())
+    await update.message.reply_text(format_stats(get_analytics().summary()), parse_mode="Markdown")
+
+async def chart(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Maneja /chart [24h|7d|30d] con el gráfico del paralelo, el BCV y la brecha."""
+    rango = context.args[0].lower() if context.args else RANGO_DEFECTO
+    if len(context.args) > 1 or rango not in RANGOS:
+        await update.message.reply_text(f"Uso: `/chart {'|'.join(RANGOS)}`", parse_mode="Markdown")
+        return
+    if not CHARTS_AVAILABLE:
+        await update.message.reply_text("📉 Los gráficos no están disponibles en este servidor.")
+        return
+
+    leyenda = f"📉 Paralelo vs BCV y brecha — últimas {rango}"
+    # Cada imagen se sube una sola vez; después se reenvía por su file_id
+    subidas = context.bot_data.setdefault('chart_file_ids', {})   # rango -> (ruta, file_id)
+    for _ in range(2):
+        with metrics.span("grafico"):
+            ruta = await get_chart_renderer().render(rango)
+        if ruta is None:
+            await update.message.reply_text("Todavía no hay datos en el historial para graficar.")
+            return
+
+        anterior = subidas.get(rango)
+        if anterior is not None and anterior[0] == ruta:
+            await update.message.reply_photo(photo=anterior[1], caption=leyenda)
+            return
+        try:
+            imagen = open(ruta, "rb")
+        except FileNotFoundError:
+            # Llegaron datos nuevos y la versión ya se podó: se pide la actual
+            continue
+        with imagen:
+            mensaje = await update.message.reply_photo(photo=imagen, caption=leyenda)
+        subidas[rango] = (ruta, mensaje.photo[-1].file_id)
+        return
+    await update.message.reply_text("📉 No se pudo preparar el gráfico. Intenta de nuevo en unos segundos.")
+
+async def historial(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Maneja /historial AAAA-MM-DD [HH:MM] consultando el historial local."""
+    try:
+        if len(context.args) == 1:
+            dia = datetime.datetime.strptime(context.args[0], '%Y-%m-%d')
+            consulta = (format_historial_dia, TZ_CARACAS.localize(dia))
+        elif len(context.args) == 2:
+            momento = datetime.datetime.strptime(' '.join(context.args), '%Y-%m-%d %H:%M')
+            consulta = (format_historial_momento, TZ_CARACAS.localize(momento))
+        else:
+            raise ValueError
+    except ValueError:
+        await update.message.reply_text(
+            "Uso: `/historial AAAA-MM-DD` o `/historial AAAA-MM-DD HH:MM` (hora de Caracas)",
+            parse_mode="Markdown"
+        )
+        return
+
+    # Las consultas a SQLite, fuera del event loop
+    response = await asyncio.to_thread(*consulta, get_history())
+    await update.message.reply_text(response, parse_mode="Markdown")
+
+async def subscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Maneja /subscribe: agrega el chat a la lista del reporte periódico."""
+    if await asyncio.to_thread(subscriptions.add, update.effective_chat.id):
+        text = "✅ Suscrito. Recibirás el reporte de tasas periódicamente. Usa /unsubscribe para dejar de recibirlo."
+    else:
+        text = "Ya estás suscrito al reporte de tasas."
+    await update.message.reply_text(text)
+
+async def unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Maneja /unsubscribe: saca el chat de la lista del reporte periódico."""
+    if await asyncio.to_thread(subscriptions.remove, update.effective_chat.id):
+        text = "Listo, ya no recibirás el reporte de tasas. Usa /subscribe para volver a recibirlo."
+    else:
+        text = "No estabas suscrito al reporte de tasas."
+    await update.message.reply_text(text)
+
+async def alertas(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Maneja /alertas [bs|pct|iac] [valor|off] para configurar los umbrales del chat."""
+    chat_id = update.effective_chat.id
+    prefs = await asyncio.to_thread(subscriptions.get, chat_id)
+
+    if not context.args:
+        actuales = describe_alertas(prefs) if prefs is not None else "No tienes alertas activas."
+        await update.message.reply_text(
+            "🔔 *Tus alertas*\n" + actuales + "\n\n"
+            "Configura con `/alertas bs 5`, `/alertas pct 1.5` o `/alertas iac 40`.\n"
+            "Desactiva con `/alertas bs off`.",
+            parse_mode="Markdown"
+        )
+        return
+
+    tipo = context.args[0].lower()
+    if tipo not in TIPOS_ALERTA or len(context.args) != 2:
+        await update.message.reply_text("❌ Uso: `/alertas bs|pct|iac <valor|off>`", parse_mode="Markdown")
+        return
+
+    nuevas = dict((prefs or {}).get('alertas', ALERTAS_DEFECTO))
+    if context.args[1].lower() == 'off':
+        nuevas.pop(tipo, None)
+    else:
+        try:
+            umbral = float(context.args[1])
+        except ValueError:
+            await update.message.reply_text("❌ Formato incorrecto. El umbral debe ser un número.")
+            return
+        if umbral <= 0 and tipo != 'iac':
+            await update.message.reply_text("❌ El umbral debe ser mayor que cero.")
+            return
+        nuevas[tipo] = umbral
+
+    # Las alertas se guardan con la suscripción: un chat nuevo queda suscrito también al reporte diario
+    suscrito = await asyncio.to_thread(subscriptions.add, chat_id)
+    # Al cambiar los umbrales se toma la próxima consulta como nueva referencia
+    await asyncio.to_thread(subscriptions.update, chat_id, alertas=nuevas, ref_paralelo=None, iac_arriba=None)
+    text = "✅ Alertas actualizadas:\n" + describe_alertas({'alertas': nuevas})
+    if suscrito:
+        text += ("\n\nTambién quedaste suscrito al reporte diario de tasas. "
+                 "Usa /unsubscribe para dejar de recibir el reporte y las alertas.")
+    await update.message.reply_text(text)
+
 # --- Configuración de comandos del bot ---
 async def post_init(application: ApplicationBuilder):
     """Registra los comandos del bot en la API de Telegram."""
+    # Responder desde el primer mensaje con la última tasa guardada
+    load_last_known_good()
+    # Las estadísticas móviles arrancan con lo que ya hay en el historial
+    await asyncio.to_thread(get_analytics().load, get_history())
+
     commands = [
         BotCommand("start", "Inicia una conversación con el bot y muestra el menú."),
+        BotCommand("subscribe", "Recibe el reporte periódico de tasas."),
+        BotCommand("unsubscribe", "Deja de recibir el reporte periódico de tasas."),
+        BotCommand("alertas", "Configura avisos cuando las tasas se muevan: /alertas bs|pct|iac <valor>"),
+        BotCommand("historial", "Consulta las tasas de una fecha: /historial AAAA-MM-DD [HH:MM]"),
+        BotCommand("stats", "Promedios, mínimos, máximos y volatilidad de las últimas 24 h y 7 días."),
+        BotCommand("chart", "Gráfico del paralelo, el BCV y la brecha: /chart 24h|7d|30d"),
     ]
     await application.bot.set_my_commands(commands)
     logging.info("Comandos del bot registrados correctamente.")
 
-if __name__ == "__main__":
-    application = ApplicationBuilder().token(BOT_TOKEN).post_init(post_init).build()
+    # Un solo broadcaster para que los límites de envío valgan entre reportes
+    application.bot_data['broadcaster'] = Broadcaster(
+        application.bot, on_blocked=subscriptions.remove_many, on_migrated=subscriptions.migrate)
+    application.bot_data['watcher'] = RateWatcher(subscriptions)
+
+    # La primera vez, el chat configurado queda suscrito como antes
+    subscriptions.seed(CHAT_ID)
+
+    # Retraso del event loop mientras el bot esté vivo
+    if METRICS_ENABLED:
+        application.bot_data['monitor_loop'] = asyncio.create_task(metrics.monitor_event_loop())
+
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """Registra las excepciones no manejadas y cuenta los errores de envío a Telegram."""
+    if isinstance(context.error, TelegramError):
+        metrics.envio_errores.inc(type(context.error).__name__)
+    logging.error("Error procesando un update", exc_info=context.error)
+
+async def post_shutdown(application: ApplicationBuilder):
+    """Libera las conexiones HTTP persistentes y los procesos de gráficos al apagar el bot."""
+    monitor = application.bot_data.pop('monitor_loop', None)
+    if monitor is not None:
+        monitor.cancel()
+    await close_http_client()
+    shutdown_charts()
+
+def build_application():
+    """Crea la aplicación con sus jobs y handlers, lista para polling o webhook."""
+    application = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(PerUserUpdateProcessor(admision=AdmissionControl()))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
-    # Crea el JobQueue para tareas programadas
-    job_queue = application.job_queue
+    # Las tareas programadas corren en un solo proceso, el del shard 0
+    if SHARD_INDEX == 0:
+        # Crea el JobQueue para tareas programadas
+        job_queue = application.job_queue
 
-    # 1. Programa el envío del reporte cada 3600 segundos (1 hora)
-    job_queue.run_repeating(send_hourly_report, interval=3600, first=datetime.time(tzinfo=pytz.timezone('America/Caracas')), data=CHAT_ID)
+        # 1. Consulta las tasas cada POLL_INTERVAL segundos y envía alertas solo si hubo cambios
+        job_queue.run_repeating(metrics.instrument_job('poll_rates', poll_rates, POLL_INTERVAL), interval=POLL_INTERVAL, first=1)
 
-    # 2. Lanza el primer reporte inmediatamente al iniciar
-    job_queue.run_once(send_hourly_report, when=1, data=CHAT_ID)
+        # 2. Reporte completo una vez al día
+        job_queue.run_daily(metrics.instrument_job('send_daily_report', send_daily_report, 86400), time=HORA_REPORTE)
+
+        # 3. Mantenimiento diario del historial de tasas
+        job_queue.run_repeating(mantenimiento_historial, interval=86400, first=60)
+
+    # Cada shard purga su propio almacén de estados (con dbm, un archivo por shard)
+    application.job_queue.run_repeating(purgar_estados, interval=86400, first=90)
 
     # Añade los handlers para la interacción a demanda
-    application.add_handler(CommandHandler('start', start))
-    application.add_handler(CallbackQueryHandler(button_handler))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
+    application.add_handler(CommandHandler('start', metrics.instrument_handler('start', start)))
+    application.add_handler(CommandHandler('historial', metrics.instrument_handler('historial', historial)))
+    application.add_handler(CommandHandler('stats', metrics.instrument_handler('stats', stats)))
+    application.add_handler(CommandHandler('chart', metrics.instrument_handler('chart', chart)))
+    application.add_handler(CommandHandler('subscribe', metrics.instrument_handler('subscribe', subscribe)))
+    application.add_handler(CommandHandler('unsubscribe', metrics.instrument_handler('unsubscribe', unsubscribe)))
+    application.add_handler(CommandHandler('alertas', metrics.instrument_handler('alertas', alertas)))
+    application.add_handler(CallbackQueryHandler(metrics.instrument_handler('button_handler', button_handler)))
+    application.add_handler(InlineQueryHandler(metrics.instrument_handler('inline_query', inline_query)))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, metrics.instrument_handler('message_handler', message_handler)))
+    application.add_error_handler(error_handler)
+    return application
+
+def start_observability():
+    """Arranca el servidor de métricas y las trazas según la configuración."""
+    if METRICS_ENABLED:
+        metrics.start_metrics_server()
+    if TRACE_UPDATES:
+        metrics.enable_tracing()
+
+if __name__ == "__main__":
+    # Modo polling, para desarrollo. En producción: python -m app.webhook
+    start_observability()
+    application = build_application()
 
     print("Bot interactivo iniciado. Envía /start en Telegram para interactuar.")
-    application.run_polling()
\ No newline at end of file
+    application.run_polling()
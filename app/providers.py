@@ -0,0 +1,295 @@
+# app/providers.py
+import abc
+import asyncio
+import datetime
+import statistics
+import time
+from collections import namedtuple
+
+from app import metrics
+
+# --- Configuración por defecto del agregador ---
+POLITICA = "median"      # median | priority | freshest
+PRESUPUESTO = 4.0        # segundos máximos por consulta agregada
+HEDGE_DELAY = 0.3        # segundos sin respuesta antes de lanzar el siguiente proveedor
+GRACIA = 0.2             # segundos que se espera a otros proveedores tras la primera respuesta
+BREAKER_FALLAS = 3       # fallas seguidas para abrir el circuito
+BREAKER_RESET = 30.0     # segundos con el circuito abierto antes de volver a probar
+
+POLITICAS = ("median", "priority", "freshest")
+
+RateQuote = namedtuple("RateQuote", ["proveedor", "prioridad", "tasa_bcv", "tasa_mercado", "obtenido_en"])
+
+
+class ProviderError(Exception):
+    """Un proveedor no pudo entregar tasas válidas."""
+
+
+def _fecha(valor):
+    """Convierte la fecha ISO de la API a epoch; si no se puede, usa el momento actual."""
+    try:
+        return datetime.datetime.fromisoformat(valor.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return time.time()
+
+
+class Provider(abc.ABC):
+    """Fuente de tasas. Las subclases implementan `fetch`."""
+
+    def __init__(self, nombre, prioridad=0):
+        self.nombre = nombre
+        self.prioridad = prioridad
+
+    @abc.abstractmethod
+    async def fetch(self, client):
+        """Devuelve un RateQuote o lanza ProviderError."""
+
+    def _quote(self, tasa_bcv, tasa_mercado, obtenido_en=None):
+        if not tasa_bcv or not tasa_mercado or tasa_bcv <= 0 or tasa_mercado <= 0:
+            raise ProviderError(f"{self.nombre}: tasas inválidas ({tasa_bcv}, {tasa_mercado})")
+        return RateQuote(self.nombre, self.prioridad, float(tasa_bcv), float(tasa_mercado),
+                         obtenido_en if obtenido_en is not None else time.time())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.nombre!r})"
+
+
+class DolarApiProvider(Provider):
+    """ve.dolarapi.com: un solo GET con todas las fuentes."""
+
+    def __init__(self, nombre="dolarapi", url="https://ve.dolarapi.com/v1/dolares", prioridad=0):
+        super().__init__(nombre, prioridad)
+        self.url = url
+
+    async def fetch(self, client):
+        response = await client.get(self.url)
+        response.raise_for_status()
+        try:
+            data = response.json()
+            oficial = next(item for item in data if item["fuente"] == "oficial")
+            paralelo = next(item for item in data if item["fuente"] == "paralelo")
+        except (KeyError, StopIteration, ValueError, TypeError) as e:
+            raise ProviderError(f"{self.nombre}: la estructura de la API ha cambiado") from e
+        return self._quote(oficial["promedio"], paralelo["promedio"], _fecha(paralelo.get("fechaActualizacion")))
+
+
+class DolarApiFuentesProvider(Provider):
+    """ve.dolarapi.com por endpoint de cada fuente; sigue sirviendo si falla el listado."""
+
+    def __init__(self, nombre="dolarapi-fuentes", url="https://ve.dolarapi.com/v1/dolares", prioridad=1):
+        super().__init__(nombre, prioridad)
+        self.url = url.rstrip("/")
+
+    async def fetch(self, client):
+        oficial, paralelo = await asyncio.gather(
+            client.get(f"{self.url}/oficial"),
+            client.get(f"{self.url}/paralelo"),
+        )
+        oficial.raise_for_status()
+        paralelo.raise_for_status()
+        try:
+            oficial, paralelo = oficial.json(), paralelo.json()
+            return self._quote(oficial["promedio"], paralelo["promedio"], _fecha(paralelo.get("fechaActualizacion")))
+        except (KeyError, ValueError, TypeError) as e:
+            raise ProviderError(f"{self.nombre}: la estructura de la API ha cambiado") from e
+
+
+def _extraer(datos, ruta):
+    """Valor de `datos` en la ruta 'a.b.0.c' (claves de diccionario o índices de lista)."""
+    for parte in ruta.split("."):
+        datos = datos[int(parte)] if isinstance(datos, list) else datos[parte]
+    return float(datos)
+
+
+class JsonProvider(Provider):
+    """
+    Cualquier API que devuelva ambas tasas en un JSON: `ruta_bcv` y
+    `ruta_paralelo` indican dónde está cada una ('monitors.bcv.price').
+    Sirve para sumar una fuente independiente de dolarapi.
+    """
+
+    def __init__(self, nombre, url, ruta_bcv, ruta_paralelo, prioridad=2):
+        super().__init__(nombre, prioridad)
+        self.url = url
+        self.ruta_bcv = ruta_bcv
+        self.ruta_paralelo = ruta_paralelo
+
+    async def fetch(self, client):
+        response = await client.get(self.url)
+        response.raise_for_status()
+        try:
+            data = response.json()
+            return self._quote(_extraer(data, self.ruta_bcv), _extraer(data, self.ruta_paralelo))
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            raise ProviderError(f"{self.nombre}: la estructura de la API ha cambiado") from e
+
+
+class StaticProvider(Provider):
+    """Proveedor local para pruebas: tasas fijas, latencia y fallas configurables."""
+
+    def __init__(self, nombre, tasa_bcv, tasa_mercado, prioridad=0, latencia=0.0, falla=None, obtenido_en=None):
+        super().__init__(nombre, prioridad)
+        self.tasa_bcv = tasa_bcv
+        self.tasa_mercado = tasa_mercado
+        self.latencia = latencia
+        self.falla = falla
+        self.obtenido_en = obtenido_en
+        self.llamadas = 0
+
+    async def fetch(self, client):
+        self.llamadas += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        if self.falla is not None:
+            raise self.falla
+        return self._quote(self.tasa_bcv, self.tasa_mercado, self.obtenido_en)
+
+
+class CircuitBreaker:
+    """
+    Tras `fallas` errores seguidos deja de consultar al proveedor durante
+    `reset` segundos; después permite una prueba y se cierra si sale bien.
+    """
+
+    def __init__(self, fallas=BREAKER_FALLAS, reset=BREAKER_RESET):
+        self.fallas = fallas
+        self.reset = reset
+        self.errores = 0
+        self.abierto_hasta = 0.0
+
+    @property
+    def estado(self):
+        if self.errores < self.fallas:
+            return "cerrado"
+        return "abierto" if time.monotonic() < self.abierto_hasta else "semiabierto"
+
+    def allow(self):
+        return self.estado != "abierto"
+
+    def record_success(self):
+        self.errores = 0
+        self.abierto_hasta = 0.0
+
+    def record_failure(self):
+        self.errores += 1
+        if self.errores >= self.fallas:
+            self.abierto_hasta = time.monotonic() + self.reset
+
+
+def combine(quotes, politica=POLITICA):
+    """Combina varias respuestas en una según la política."""
+    if politica == "priority":
+        return min(quotes, key=lambda q: q.prioridad)
+    if politica == "freshest":
+        return max(quotes, key=lambda q: q.obtenido_en)
+    if politica == "median":
+        return RateQuote(
+            "+".join(sorted(q.proveedor for q in quotes)),
+            min(q.prioridad for q in quotes),
+            statistics.median(q.tasa_bcv for q in quotes),
+            statistics.median(q.tasa_mercado for q in quotes),
+            max(q.obtenido_en for q in quotes),
+        )
+    raise ValueError(f"Política desconocida: {politica}")
+
+
+class RateAggregator:
+    """
+    Consulta varios proveedores con solicitudes escalonadas (hedging): lanza
+    el de mayor prioridad y, si no responde en `hedge_delay` o falla, lanza
+    el siguiente. La primera respuesta válida cierra la ronda; los que ya
+    estaban en vuelo tienen `gracia` segundos más para sumarse a la
+    combinación. Nada pasa de `presupuesto` segundos.
+    """
+
+    def __init__(self, providers, politica=POLITICA, presupuesto=PRESUPUESTO, hedge_delay=HEDGE_DELAY, gracia=GRACIA):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política desconocida: {politica}")
+        self.providers = sorted(providers, key=lambda p: p.prioridad)
+        self.politica = politica
+        self.presupuesto = presupuesto
+        self.hedge_delay = hedge_delay
+        self.gracia = gracia
+        self.breakers = {p.nombre: CircuitBreaker() for p in self.providers}
+
+    async def fetch(self, client):
+        """Devuelve el RateQuote combinado, o lanza ProviderError si nadie respondió."""
+        loop = asyncio.get_running_loop()
+        candidatos = [p for p in self.providers if self.breakers[p.nombre].allow()]
+        if not candidatos:
+            raise ProviderError("Todos los proveedores tienen el circuito abierto.")
+
+        limite = loop.time() + self.presupuesto
+        en_vuelo = {}
+        quotes = []
+        errores = []
+
+        def lanzar():
+            proveedor = candidatos.pop(0)
+            en_vuelo[asyncio.ensure_future(self._fetch_medido(proveedor, client))] = proveedor
+
+        lanzar()
+        fin_gracia = None
+        try:
+            while en_vuelo:
+                ahora = loop.time()
+                if fin_gracia is not None:
+                    espera = min(limite, fin_gracia) - ahora
+                elif candidatos:
+                    espera = min(limite - ahora, self.hedge_delay)
+                else:
+                    espera = limite - ahora
+                if espera <= 0:
+                    break
+
+                hechas, _ = await asyncio.wait(en_vuelo, timeout=espera, return_when=asyncio.FIRST_COMPLETED)
+                fallo = False
+                for tarea in hechas:
+                    proveedor = en_vuelo.pop(tarea)
+                    breaker = self.breakers[proveedor.nombre]
+                    try:
+                        quotes.append(tarea.result())
+                        breaker.record_success()
+                    except Exception as e:
+                        breaker.record_failure()
+                        errores.append(f"{proveedor.nombre}: {e!r}")
+                        fallo = True
+
+                if quotes:
+                    if fin_gracia is None:
+                        fin_gracia = loop.time() + self.gracia
+                elif candidatos and (fallo or not hechas):
+                    # Nadie respondió a tiempo o uno falló: escalonar al siguiente
+                    lanzar()
+
+            # Si se agotó el presupuesto sin ninguna respuesta, los que siguen en vuelo
+            # cuentan como falla (si no, un proveedor colgado nunca abriría su circuito).
+            # Los que solo perdieron la carrera contra la gracia se cancelan sin castigo.
+            if not quotes:
+                for proveedor in en_vuelo.values():
+                    self.breakers[proveedor.nombre].record_failure()
+                    errores.append(f"{proveedor.nombre}: tiempo agotado")
+        finally:
+            for tarea in en_vuelo:
+                tarea.cancel()
+
+        if not quotes:
+            raise ProviderError("Ningún proveedor respondió: " + "; ".join(errores or ["tiempo agotado"]))
+        return combine(quotes, self.politica)
+
+    async def _fetch_medido(self, proveedor, client):
+        inicio = time.perf_counter()
+        resultado = "error"
+        try:
+            quote = await proveedor.fetch(client)
+            resultado = "ok"
+            return quote
+        except asyncio.CancelledError:
+            resultado = "cancelado"
+            raise
+        finally:
+            metrics.upstream_latencia.observe(proveedor.nombre, resultado, valor=time.perf_counter() - inicio)
+
+    def status(self):
+        """Estado del circuito de cada proveedor."""
+        return {nombre: breaker.estado for nombre, breaker in self.breakers.items()}
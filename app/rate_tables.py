@@ -0,0 +1,165 @@
+# app/rate_tables.py
+"""
+Motor de cálculo compartido por la CLI, el bot, el modo inline y
+app/calculations.py, sobre las fórmulas de app/scenarios.py (las mismas de
+las grillas del modo lote). Todo lo que depende solo de las tasas
+(escalera, factores por tasa, valores con IGTF, indicadores del reporte)
+se calcula una vez por juego de tasas en `RateTables`; por consulta solo
+se aplica el monto y se devuelve un registro compacto con los resultados.
+
+Los registros no saben presentarse: los textos para Telegram, la terminal
+y JSON se arman en app/render.py a partir del mismo registro.
+"""
+import functools
+import itertools
+
+import numpy as np
+
+from app.scenarios import (IGTF, conversion_grid, opportunity_amounts, opportunity_factors, purchase_amounts,
+                           purchase_factors, rate_ladder)
+
+# --- Configuración de la escalera ---
+PASO_ESCALERA = 10    # Bs/USD entre una tasa y la siguiente
+PASOS_ESCALERA = 6    # cantidad de tasas, empezando por la de mercado redondeada
+
+_versiones = itertools.count(1)
+
+
+class PurchaseResult:
+    """Análisis de compra: una entrada por tasa de la escalera en cada columna."""
+
+    __slots__ = ("tablas", "costo", "dolares", "poder_compra", "monto_exacto", "diferencia", "suficiente")
+
+    def __init__(self, tablas, costo, dolares):
+        self.tablas = tablas
+        self.costo = costo
+        self.dolares = dolares
+        columnas = purchase_amounts(tablas._fpc, costo, dolares)
+        self.poder_compra, self.monto_exacto, self.diferencia, self.suficiente = (
+            tuple(columna.tolist()) for columna in columnas)
+
+    @property
+    def tasas(self):
+        return self.tablas.escalera
+
+
+class OpportunityResult:
+    """Costo de oportunidad de vender a cada tasa en lugar de a la mejor."""
+
+    __slots__ = ("tablas", "dolares", "perdida_bolivares", "perdida_usd_bcv", "perdida_usd_mercado",
+                 "poder_compra_bcv")
+
+    def __init__(self, tablas, dolares):
+        self.tablas = tablas
+        self.dolares = dolares
+        columnas = opportunity_amounts(tablas._tasas_oportunidad, tablas._diferencia_oportunidad, dolares,
+                                       tablas.tasa_max, tablas.tasa_bcv)
+        self.perdida_bolivares, self.perdida_usd_bcv, self.perdida_usd_mercado, self.poder_compra_bcv = (
+            tuple(columna.tolist()) for columna in columnas)
+
+    @property
+    def tasas(self):
+        return self.tablas.tasas_oportunidad
+
+
+class ConversionResult:
+    """Un precio en USD llevado a Bs a tasa BCV, de mercado, con IGTF y en la escalera."""
+
+    __slots__ = ("tablas", "usd", "precio_bcv", "precio_mercado", "precio_mercado_igtf", "diferencia",
+                 "diferencia_igtf", "precios_rango", "diferencias_rango")
+
+    def __init__(self, tablas, usd):
+        self.tablas = tablas
+        self.usd = usd
+        # Primero la tasa de mercado y después la escalera, en una sola conversión
+        grilla = conversion_grid(usd, tablas.tasa_bcv, tablas._tasas_conversion, tablas.igtf)
+        self.precio_bcv = grilla.precio_bcv.item()
+        self.precio_mercado, *precios_rango = grilla.precio_mercado.tolist()
+        self.precio_mercado_igtf = grilla.precio_mercado_igtf[0].item()
+        self.diferencia, *diferencias_rango = grilla.diferencia.tolist()
+        self.diferencia_igtf = grilla.diferencia_igtf[0].item()
+        self.precios_rango = tuple(precios_rango)
+        self.diferencias_rango = tuple(diferencias_rango)
+
+    @property
+    def tasas(self):
+        return self.tablas.escalera
+
+
+class RateTables:
+    """
+    Todo lo que los cálculos necesitan de un juego de tasas. `version`
+    cambia con cada juego nuevo y sirve como clave de cachés derivadas.
+
+    `escalera` reemplaza la escalera por defecto (la tasa redondeada y las
+    que le siguen de `paso` en `paso`); el costo de oportunidad compara
+    siempre todas sus tasas menos la primera contra la primera.
+    """
+
+    def __init__(self, tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada,
+                 paso=PASO_ESCALERA, pasos=PASOS_ESCALERA, igtf=IGTF, escalera=None):
+        self.version = next(_versiones)
+        self.tasa_bcv = tasa_bcv
+        self.tasa_mercado_cruda = tasa_mercado_cruda
+        self.tasa_mercado_redondeada = tasa_mercado_redondeada
+        if escalera is None:
+            escalera = rate_ladder(tasa_mercado_redondeada, paso, pasos).tolist()
+        self.escalera = tuple(escalera)
+        tasas = np.array(self.escalera, dtype=np.float64)
+
+        # Análisis de compra: FPC e IAC de cada tasa
+        self._fpc, iac_compra = purchase_factors(tasas, tasa_bcv)
+        self.fpc = tuple(self._fpc.tolist())
+        self.iac_compra = tuple(iac_compra.tolist())
+
+        # Costo de oportunidad: todas las tasas menos la mejor, contra la mejor
+        self.tasa_max = self.escalera[0] if self.escalera else tasa_mercado_redondeada
+        self._tasas_oportunidad = tasas[1:]
+        self._diferencia_oportunidad, iac_oportunidad, factor_perdida = opportunity_factors(
+            self._tasas_oportunidad, self.tasa_max)
+        self.tasas_oportunidad = self.escalera[1:]
+        self.diferencia_oportunidad = tuple(self._diferencia_oportunidad.tolist())
+        self.iac_oportunidad = tuple(iac_oportunidad.tolist())
+        self.factor_perdida = tuple(factor_perdida.tolist())
+
+        # Conversión de divisas: las tasas con IGTF son la conversión de 1 USD
+        self.igtf = igtf
+        self._tasas_conversion = np.concatenate(([tasa_mercado_cruda], tasas))
+        unidad = conversion_grid(1.0, tasa_bcv, tasa_mercado_cruda, igtf)
+        self.tasa_mercado_igtf = unidad.precio_mercado_igtf.item()
+        self.diferencia_igtf = unidad.diferencia_igtf.item()
+        self.diferencia_igtf_pct = (self.diferencia_igtf / tasa_bcv) * 100
+
+        # Reporte de tasas
+        self.diferencia = tasa_mercado_cruda - tasa_bcv
+        self.diferencia_pct = (self.diferencia / tasa_bcv) * 100
+        fpc_mercado, iac = purchase_factors(tasa_mercado_cruda, tasa_bcv)
+        self.fpc_mercado = float(fpc_mercado)
+        self.iac = float(iac)
+
+        self._plantillas = {}
+
+    def purchase(self, costo_producto, dolares_disponibles):
+        return PurchaseResult(self, costo_producto, dolares_disponibles)
+
+    def opportunity(self, dolares_a_vender):
+        return OpportunityResult(self, dolares_a_vender)
+
+    def conversion(self, usd_price):
+        return ConversionResult(self, usd_price)
+
+    def prerendered(self, clave, armar):
+        """
+        Texto que depende solo de las tasas, armado con `armar(self)` la
+        primera vez que un renderizador lo pide y reutilizado después.
+        """
+        texto = self._plantillas.get(clave)
+        if texto is None:
+            texto = self._plantillas[clave] = armar(self)
+        return texto
+
+
+@functools.lru_cache(maxsize=4)
+def rate_tables(tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada):
+    """Tablas del juego de tasas dado; se arman una sola vez mientras las tasas no cambien."""
+    return RateTables(tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada)
@@ -0,0 +1,268 @@
+# app/render.py
+"""
+Presentación de los resultados de app/rate_tables.py: Markdown para
+Telegram, tablas para la terminal y JSON; y de las grillas de
+app/scenarios.py como filas CSV/JSONL del modo lote. Ninguna función
+calcula; solo formatea lo que ya trae el registro o la grilla. Las partes
+que dependen solo de las tasas se arman una vez por juego de tasas con
+`RateTables.prerendered`.
+"""
+import json
+
+import numpy as np
+
+from app.rate_tables import ConversionResult, OpportunityResult, PurchaseResult
+
+SEPARADOR = "=======================================\n"
+
+# --- Telegram (Markdown) ---
+
+_CABECERA_COMPRA = SEPARADOR + "{:<10} | {:<8} | {:<12}\n".format("Tasa", "Poder Compra", "Resultado")
+_CABECERA_OPORTUNIDAD = SEPARADOR + "{:<10} | {:<10} | {:<12} | {:<20}\n".format(
+    "Tasa", "Pérdida (Bs)", "Pérdida ($Merc)", "Poder de Compra (BCV USD)")
+_CABECERA_RANGO = (
+    "---------------------------------------\n\n"
+    "Precios en un rango de tasas:\n"
+    "{:<10} | {:<12} | {:<15}\n".format("Tasa", "Precio (Bs)", "Diferencia (Bs)")
+)
+
+TITULO_REPORTE = "📊 *Reporte de Tasas de Cambio*"
+TITULO_REPORTE_AUTOMATICO = "⏰ *Reporte de Tasas de Cambio (Automático)*"
+
+
+def _columna_tasas(tasas):
+    return tuple("{:<10.2f} | ".format(tasa) for tasa in tasas)
+
+
+def _tasas_conversion(tablas):
+    return (
+        f"Tasa BCV: {tablas.tasa_bcv:.2f} Bs/USD\n"
+        f"Tasa Mercado: {tablas.tasa_mercado_cruda:.2f} Bs/USD\n"
+        f"Tasa Mercado + IGTF: {tablas.tasa_mercado_igtf:.2f} Bs/USD\n"
+        f"  (Diferencia vs BCV: {tablas.diferencia_igtf:.2f} Bs/USD | {tablas.diferencia_igtf_pct:.2f}%)\n"
+        f"{SEPARADOR}\n"
+    )
+
+
+def telegram_purchase(resultado):
+    tablas = resultado.tablas
+    prefijos = tablas.prerendered("telegram.tasas", lambda t: _columna_tasas(t.escalera))
+    partes = [
+        f"📊 *Análisis de Compra*\n"
+        f"Producto: ${resultado.costo:.2f} | Divisas: ${resultado.dolares:.2f}\n",
+        _CABECERA_COMPRA,
+    ]
+    for prefijo, poder_compra, suficiente in zip(prefijos, resultado.poder_compra, resultado.suficiente):
+        partes.append(prefijo + "{:<8.2f} | {:<12}\n".format(poder_compra, "Sí" if suficiente else "No"))
+    return "".join(partes)
+
+
+def telegram_opportunity(resultado):
+    tablas = resultado.tablas
+    prefijos = tablas.prerendered("telegram.tasas_oportunidad", lambda t: _columna_tasas(t.tasas_oportunidad))
+    partes = [
+        f"📊 *Costo de Oportunidad*\n"
+        f"Divisas: ${resultado.dolares:.2f}\n",
+        _CABECERA_OPORTUNIDAD,
+    ]
+    for fila in zip(prefijos, resultado.perdida_bolivares, resultado.perdida_usd_mercado, resultado.poder_compra_bcv):
+        partes.append(fila[0] + "{:<10.2f} | {:<12.2f} | {:<20.2f}\n".format(*fila[1:]))
+    return "".join(partes)
+
+
+def telegram_conversion(resultado):
+    tablas = resultado.tablas
+    prefijos = tablas.prerendered("telegram.tasas", lambda t: _columna_tasas(t.escalera))
+    partes = [
+        f"💰 *Conversión de Divisas*\n"
+        f"Monto en USD: ${resultado.usd:.2f}\n",
+        tablas.prerendered("telegram.tasas_conversion", _tasas_conversion),
+        f"Precio en Bs (BCV): {resultado.precio_bcv:.2f}\n"
+        f"Precio en Bs (Mercado con IGTF): {resultado.precio_mercado_igtf:.2f}\n"
+        f"Diferencia (con {tablas.igtf * 100:.2f}% IGTF): {resultado.diferencia_igtf:.2f}\n",
+        _CABECERA_RANGO,
+    ]
+    for prefijo, precio, diferencia in zip(prefijos, resultado.precios_rango, resultado.diferencias_rango):
+        partes.append(prefijo + "{:<12.2f} | {:<15.2f}\n".format(precio, diferencia))
+    return "".join(partes)
+
+
+_TELEGRAM = {
+    PurchaseResult: telegram_purchase,
+    OpportunityResult: telegram_opportunity,
+    ConversionResult: telegram_conversion,
+}
+
+
+def telegram(resultado):
+    """Respuesta del bot para cualquier resultado del motor."""
+    return _TELEGRAM[type(resultado)](resultado)
+
+
+def rates_report(tablas, titulo=TITULO_REPORTE):
+    """Reporte de las tasas del juego; se arma una sola vez por título."""
+    return tablas.prerendered("reporte." + titulo, lambda t: (
+        f"{titulo}\n\n"
+        f"Tasa Oficial (BCV): {t.tasa_bcv:.4f} Bs/USD\n"
+        f"Tasa Mercado (Cruda): {t.tasa_mercado_cruda:.4f} Bs/USD\n"
+        f"Tasa Mercado (Redondeada): {t.tasa_mercado_redondeada:.4f} Bs/USD\n\n"
+        f"Diferencia Cambiaria: {t.diferencia:.4f} Bs/USD ({t.diferencia_pct:.2f}%)\n"
+        f"IAC (%): {t.iac:.2f}%\n"
+        f"FPC: {t.fpc_mercado:.4f}\n"
+    ))
+
+
+# --- Terminal ---
+
+def terminal_purchase(resultado):
+    tablas = resultado.tablas
+    lineas = [
+        "\n" + "=" * 115,
+        f"Análisis de Compra | Producto: ${resultado.costo:.2f} | Divisas: ${resultado.dolares:.2f}",
+        "=" * 115,
+        "{:<12} | {:<8} | {:<8} | {:<18} | {:<18} | {:<25}".format(
+            "Tasa", "IAC (%)", "FPC", "Poder de Compra", "Monto Exacto", "Resultado"),
+        "-" * 115,
+    ]
+    for fila in zip(tablas.escalera, tablas.iac_compra, tablas.fpc, resultado.poder_compra,
+                    resultado.monto_exacto, resultado.diferencia, resultado.suficiente):
+        tasa, iac, fpc, poder_compra, monto_exacto, diferencia, suficiente = fila
+        estado = "Sí (Sobra: ${:.4f})".format(diferencia) if suficiente else "No (Falta: ${:.4f})".format(abs(diferencia))
+        lineas.append("{:<12.4f} | {:<8.4f} | {:<8.4f} | {:<18.4f} | {:<18.4f} | {:<25}".format(
+            tasa, iac, fpc, poder_compra, monto_exacto, estado))
+    lineas.append("=" * 115)
+    return "\n".join(lineas)
+
+
+def terminal_opportunity(resultado):
+    tablas = resultado.tablas
+    lineas = [
+        "\n" + "=" * 135,
+        f"Costo de Oportunidad por Negociación | Divisas: ${resultado.dolares:.2f}",
+        "=" * 135,
+        "{:<12} | {:<12} | {:<15} | {:<15} | {:<12} | {:<18} | {:<25}".format(
+            "Tasa", "Pérdida (Bs)", "Pérdida ($BCV)", "Pérdida ($Merc.)", "IAC (%)", "Factor de Pérdida",
+            "Costo de Oportunidad"),
+        "-" * 135,
+    ]
+    for fila in zip(tablas.tasas_oportunidad, resultado.perdida_bolivares, resultado.perdida_usd_bcv,
+                    resultado.perdida_usd_mercado, tablas.iac_oportunidad, tablas.factor_perdida):
+        lineas.append("{:<12.4f} | {:<12.2f} | {:<15.4f} | {:<15.4f} | {:<12.4f} | {:<18.4f} | {:<25}".format(
+            *fila, "Pérdida por no vender a la mejor tasa"))
+    lineas.append("=" * 135)
+    return "\n".join(lineas)
+
+
+# --- JSON ---
+
+def _tasas(tablas):
+    return {
+        'tasa_bcv': tablas.tasa_bcv,
+        'tasa_mercado_cruda': tablas.tasa_mercado_cruda,
+        'tasa_mercado_redondeada': tablas.tasa_mercado_redondeada,
+    }
+
+
+def _filas(tasas, **columnas):
+    nombres = list(columnas)
+    return [dict(zip(["tasa"] + nombres, fila)) for fila in zip(tasas, *columnas.values())]
+
+
+def as_dict(resultado):
+    """Resultado como estructura serializable: tasas usadas, entradas y una fila por tasa."""
+    tablas = resultado.tablas
+    if isinstance(resultado, PurchaseResult):
+        return {
+            'tipo': 'compra', 'tasas': _tasas(tablas),
+            'costo': resultado.costo, 'dolares': resultado.dolares,
+            'filas': _filas(tablas.escalera, iac=tablas.iac_compra, fpc=tablas.fpc,
+                            poder_compra=resultado.poder_compra, monto_exacto=resultado.monto_exacto,
+                            diferencia=resultado.diferencia, suficiente=resultado.suficiente),
+        }
+    if isinstance(resultado, OpportunityResult):
+        return {
+            'tipo': 'oportunidad', 'tasas': _tasas(tablas),
+            'dolares': resultado.dolares,
+            'filas': _filas(tablas.tasas_oportunidad, iac=tablas.iac_oportunidad,
+                            factor_perdida=tablas.factor_perdida,
+                            perdida_bolivares=resultado.perdida_bolivares,
+                            perdida_usd_bcv=resultado.perdida_usd_bcv,
+                            perdida_usd_mercado=resultado.perdida_usd_mercado,
+                            poder_compra_bcv=resultado.poder_compra_bcv),
+        }
+    return {
+        'tipo': 'conversion', 'tasas': _tasas(tablas),
+        'usd': resultado.usd,
+        'precio_bcv': resultado.precio_bcv,
+        'precio_mercado': resultado.precio_mercado,
+        'precio_mercado_igtf': resultado.precio_mercado_igtf,
+        'diferencia': resultado.diferencia,
+        'diferencia_igtf': resultado.diferencia_igtf,
+        'filas': _filas(tablas.escalera, precio=resultado.precios_rango, diferencia=resultado.diferencias_rango),
+    }
+
+
+def _json(datos, **kwargs):
+    return json.dumps(datos, ensure_ascii=False, **kwargs)
+
+
+def as_json(resultado, **kwargs):
+    return _json(as_dict(resultado), **kwargs)
+
+
+# --- Lotes (CSV / JSONL) ---
+
+COLUMNAS_LOTE = [
+    "id", "tasa",
+    "precio_usd", "precio_bcv", "precio_mercado", "precio_mercado_igtf", "diferencia_igtf",
+    "costo", "divisas", "poder_compra", "monto_exacto", "suficiente", "diferencia",
+    "perdida_bs", "perdida_usd_bcv", "perdida_usd_mercado", "factor_perdida",
+]
+
+
+def _columna(valores, decimales=4):
+    """Redondea y cambia NaN por None para que quede vacío en CSV y null en JSON."""
+    return np.where(np.isnan(valores), None, np.round(valores, decimales)).tolist()
+
+
+def batch_columns(ids, tasas, conversion, compra, oportunidad):
+    """
+    Columnas de salida del modo lote, en el orden de COLUMNAS_LOTE, con
+    una fila por ítem y tasa. Las grillas traen una fila por tasa y una
+    columna por ítem; a un ítem sin divisas le quedan vacías las columnas
+    que dependen de ellas.
+    """
+    n_tasas, n_items = len(tasas), len(ids)
+
+    def por_item(grilla):
+        # (R, A) -> una fila por ítem con todas sus tasas seguidas
+        return np.broadcast_to(grilla, (n_tasas, n_items)).T.ravel()
+
+    sin_compra = por_item(np.isnan(compra.diferencia))
+    suficiente = [None if vacio else bool(s) for s, vacio in zip(por_item(compra.suficiente).tolist(), sin_compra)]
+    sin_divisas = np.isnan(compra.dolares)[None, :]
+
+    return [
+        [i for i in ids for _ in range(n_tasas)],
+        np.tile(tasas, n_items).tolist(),
+        _columna(por_item(conversion.precios)),
+        _columna(por_item(conversion.precio_bcv), 2),
+        _columna(por_item(conversion.precio_mercado), 2),
+        _columna(por_item(conversion.precio_mercado_igtf), 2),
+        _columna(por_item(conversion.diferencia_igtf), 2),
+        _columna(por_item(compra.costos)),
+        _columna(por_item(compra.dolares)),
+        _columna(por_item(compra.poder_compra)),
+        _columna(por_item(compra.monto_exacto)),
+        suficiente,
+        _columna(por_item(compra.diferencia)),
+        _columna(por_item(oportunidad.perdida_bolivares), 2),
+        _columna(por_item(oportunidad.perdida_usd_bcv)),
+        _columna(por_item(oportunidad.perdida_usd_mercado)),
+        _columna(por_item(np.where(sin_divisas, np.nan, oportunidad.factor_perdida[:, None]))),
+    ]
+
+
+def batch_jsonl(columnas):
+    """Las filas de `batch_columns` como líneas JSON con los nombres de COLUMNAS_LOTE."""
+    return "".join(_json(dict(zip(COLUMNAS_LOTE, fila))) + "\n" for fila in zip(*columnas))
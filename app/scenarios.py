@@ -0,0 +1,154 @@
+# app/scenarios.py
+from collections import namedtuple
+
+import numpy as np
+
+IGTF = 0.0348   # Impuesto a las Grandes Transacciones Financieras sobre pagos en divisas
+
+# --- Resultados en columnas ---
+# Las columnas por tasa tienen forma (R,); las de tasa × monto, forma (R, A).
+PurchaseGrid = namedtuple("PurchaseGrid", [
+    "tasas",          # (R,)
+    "costos",         # (A,) costo del producto en USD
+    "dolares",        # (A,) divisas disponibles en USD
+    "iac",            # (R,) Índice de Ahorro para el Comprador (%)
+    "fpc",            # (R,) Factor de Poder de Compra
+    "poder_compra",   # (R, A) USD a tasa BCV que se obtienen vendiendo las divisas
+    "monto_exacto",   # (R, A) USD que hay que vender para cubrir el costo
+    "diferencia",     # (R, A) poder de compra - costo
+    "suficiente",     # (R, A) bool
+])
+
+OpportunityGrid = namedtuple("OpportunityGrid", [
+    "tasas",                # (R,)
+    "dolares",              # (A,) divisas a vender en USD
+    "iac",                  # (R,) ahorro (%) de la mejor tasa frente a cada tasa
+    "factor_perdida",       # (R,)
+    "perdida_bolivares",    # (R, A)
+    "perdida_usd_bcv",      # (R, A)
+    "perdida_usd_mercado",  # (R, A)
+    "poder_compra_bcv",     # (R, A) USD a tasa BCV que se obtienen a cada tasa
+])
+
+ConversionGrid = namedtuple("ConversionGrid", [
+    "precios",               # (A,) precio en USD
+    "precio_bcv",            # (A,) Bs a tasa BCV
+    "precio_mercado",        # (A,) Bs a tasa de mercado
+    "precio_mercado_igtf",   # (A,) Bs a tasa de mercado más IGTF
+    "diferencia",            # (A,) mercado - BCV
+    "diferencia_igtf",       # (A,) mercado con IGTF - BCV
+])
+
+
+def rate_ladder(tasa_max, paso=10, pasos=6, inicio=0):
+    """Escalera de tasas `tasa_max - i * paso` para i en [inicio, pasos)."""
+    return tasa_max - np.arange(inicio, pasos, dtype=np.float64) * paso
+
+
+# --- Fórmulas ---
+# Son la única copia de la matemática: las grillas de este módulo y los
+# registros de app/rate_tables.py las usan. Operan elemento a elemento, así
+# que sirven igual para una columna de tasas (R,) con montos escalares que
+# para una grilla (R, 1) × (1, A). Una división por cero da inf o nan.
+
+def purchase_factors(tasas, tasa_bcv):
+    """FPC e IAC (%) de cada tasa: dependen solo de las tasas."""
+    fpc = tasas / tasa_bcv
+    return fpc, (fpc - 1) * 100
+
+
+def purchase_amounts(fpc, costos, dolares):
+    """Poder de compra, monto exacto, diferencia y si alcanza, para los montos dados."""
+    poder_compra = fpc * dolares
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monto_exacto = costos / fpc
+    diferencia = poder_compra - costos
+    return poder_compra, monto_exacto, diferencia, diferencia >= 0
+
+
+def opportunity_factors(tasas, tasa_max):
+    """Diferencia con la mejor tasa, IAC (%) de la mejor frente a cada una y factor de pérdida."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iac = (tasa_max / tasas - 1) * 100
+    return tasa_max - tasas, iac, 1 - tasas / tasa_max
+
+
+def opportunity_amounts(tasas, diferencia, dolares, tasa_max, tasa_bcv):
+    """Pérdida en Bs, en USD a tasa BCV y de mercado, y poder de compra a tasa BCV."""
+    perdida_bolivares = diferencia * dolares
+    return (
+        perdida_bolivares,
+        perdida_bolivares / tasa_bcv,
+        perdida_bolivares / tasa_max,
+        tasas * dolares / tasa_bcv,
+    )
+
+
+# --- Grillas ---
+
+def purchase_grid(tasas, costos, dolares, tasa_bcv):
+    """
+    Evalúa en una sola pasada todas las combinaciones de tasa de mercado y
+    par (costo del producto, divisas disponibles).
+    """
+    tasas = np.asarray(tasas, dtype=np.float64)
+    costos = np.atleast_1d(np.asarray(costos, dtype=np.float64))
+    dolares = np.atleast_1d(np.asarray(dolares, dtype=np.float64))
+    costos, dolares = np.broadcast_arrays(costos, dolares)
+
+    fpc, iac = purchase_factors(tasas, tasa_bcv)
+    poder_compra, monto_exacto, diferencia, suficiente = purchase_amounts(
+        fpc[:, None], costos[None, :], dolares[None, :])
+
+    return PurchaseGrid(
+        tasas=tasas,
+        costos=costos,
+        dolares=dolares,
+        iac=iac,
+        fpc=fpc,
+        poder_compra=poder_compra,
+        monto_exacto=monto_exacto,
+        diferencia=diferencia,
+        suficiente=suficiente,
+    )
+
+
+def opportunity_grid(tasas, dolares, tasa_max, tasa_bcv):
+    """
+    Pérdida por vender `dolares` a cada una de `tasas` en lugar de a
+    `tasa_max`, para todas las combinaciones a la vez.
+    """
+    tasas = np.asarray(tasas, dtype=np.float64)
+    dolares = np.atleast_1d(np.asarray(dolares, dtype=np.float64))
+
+    diferencia, iac, factor_perdida = opportunity_factors(tasas, tasa_max)
+    perdida_bolivares, perdida_usd_bcv, perdida_usd_mercado, poder_compra_bcv = opportunity_amounts(
+        tasas[:, None], diferencia[:, None], dolares[None, :], tasa_max, tasa_bcv)
+
+    return OpportunityGrid(
+        tasas=tasas,
+        dolares=dolares,
+        iac=iac,
+        factor_perdida=factor_perdida,
+        perdida_bolivares=perdida_bolivares,
+        perdida_usd_bcv=perdida_usd_bcv,
+        perdida_usd_mercado=perdida_usd_mercado,
+        poder_compra_bcv=poder_compra_bcv,
+    )
+
+
+def conversion_grid(precios, tasa_bcv, tasa_mercado, igtf=IGTF):
+    """Convierte precios en USD a Bs a tasa BCV, de mercado y de mercado con IGTF."""
+    precios = np.atleast_1d(np.asarray(precios, dtype=np.float64))
+    precio_bcv = precios * tasa_bcv
+    precio_mercado = precios * tasa_mercado
+    precio_mercado_igtf = precio_mercado * (1 + igtf)
+
+    return ConversionGrid(
+        precios=precios,
+        precio_bcv=precio_bcv,
+        precio_mercado=precio_mercado,
+        precio_mercado_igtf=precio_mercado_igtf,
+        diferencia=precio_mercado - precio_bcv,
+        diferencia_igtf=precio_mercado_igtf - precio_bcv,
+    )
@@ -0,0 +1,103 @@
+# app/sharding.py
+"""
+Procesamiento concurrente de updates y reparto de usuarios entre procesos.
+
+Dentro de un proceso, los updates de usuarios distintos se atienden a la
+vez, pero los de un mismo usuario se atienden en orden para que su estado
+de conversación no se pise. Entre procesos, cada usuario pertenece a un
+shard fijo: user_id % len(SHARD_PEERS) (ver app/webhook.py).
+"""
+import asyncio
+import logging
+import os
+
+from telegram.error import TelegramError
+from telegram.ext import BaseUpdateProcessor
+
+from app.admission import is_plain_text
+
+# --- Configuración ---
+SHARD_INDEX = int(os.environ.get("SHARD_INDEX", "0"))    # shard de este proceso
+MAX_CONCURRENCIA = 64                                     # updates atendiéndose a la vez por proceso
+MAX_EN_PROCESO = 1024                                     # updates aceptados: esperando turno o atendiéndose
+
+logger = logging.getLogger(__name__)
+
+
+def update_user_id(update):
+    """Usuario (o chat, si no hay usuario) al que pertenece un update, o None."""
+    for origen in ("effective_user", "effective_chat"):
+        entidad = getattr(update, origen, None)
+        if entidad is not None:
+            return entidad.id
+    return None
+
+
+def shard_of(user_id, total):
+    return int(user_id) % total
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Atiende hasta `max_concurrent_updates` updates a la vez, en serie por
+    usuario: cada usuario tiene un candado que existe solo mientras tenga
+    updates en curso. Esperar el turno del usuario no ocupa un lugar de
+    atención, así que un usuario con muchos updates encolados no frena a
+    los demás.
+
+    Con `admision` (un AdmissionControl), los mensajes de texto pasan por
+    el control de admisión al llegar y los que quedaron reemplazados por
+    uno más nuevo del mismo usuario se descartan antes de atenderlos.
+    """
+
+    def __init__(self, max_concurrent_updates=MAX_CONCURRENCIA, admision=None, max_en_proceso=MAX_EN_PROCESO):
+        # El semáforo de la clase base acota los updates aceptados; el propio, los que se atienden
+        super().__init__(max(max_en_proceso, max_concurrent_updates))
+        self._atendiendo = asyncio.Semaphore(max_concurrent_updates)
+        self.admision = admision
+        self._candados = {}   # user_id -> [asyncio.Lock, updates que lo usan]
+
+    async def do_process_update(self, update, coroutine):
+        user_id = update_user_id(update)
+        if user_id is None:
+            async with self._atendiendo:
+                await coroutine
+            return
+
+        ticket = None
+        if self.admision is not None and is_plain_text(update):
+            ticket, aviso = self.admision.arrive(user_id)
+            if ticket is None:
+                coroutine.close()
+                if aviso:
+                    await self._avisar(update, aviso)
+                return
+
+        entrada = self._candados.get(user_id)
+        if entrada is None:
+            entrada = self._candados[user_id] = [asyncio.Lock(), 0]
+        entrada[1] += 1
+        try:
+            async with entrada[0], self._atendiendo:
+                if ticket is not None and self.admision.superseded(ticket):
+                    coroutine.close()
+                else:
+                    await coroutine
+        finally:
+            entrada[1] -= 1
+            if not entrada[1]:
+                del self._candados[user_id]
+            if ticket is not None:
+                self.admision.done(ticket)
+
+    async def _avisar(self, update, aviso):
+        try:
+            await update.message.reply_text(aviso)
+        except TelegramError as e:
+            logger.debug("No se pudo avisar el rechazo de un mensaje: %s", e)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,50 @@
+# app/snapshot.py
+"""
+Última consulta de tasas que salió bien, guardada en un archivo pequeño
+para arrancar sin esperar a la API y para trabajar sin conexión.
+"""
+import json
+import os
+import time
+from collections import namedtuple
+
+from app.storage import DATA_DIR, atomic_write
+
+SNAPSHOT_FILE = os.path.join(DATA_DIR, "ultima_tasa.json")
+
+Snapshot = namedtuple("Snapshot", ["tasa_bcv", "tasa_mercado_cruda", "tasa_mercado_redondeada", "ts"])
+
+
+def save_snapshot(tasa_bcv, tasa_mercado_cruda, tasa_mercado_redondeada, ts=None, path=None):
+    """Escribe la instantánea de forma atómica: quien la lea ve la anterior o la nueva, nunca media."""
+    datos = {
+        'bcv': tasa_bcv,
+        'paralelo': tasa_mercado_cruda,
+        'redondeada': tasa_mercado_redondeada,
+        'ts': int(ts if ts is not None else time.time()),
+    }
+    with atomic_write(path or SNAPSHOT_FILE) as f:
+        json.dump(datos, f, separators=(",", ":"))
+
+
+def load_snapshot(path=None):
+    """Lee la instantánea guardada, o None si no hay o está dañada."""
+    try:
+        with open(path or SNAPSHOT_FILE, encoding="utf-8") as f:
+            datos = json.load(f)
+        return Snapshot(float(datos['bcv']), float(datos['paralelo']), float(datos['redondeada']), int(datos['ts']))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def describe_age(segundos):
+    """Edad legible: 'hace 45 s', 'hace 12 min', 'hace 3 h 5 min', 'hace 2 días'."""
+    segundos = max(0, int(segundos))
+    if segundos < 60:
+        return f"hace {segundos} s"
+    if segundos < 3600:
+        return f"hace {segundos // 60} min"
+    if segundos < 86400:
+        return f"hace {segundos // 3600} h {segundos % 3600 // 60} min"
+    dias = segundos // 86400
+    return f"hace {dias} día{'s' if dias != 1 else ''}"
@@ -0,0 +1,174 @@
+# app/state.py
+"""
+Estado de conversación por usuario (qué opción del menú eligió), fuera de
+la memoria del proceso para que sobreviva a reinicios y lo compartan
+varios procesos del bot.
+"""
+import abc
+import dbm
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app.storage import DATA_DIR
+
+# --- Configuración del estado ---
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "sqlite")   # "sqlite" o "dbm"
+STATE_DB = os.path.join(DATA_DIR, "estados.db")
+# dbm no se comparte entre procesos: un archivo por shard
+STATE_DBM = os.path.join(DATA_DIR, f"estados-{int(os.environ.get('SHARD_INDEX', '0'))}.dbm")
+STATE_TTL = 86400    # un flujo sin terminar caduca al día
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS estados (
+    user_id     INTEGER PRIMARY KEY,
+    datos       TEXT    NOT NULL,   -- JSON
+    actualizado INTEGER NOT NULL    -- segundos epoch UTC
+);
+"""
+
+
+class StateStore(abc.ABC):
+    """
+    Interfaz de los almacenes de estado. Cada usuario tiene un diccionario
+    de datos; un usuario sin estado (o con estado caducado) devuelve {}.
+    """
+
+    @abc.abstractmethod
+    def get(self, user_id):
+        """Datos de `user_id`, o {} si no tiene estado vigente."""
+
+    @abc.abstractmethod
+    def put(self, user_id, datos):
+        """Guarda los datos de `user_id`."""
+
+    @abc.abstractmethod
+    def delete(self, user_id):
+        """Borra el estado de `user_id`."""
+
+    @abc.abstractmethod
+    def purge(self, ttl=None, ahora=None):
+        """Borra los estados más viejos que `ttl` (por defecto, el del almacén). Devuelve cuántos borró."""
+
+    def close(self):
+        pass
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Estado en SQLite. Con WAL y espera por bloqueo, varios procesos pueden
+    usar el mismo archivo a la vez.
+    """
+
+    def __init__(self, path=STATE_DB, ttl=STATE_TTL):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, user_id):
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT datos FROM estados WHERE user_id = ? AND actualizado >= ?",
+                (int(user_id), int(time.time() - self.ttl)),
+            ).fetchone()
+        return json.loads(fila[0]) if fila else {}
+
+    def put(self, user_id, datos):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO estados (user_id, datos, actualizado) VALUES (?, ?, ?)",
+                (int(user_id), json.dumps(datos), int(time.time())),
+            )
+
+    def delete(self, user_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM estados WHERE user_id = ?", (int(user_id),))
+
+    def purge(self, ttl=None, ahora=None):
+        limite = int((ahora if ahora is not None else time.time()) - (self.ttl if ttl is None else ttl))
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM estados WHERE actualizado < ?", (limite,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DbmStateStore(StateStore):
+    """
+    Estado en un archivo dbm local: sobrevive a reinicios sin SQLite, pero
+    dbm no admite varios procesos escribiendo el mismo archivo, así que
+    cada shard usa el suyo (STATE_DBM). Basta porque cada usuario pertenece
+    siempre al mismo shard.
+    """
+
+    def __init__(self, path=STATE_DBM, ttl=STATE_TTL):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = dbm.open(path, "c")
+
+    def _guardar(self):
+        sync = getattr(self._db, "sync", None)
+        if sync is not None:
+            sync()
+
+    def get(self, user_id):
+        with self._lock:
+            valor = self._db.get(str(int(user_id)))
+        if valor is None:
+            return {}
+        datos, actualizado = json.loads(valor)
+        return datos if actualizado >= time.time() - self.ttl else {}
+
+    def put(self, user_id, datos):
+        with self._lock:
+            self._db[str(int(user_id))] = json.dumps([datos, int(time.time())])
+            self._guardar()
+
+    def delete(self, user_id):
+        with self._lock:
+            try:
+                del self._db[str(int(user_id))]
+            except KeyError:
+                return
+            self._guardar()
+
+    def purge(self, ttl=None, ahora=None):
+        limite = (ahora if ahora is not None else time.time()) - (self.ttl if ttl is None else ttl)
+        with self._lock:
+            viejos = [clave for clave in self._db.keys() if json.loads(self._db[clave])[1] < limite]
+            for clave in viejos:
+                del self._db[clave]
+            if viejos:
+                self._guardar()
+        return len(viejos)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_state_store():
+    """Devuelve el almacén de estado del proceso según STATE_BACKEND, creándolo la primera vez."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if STATE_BACKEND == "dbm":
+                _store = DbmStateStore(STATE_DBM)
+            elif STATE_BACKEND == "sqlite":
+                _store = SQLiteStateStore(STATE_DB)
+            else:
+                raise ValueError(f"STATE_BACKEND desconocido: {STATE_BACKEND}")
+        return _store
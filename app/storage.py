@@ -0,0 +1,33 @@
+# app/storage.py
+"""
+Dónde guarda el bot sus archivos y cómo se escriben sin que un lector vea
+uno a medias.
+"""
+import contextlib
+import os
+import tempfile
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+@contextlib.contextmanager
+def atomic_write(path, modo="w", encoding="utf-8", fsync=False):
+    """
+    Abre un temporal en el directorio de `path` y, si el bloque termina sin
+    error, lo pone en su lugar con os.replace: quien lea `path` ve el
+    contenido anterior o el nuevo, nunca uno a medias. Con `fsync` el
+    contenido llega al disco antes del reemplazo.
+    """
+    directorio = os.path.dirname(path)
+    os.makedirs(directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+    try:
+        with os.fdopen(fd, modo, encoding=None if "b" in modo else encoding) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temporal, path)
+    except BaseException:
+        os.unlink(temporal)
+        raise
@@ -0,0 +1,153 @@
+# app/subscriptions.py
+"""
+Chats suscritos al reporte y sus preferencias, en SQLite para que varios
+procesos del bot (shards) lo compartan: cada cambio es una transacción que
+toma el bloqueo de escritura antes de leer, así que dos procesos no se
+pisan los cambios.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+from app.storage import DATA_DIR
+
+SUBSCRIPTIONS_DB = os.path.join(DATA_DIR, "suscriptores.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suscriptores (
+    chat_id INTEGER PRIMARY KEY,
+    prefs   TEXT    NOT NULL   -- JSON
+);
+"""
+
+
+class SubscriptionRegistry:
+    """
+    Registro de los chats suscritos al reporte. Cada chat guarda un
+    diccionario de preferencias. La conexión se abre con el primer uso.
+    """
+
+    def __init__(self, path=SUBSCRIPTIONS_DB):
+        self.path = path
+        self.nuevo = None    # True si la base no existía al abrirla
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _conexion(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.nuevo = self.path == ":memory:" or not os.path.exists(self.path)
+            # Sin transacciones implícitas: cada cambio abre la suya con BEGIN IMMEDIATE
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _escribir(self):
+        """Transacción de escritura: toma el bloqueo antes de leer nada."""
+        return _Transaccion(self._conexion())
+
+    def seed(self, chat_id):
+        """Suscribe `chat_id` solo si el registro se acaba de crear (primer arranque del bot)."""
+        with self._lock:
+            self._conexion()
+            nuevo, self.nuevo = self.nuevo, False
+        if nuevo:
+            self.add(chat_id)
+
+    def add(self, chat_id):
+        """Suscribe `chat_id`. Devuelve False si ya estaba suscrito."""
+        with self._lock, self._escribir() as conn:
+            return conn.execute("INSERT OR IGNORE INTO suscriptores (chat_id, prefs) VALUES (?, '{}')",
+                                (int(chat_id),)).rowcount == 1
+
+    def remove(self, chat_id):
+        """Elimina `chat_id`. Devuelve False si no estaba suscrito."""
+        return self.remove_many([chat_id]) == 1
+
+    def remove_many(self, chat_ids):
+        """Elimina varios chats en una sola transacción. Devuelve cuántos estaban suscritos."""
+        with self._lock, self._escribir() as conn:
+            return sum(conn.execute("DELETE FROM suscriptores WHERE chat_id = ?", (int(chat_id),)).rowcount
+                       for chat_id in chat_ids)
+
+    def migrate(self, cambios):
+        """Pasa las preferencias de cada chat viejo a su id nuevo: {viejo: nuevo}."""
+        with self._lock, self._escribir() as conn:
+            movidos = 0
+            for viejo, nuevo in cambios.items():
+                fila = conn.execute("SELECT prefs FROM suscriptores WHERE chat_id = ?", (int(viejo),)).fetchone()
+                if fila is None:
+                    continue
+                conn.execute("DELETE FROM suscriptores WHERE chat_id = ?", (int(viejo),))
+                conn.execute("INSERT OR IGNORE INTO suscriptores (chat_id, prefs) VALUES (?, ?)",
+                             (int(nuevo), fila[0]))
+                movidos += 1
+            return movidos
+
+    def get(self, chat_id):
+        """Preferencias de `chat_id`, o None si no está suscrito."""
+        with self._lock:
+            fila = self._conexion().execute(
+                "SELECT prefs FROM suscriptores WHERE chat_id = ?", (int(chat_id),)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def update(self, chat_id, **prefs):
+        """Actualiza las preferencias de un chat suscrito."""
+        if not self.update_many({chat_id: prefs}):
+            raise KeyError(chat_id)
+
+    def update_many(self, cambios):
+        """
+        Aplica {chat_id: prefs} en una sola transacción; los chats que ya no
+        están suscritos se ignoran. Devuelve cuántos se actualizaron.
+        """
+        if not cambios:
+            return 0
+        with self._lock, self._escribir() as conn:
+            actualizados = 0
+            for chat_id, prefs in cambios.items():
+                fila = conn.execute("SELECT prefs FROM suscriptores WHERE chat_id = ?", (int(chat_id),)).fetchone()
+                if fila is None:
+                    continue
+                conn.execute("UPDATE suscriptores SET prefs = ? WHERE chat_id = ?",
+                             (json.dumps({**json.loads(fila[0]), **prefs}), int(chat_id)))
+                actualizados += 1
+            return actualizados
+
+    def chat_ids(self):
+        with self._lock:
+            return [fila[0] for fila in self._conexion().execute("SELECT chat_id FROM suscriptores")]
+
+    def items(self):
+        with self._lock:
+            filas = self._conexion().execute("SELECT chat_id, prefs FROM suscriptores").fetchall()
+        return [(chat_id, json.loads(prefs)) for chat_id, prefs in filas]
+
+    def __len__(self):
+        with self._lock:
+            return self._conexion().execute("SELECT COUNT(*) FROM suscriptores").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _Transaccion:
+    """BEGIN IMMEDIATE ... COMMIT, o ROLLBACK si algo falla."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, tipo, valor, traza):
+        self.conn.execute("ROLLBACK" if tipo is not None else "COMMIT")
+        return False
@@ -0,0 +1,216 @@
+# app/webhook.py
+"""
+Modo webhook del bot: Telegram envía cada update por HTTP POST en lugar de
+que el bot los pida con polling. Pensado para producción; para desarrollo
+sigue disponible `python -m app.notifier`.
+
+Uso:
+    WEBHOOK_URL=https://mi-dominio WEBHOOK_SECRET=... python -m app.webhook
+
+Con varios procesos, cada uno con su SHARD_INDEX y la misma lista
+SHARD_PEERS, el shard 0 registra el webhook y reenvía a cada proceso los
+updates de sus usuarios.
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, web
+from telegram import Update
+
+from app import metrics
+from app.notifier import build_application, start_observability
+from app.sharding import SHARD_INDEX, shard_of, update_user_id
+
+# --- Configuración del webhook ---
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")          # URL pública sin la ruta; vacío = no registrar
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")    # se compara con X-Telegram-Bot-Api-Secret-Token
+COLA_MAXIMA = 1000       # updates aceptados pendientes de procesar
+MAX_CONEXIONES = 40      # conexiones simultáneas de Telegram al webhook
+ESPERA_CIERRE = 10.0     # segundos para vaciar la cola al detenerse
+# URLs internas de todos los shards, en orden de índice, separadas por comas.
+# Cada proceso reenvía al suyo los updates de usuarios de otros shards.
+SHARD_PEERS = [u for u in os.environ.get("SHARD_PEERS", "").split(",") if u]
+REENVIO_TIMEOUT = 5.0
+
+HEADER_SECRETO = "X-Telegram-Bot-Api-Secret-Token"
+
+logger = logging.getLogger(__name__)
+
+webhook_pendientes = metrics.gauge(
+    "bot_webhook_pendientes", "Updates recibidos por webhook pendientes de procesar.")
+webhook_respuestas = metrics.counter(
+    "bot_webhook_respuestas_total", "Respuestas del endpoint del webhook por código HTTP.", ("codigo",))
+
+
+class WebhookServer:
+    """
+    Recibe updates por HTTP y los encola en una cola acotada. Cada update
+    que sale de la cola se procesa en su propia tarea, y salen tantos como
+    admite el update processor: uno que espera el turno de su usuario no
+    frena a los de otros usuarios. Si la cola está llena responde 503 para
+    que Telegram reintente más tarde en lugar de acumular memoria.
+    """
+
+    def __init__(self, application, secreto, ruta=WEBHOOK_PATH, cola_maxima=COLA_MAXIMA,
+                 shard_index=SHARD_INDEX, peers=SHARD_PEERS):
+        if not secreto:
+            raise ValueError("El webhook necesita un token secreto (WEBHOOK_SECRET).")
+        if peers and not 0 <= shard_index < len(peers):
+            raise ValueError("SHARD_PEERS debe tener una URL por shard, incluida la de este.")
+        self.application = application
+        self.secreto = secreto.encode()
+        self.ruta = ruta
+        self.cola = asyncio.Queue(maxsize=cola_maxima)
+        self.shard_index = shard_index
+        self.peers = peers
+        # Updates sacados de la cola y sin terminar, a lo sumo los que acepta el processor
+        self._cupos = asyncio.Semaphore(application.update_processor.max_concurrent_updates)
+        self._despachador = None
+        self._tareas = set()
+        self._runner = None
+        self._cliente = None
+
+    def _responder(self, codigo):
+        webhook_respuestas.inc(codigo)
+        return web.Response(status=codigo)
+
+    async def handle(self, request):
+        recibido = request.headers.get(HEADER_SECRETO, "").encode()
+        if not hmac.compare_digest(recibido, self.secreto):
+            return self._responder(403)
+        try:
+            datos = await request.json()
+            if not isinstance(datos, dict):
+                return self._responder(400)
+            update = Update.de_json(datos, self.application.bot)
+        except (json.JSONDecodeError, AttributeError, TypeError, KeyError, ValueError):
+            # JSON válido que no es un update ({"message": 5}) falla dentro de de_json
+            return self._responder(400)
+
+        destino = self._shard_ajeno(update)
+        if destino is not None:
+            return await self._reenviar(destino, datos)
+        try:
+            self.cola.put_nowait(update)
+        except asyncio.QueueFull:
+            return self._responder(503)
+        webhook_pendientes.set(valor=self.cola.qsize())
+        return self._responder(200)
+
+    def _shard_ajeno(self, update):
+        """URL del shard dueño del usuario si no es este proceso, o None."""
+        if not self.peers:
+            return None
+        user_id = update_user_id(update)
+        shard = shard_of(user_id, len(self.peers)) if user_id is not None else 0
+        return None if shard == self.shard_index else self.peers[shard]
+
+    async def _reenviar(self, url, datos):
+        try:
+            async with self._cliente.post(url, json=datos, headers={HEADER_SECRETO: self.secreto.decode()}) as r:
+                return self._responder(r.status)
+        except (ClientError, asyncio.TimeoutError):
+            # Telegram reintentará el update más tarde
+            return self._responder(503)
+
+    async def health(self, request):
+        return web.json_response({'pendientes': self.cola.qsize(), 'en_proceso': len(self._tareas)})
+
+    async def _despachar(self):
+        while True:
+            await self._cupos.acquire()
+            update = await self.cola.get()
+            tarea = asyncio.create_task(self._procesar(update))
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+
+    async def _procesar(self, update):
+        try:
+            # Por el update processor: updates de un mismo usuario en orden
+            await self.application.update_processor.process_update(
+                update, self.application.process_update(update))
+        except Exception:
+            # process_update ya pasa los errores de los handlers al error_handler
+            logger.exception("Error procesando el update %s", update.update_id)
+        finally:
+            self._cupos.release()
+            self.cola.task_done()
+            webhook_pendientes.set(valor=self.cola.qsize())
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post(self.ruta, self.handle)
+        app.router.add_get("/healthz", self.health)
+        return app
+
+    async def start(self, host=WEBHOOK_HOST, port=WEBHOOK_PORT, url=WEBHOOK_URL):
+        """Inicializa la aplicación del bot, arranca los workers y el servidor HTTP."""
+        await self.application.initialize()
+        if self.application.post_init:
+            await self.application.post_init(self.application)
+        await self.application.start()
+
+        self._despachador = asyncio.create_task(self._despachar())
+        if self.peers:
+            self._cliente = ClientSession(timeout=ClientTimeout(total=REENVIO_TIMEOUT))
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+        # Solo un shard registra el webhook; los demás reciben por reenvío
+        if url and self.shard_index == 0:
+            await self.application.bot.set_webhook(
+                url=url.rstrip("/") + self.ruta,
+                secret_token=self.secreto.decode(),
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=MAX_CONEXIONES,
+            )
+
+    async def stop(self, espera=ESPERA_CIERRE):
+        """Deja de recibir, procesa lo que quedó en la cola y cierra la aplicación."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        try:
+            await asyncio.wait_for(self.cola.join(), espera)
+        except asyncio.TimeoutError:
+            logger.warning("Se descartaron %d updates pendientes al cerrar.", self.cola.qsize() + len(self._tareas))
+        tareas = list(self._tareas)
+        if self._despachador is not None:
+            tareas.append(self._despachador)
+            self._despachador = None
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        if self._cliente is not None:
+            await self._cliente.close()
+            self._cliente = None
+
+        await self.application.stop()
+        if self.application.post_shutdown:
+            await self.application.post_shutdown(self.application)
+        await self.application.shutdown()
+
+
+async def serve(host=WEBHOOK_HOST, port=WEBHOOK_PORT, url=WEBHOOK_URL, secreto=WEBHOOK_SECRET):
+    servidor = WebhookServer(build_application(), secreto)
+    await servidor.start(host, port, url)
+    print(f"Bot en modo webhook escuchando en {host}:{port}{servidor.ruta}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await servidor.stop()
+
+
+if __name__ == "__main__":
+    start_observability()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
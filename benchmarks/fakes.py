@@ -0,0 +1,167 @@
+# benchmarks/fakes.py
+"""
+Dobles locales para medir el bot sin red: un servidor HTTP que imita a
+ve.dolarapi.com y objetos Update/Context/Bot que registran lo enviado.
+"""
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def dolarapi_payload(tasa_bcv=180.5, tasa_paralelo=254.3):
+    fecha = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+    return [
+        {"fuente": "oficial", "nombre": "Oficial", "promedio": tasa_bcv, "fechaActualizacion": fecha},
+        {"fuente": "paralelo", "nombre": "Paralelo", "promedio": tasa_paralelo, "fechaActualizacion": fecha},
+    ]
+
+
+class StubRateServer:
+    """
+    Servidor local con las rutas /v1/dolares, /v1/dolares/oficial y
+    /v1/dolares/paralelo. `latencia` se suma a cada respuesta y
+    `tasa_error` es la probabilidad de responder 503.
+    """
+
+    def __init__(self, tasa_bcv=180.5, tasa_paralelo=254.3, latencia=0.0, tasa_error=0.0, host="127.0.0.1", port=0):
+        self.tasa_bcv = tasa_bcv
+        self.tasa_paralelo = tasa_paralelo
+        self.latencia = latencia
+        self.tasa_error = tasa_error
+        self.llamadas = 0
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with servidor._lock:
+                    servidor.llamadas += 1
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+                if servidor.tasa_error and random.random() < servidor.tasa_error:
+                    self.send_error(503)
+                    return
+                payload = dolarapi_payload(servidor.tasa_bcv, servidor.tasa_paralelo)
+                if self.path.rstrip("/").endswith("/oficial"):
+                    payload = payload[0]
+                elif self.path.rstrip("/").endswith("/paralelo"):
+                    payload = payload[1]
+                cuerpo = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/dolares"
+
+    def start(self):
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeBot:
+    """Bot que guarda cada mensaje en lugar de enviarlo a Telegram. `latencia` simula la ida a la API."""
+
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.enviados = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        self.enviados.append((chat_id, text))
+
+
+class FakeMessage:
+    def __init__(self, bot, chat_id, text=None):
+        self._bot = bot
+        self.chat_id = chat_id
+        self.text = text
+
+    async def reply_text(self, text, **kwargs):
+        await self._bot.send_message(chat_id=self.chat_id, text=text, **kwargs)
+
+
+class FakeCallbackQuery:
+    def __init__(self, bot, chat_id, data):
+        self._bot = bot
+        self.chat_id = chat_id
+        self.data = data
+        self.message = FakeMessage(bot, chat_id)
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit_message_text(self, text, **kwargs):
+        await self._bot.send_message(chat_id=self.chat_id, text=text, **kwargs)
+
+
+class FakeInlineQuery:
+    def __init__(self, bot, user_id, query):
+        self._bot = bot
+        self.from_user = FakeUser(user_id)
+        self.query = query
+
+    async def answer(self, results, **kwargs):
+        self._bot.enviados.append((self.from_user.id, results))
+
+
+class FakeChat:
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+_update_ids = itertools.count(1)
+
+
+class FakeUpdate:
+    """Update mínimo con lo que usan los handlers del bot."""
+
+    def __init__(self, bot, user_id, text=None, callback_data=None, inline_query=None):
+        self.update_id = next(_update_ids)
+        self.effective_user = FakeUser(user_id)
+        self.effective_chat = FakeChat(user_id) if inline_query is None else None
+        self.message = FakeMessage(bot, user_id, text) if callback_data is None and inline_query is None else None
+        self.callback_query = FakeCallbackQuery(bot, user_id, callback_data) if callback_data is not None else None
+        self.inline_query = FakeInlineQuery(bot, user_id, inline_query) if inline_query is not None else None
+
+
+class FakeContext:
+    """Context con user_data por usuario, como el de python-telegram-bot."""
+
+    def __init__(self, bot, user_data=None, args=None, bot_data=None):
+        self.bot = bot
+        self.user_data = user_data if user_data is not None else {}
+        self.args = args or []
+        self.bot_data = bot_data if bot_data is not None else {}
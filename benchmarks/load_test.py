@@ -0,0 +1,191 @@
+# benchmarks/load_test.py
+"""
+Prueba de carga del bot: miles de usuarios sintéticos recorren el flujo
+/start → botón del menú → monto contra los handlers reales, con un Bot
+falso y un servidor local que imita a dolarapi.com.
+
+Uso:
+    python -m benchmarks.load_test                                  # 2000 usuarios
+    python -m benchmarks.load_test --usuarios 5000 --concurrencia 500
+    python -m benchmarks.load_test --latencia-api 0.3 --errores-api 0.1
+    python -m benchmarks.load_test --ttl 0                          # sin caché de tasas
+    python -m benchmarks.load_test --insistentes 20 --rafaga 50     # ráfagas, con control de admisión
+    python -m benchmarks.load_test --insistentes 20 --rafaga 50 --sin-admision
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from app.admission import (
+    AVISO_LIMITE_USUARIO, AVISO_SOBRECARGA, RAFAGA_GLOBAL, RITMO_GLOBAL, AdmissionControl, admision_resultados,
+)
+from benchmarks.fakes import FakeBot, FakeContext, FakeUpdate, StubRateServer
+from benchmarks.run import _percentil
+
+# Opción del menú → entrada que escribe el usuario
+FLUJOS = {
+    'analisis_compra': lambda: f"{random.randint(10, 2000)} {random.randint(10, 2000)}",
+    'costo_oportunidad': lambda: str(random.randint(10, 5000)),
+    'cambio_divisas': lambda: f"{random.uniform(1, 500):.2f}",
+}
+
+
+class LoadTest:
+    """
+    Corre `usuarios` flujos completos con a lo sumo `concurrencia` usuarios
+    a la vez. Cada update pasa por el mismo update processor que usa el
+    bot, así que la serialización por usuario también se mide.
+    """
+
+    def __init__(self, bot, usuarios, concurrencia, pausa=0.0, max_updates=None,
+                 insistentes=0, rafaga=0, admision=None):
+        from app.sharding import MAX_CONCURRENCIA, PerUserUpdateProcessor
+
+        self.bot = bot
+        self.usuarios = usuarios
+        self.concurrencia = concurrencia
+        self.pausa = pausa
+        self.insistentes = insistentes   # usuarios que mandan `rafaga` mensajes de golpe
+        self.rafaga = rafaga
+        self.procesador = PerUserUpdateProcessor(max_updates or MAX_CONCURRENCIA, admision=admision)
+        self.latencias = defaultdict(list)   # handler -> [segundos]
+        self.errores = defaultdict(int)      # tipo -> cantidad
+        self.fallidos = 0                    # respuestas de error al usuario
+
+    async def _paso(self, nombre, handler, update):
+        inicio = time.perf_counter()
+        try:
+            await self.procesador.process_update(update, handler(update, FakeContext(self.bot)))
+        except Exception as e:
+            self.errores[type(e).__name__] += 1
+        self.latencias[nombre].append(time.perf_counter() - inicio)
+
+    async def _usuario(self, user_id):
+        from app.notifier import button_handler, message_handler, start
+
+        opcion = random.choice(list(FLUJOS))
+        await self._paso('start', start, FakeUpdate(self.bot, user_id, text="/start"))
+        await self._paso('button_handler', button_handler, FakeUpdate(self.bot, user_id, callback_data=opcion))
+        if self.pausa:
+            await asyncio.sleep(random.uniform(0, self.pausa))   # lo que tarda el usuario en escribir
+        enviados = len(self.bot.enviados)
+        await self._paso('message_handler', message_handler, FakeUpdate(self.bot, user_id, text=FLUJOS[opcion]()))
+        if any("No se pudieron obtener" in texto for _, texto in self.bot.enviados[enviados:]):
+            self.fallidos += 1
+
+    async def _insistente(self, user_id):
+        from app.notifier import button_handler, message_handler
+
+        await self._paso('button_handler', button_handler, FakeUpdate(self.bot, user_id, callback_data='cambio_divisas'))
+        await asyncio.gather(*(
+            self._paso('rafaga', message_handler, FakeUpdate(self.bot, user_id, text=FLUJOS['cambio_divisas']()))
+            for _ in range(self.rafaga)
+        ))
+
+    async def run(self):
+        semaforo = asyncio.Semaphore(self.concurrencia)
+
+        async def limitado(user_id):
+            async with semaforo:
+                await self._usuario(user_id)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(
+            *(limitado(1_000_000 + i) for i in range(self.usuarios)),
+            *(self._insistente(2_000_000 + i) for i in range(self.insistentes)),
+        )
+        return time.perf_counter() - inicio
+
+
+def imprimir(prueba, duracion, stub, cache_stats):
+    updates = sum(len(v) for v in prueba.latencias.values())
+    print(f"\nUsuarios: {prueba.usuarios} | concurrencia: {prueba.concurrencia} | duración: {duracion:.2f} s")
+    print(f"Throughput: {updates / duracion:.0f} updates/s | {prueba.usuarios / duracion:.0f} flujos/s")
+    print(f"\n{'Handler':<18} | {'n':>7} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} | {'máx (ms)':>9}")
+    print("-" * 76)
+    todas = []
+    for nombre, tiempos in prueba.latencias.items():
+        todas.extend(tiempos)
+        ms = [t * 1000 for t in tiempos]
+        print(f"{nombre:<18} | {len(ms):>7} | {_percentil(ms, 50):>9.2f} | {_percentil(ms, 95):>9.2f} | "
+              f"{_percentil(ms, 99):>9.2f} | {max(ms):>9.2f}")
+    ms = [t * 1000 for t in todas]
+    print(f"{'total':<18} | {len(ms):>7} | {_percentil(ms, 50):>9.2f} | {_percentil(ms, 95):>9.2f} | "
+          f"{_percentil(ms, 99):>9.2f} | {max(ms):>9.2f}")
+
+    print(f"\nMensajes enviados: {len(prueba.bot.enviados)} | respuestas sin tasas: {prueba.fallidos}")
+    admision = prueba.procesador.admision
+    if admision is not None:
+        avisos = sum(texto in (AVISO_LIMITE_USUARIO, AVISO_SOBRECARGA) for _, texto in prueba.bot.enviados)
+        decisiones = ", ".join(f"{resultado}={int(admision_resultados.value(resultado))}"
+                               for resultado in ("admitido", "combinado", "limite_usuario", "limite_global", "cola_llena"))
+        print(f"Admisión: {decisiones} | avisos de rechazo: {avisos}")
+    print(f"Llamadas a la API: {stub.llamadas} | caché: {cache_stats['hits']} aciertos, "
+          f"{cache_stats['misses']} fallos ({cache_stats['hit_ratio']:.1%})")
+    if prueba.errores:
+        print("Excepciones: " + ", ".join(f"{tipo}={n}" for tipo, n in prueba.errores.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de los handlers del bot.")
+    parser.add_argument("--usuarios", type=int, default=2000, help="flujos completos a simular")
+    parser.add_argument("--concurrencia", type=int, default=200, help="usuarios activos a la vez")
+    parser.add_argument("--max-updates", type=int, help="updates a la vez en el update processor")
+    parser.add_argument("--pausa", type=float, default=0.0, help="segundos máximos que un usuario tarda en escribir")
+    parser.add_argument("--latencia-api", type=float, default=0.05, help="segundos de latencia del stub de la API")
+    parser.add_argument("--errores-api", type=float, default=0.0, help="probabilidad de que el stub responda 503")
+    parser.add_argument("--latencia-bot", type=float, default=0.0, help="segundos por envío a Telegram")
+    parser.add_argument("--ttl", type=float, help="TTL de la caché de tasas (0 = sin caché)")
+    parser.add_argument("--estado", choices=("sqlite", "dbm"), default="sqlite", help="backend del estado")
+    parser.add_argument("--insistentes", type=int, default=0, help="usuarios que mandan una ráfaga de mensajes")
+    parser.add_argument("--rafaga", type=int, default=50, help="mensajes por usuario insistente")
+    parser.add_argument("--sin-admision", action="store_true", help="desactivar el control de admisión")
+    parser.add_argument("--rafaga-global", type=int, default=RAFAGA_GLOBAL,
+                        help="mensajes seguidos admitidos en total (por defecto, sin balde global)")
+    parser.add_argument("--ritmo-global", type=float, default=RITMO_GLOBAL, help="mensajes por segundo admitidos en total")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args(argv)
+    random.seed(args.semilla)
+
+    # Archivos temporales para no tocar los datos reales
+    from app import history, snapshot, state
+    temporal = tempfile.mkdtemp(prefix="carga-")
+    history.HISTORY_DB = os.path.join(temporal, "historial.db")
+    state.STATE_DB = os.path.join(temporal, "estados.db")
+    state.STATE_DBM = os.path.join(temporal, "estados.dbm")
+    state.STATE_BACKEND = args.estado
+    snapshot.SNAPSHOT_FILE = os.path.join(temporal, "ultima_tasa.json")
+
+    from app import api_data
+    from app.providers import DolarApiProvider
+
+    if args.ttl is not None:
+        api_data.rate_cache.ttl = args.ttl
+        api_data.rate_cache.stale_ttl = 0 if args.ttl == 0 else api_data.rate_cache.stale_ttl
+
+    with StubRateServer(latencia=args.latencia_api, tasa_error=args.errores_api) as stub:
+        api_data.configure_providers([DolarApiProvider(url=stub.url)])
+        prueba = LoadTest(FakeBot(latencia=args.latencia_bot), args.usuarios, args.concurrencia,
+                          pausa=args.pausa, max_updates=args.max_updates,
+                          insistentes=args.insistentes, rafaga=args.rafaga,
+                          admision=None if args.sin_admision else AdmissionControl(
+                              rafaga_global=args.rafaga_global, ritmo_global=args.ritmo_global))
+
+        async def correr():
+            try:
+                return await prueba.run()
+            finally:
+                await api_data.close_http_client()
+
+        duracion = asyncio.run(correr())
+        imprimir(prueba, duracion, stub, api_data.rate_cache.stats())
+    return 1 if prueba.errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+# benchmarks/run.py
+"""
+Benchmarks de las rutas calientes de cálculo y de respuesta del bot.
+
+Uso:
+    python -m benchmarks.run                      # correr y mostrar resultados
+    python -m benchmarks.run --guardar base       # guardar como línea base
+    python -m benchmarks.run --comparar base      # comparar contra una línea base
+    python -m benchmarks.run --filtro handler     # solo los casos que contienen "handler"
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fakes import FakeBot, FakeContext, FakeUpdate, StubRateServer
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+UMBRAL_REGRESION = 0.20   # 20 % más lento en p50 se marca como regresión
+
+_filtro = ""
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    j = min(i + 1, len(ordenados) - 1)
+    return ordenados[i] + (ordenados[j] - ordenados[i]) * (k - i)
+
+
+def _resumen(nombre, tiempos_ns, pico_bytes, bloques):
+    tiempos_us = [t / 1000 for t in tiempos_ns]
+    return {
+        'caso': nombre,
+        'n': len(tiempos_us),
+        'p50_us': _percentil(tiempos_us, 50),
+        'p99_us': _percentil(tiempos_us, 99),
+        'media_us': statistics.fmean(tiempos_us),
+        'pico_kb': pico_bytes / 1024,
+        'bloques': bloques,
+    }
+
+
+def _medir_memoria(llamar):
+    """Pico de memoria y bloques asignados en una sola llamada."""
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    llamar()
+    _, pico = tracemalloc.get_traced_memory()
+    despues = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    bloques = sum(max(s.count_diff, 0) for s in despues.compare_to(antes, "filename"))
+    return pico, bloques
+
+
+def bench(nombre, fn, repeticiones, calentamiento=10):
+    """Mide una función síncrona sin argumentos."""
+    if _filtro not in nombre:
+        return None
+    for _ in range(calentamiento):
+        fn()
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter_ns()
+        fn()
+        tiempos.append(time.perf_counter_ns() - t0)
+    return _resumen(nombre, tiempos, *_medir_memoria(fn))
+
+
+def bench_async(nombre, loop, coro_fn, repeticiones, calentamiento=10, antes=None):
+    """Mide una corrutina dentro de `loop`. `antes` se llama fuera del tiempo medido."""
+    if _filtro not in nombre:
+        return None
+
+    async def una():
+        if antes is not None:
+            antes()
+        t0 = time.perf_counter_ns()
+        await coro_fn()
+        return time.perf_counter_ns() - t0
+
+    for _ in range(calentamiento):
+        loop.run_until_complete(una())
+    tiempos = [loop.run_until_complete(una()) for _ in range(repeticiones)]
+    return _resumen(nombre, tiempos, *_medir_memoria(lambda: loop.run_until_complete(una())))
+
+
+# --- Casos ---
+
+def casos_calculo(repeticiones):
+    from app.calculator import DivisaCalculator
+    from app.rate_tables import RateTables, rate_tables
+    from app.render import as_json, telegram, terminal_purchase
+
+    tasa_bcv, cruda, redondeada = 180.5, 254.3, 260
+    yield bench("RateTables (armado por juego de tasas)", lambda: RateTables(tasa_bcv, cruda, redondeada), repeticiones)
+
+    # Cálculo y presentación por separado, y la respuesta completa del bot
+    tablas = rate_tables(tasa_bcv, cruda, redondeada)
+    for monto in (1, 1_000, 1_000_000):
+        yield bench(f"purchase[monto={monto}]", lambda: tablas.purchase(monto * 2, monto), repeticiones)
+        yield bench(f"opportunity[monto={monto}]", lambda: tablas.opportunity(monto), repeticiones)
+        yield bench(f"conversion[monto={monto}]", lambda: tablas.conversion(monto), repeticiones)
+        compra = tablas.purchase(monto * 2, monto)
+        yield bench(f"render.telegram(compra)[monto={monto}]", lambda: telegram(compra), repeticiones)
+        yield bench(f"bot compra[monto={monto}]",
+                    lambda: telegram(tablas.purchase(monto * 2, monto)), repeticiones)
+        yield bench(f"bot oportunidad[monto={monto}]",
+                    lambda: telegram(tablas.opportunity(monto)), repeticiones)
+        yield bench(f"bot conversion[monto={monto}]",
+                    lambda: telegram(tablas.conversion(monto)), repeticiones)
+
+    compra = tablas.purchase(2_000, 1_000)
+    yield bench("render.terminal_purchase", lambda: terminal_purchase(compra), repeticiones)
+    yield bench("render.as_json(compra)", lambda: as_json(compra), repeticiones)
+
+    calculadora = DivisaCalculator()
+    yield bench("DivisaCalculator.get_exchange_rates_report", calculadora.get_exchange_rates_report, repeticiones)
+
+
+def casos_grilla(repeticiones):
+    import numpy as np
+
+    from app.scenarios import opportunity_grid, purchase_grid, rate_ladder
+
+    for tasas in (6, 100, 1_000, 10_000):
+        for montos in (1, 100):
+            escalera = rate_ladder(260, paso=10 * 6 / tasas, pasos=tasas)
+            costos = np.linspace(10, 1_000, montos)
+            yield bench(f"purchase_grid[tasas={tasas},montos={montos}]",
+                        lambda: purchase_grid(escalera, costos, costos / 2, 180.5), max(repeticiones // 10, 20))
+            yield bench(f"opportunity_grid[tasas={tasas},montos={montos}]",
+                        lambda: opportunity_grid(escalera, costos, 260, 180.5), max(repeticiones // 10, 20))
+
+
+def casos_handler(repeticiones):
+    from app import api_data
+    from app.inline import answer_cache
+    from app.notifier import ANALISIS_COMPRA, CAMBIO_DIVISAS, COSTO_OPORTUNIDAD, inline_query, message_handler
+    from app.state import get_state_store
+
+    bot = FakeBot()
+    estados = get_state_store()
+    loop = asyncio.new_event_loop()
+
+    entradas = {
+        ANALISIS_COMPRA: "300 150",
+        COSTO_OPORTUNIDAD: "300",
+        CAMBIO_DIVISAS: "50",
+    }
+    try:
+        for cache in (True, False):
+            for estado, texto in entradas.items():
+                def ronda(estado=estado, texto=texto):
+                    estados.put(1, {'state': estado})
+                    return message_handler(FakeUpdate(bot, 1, text=texto), FakeContext(bot))
+
+                etiqueta = "cache" if cache else "sin_cache"
+                yield bench_async(
+                    f"message_handler[estado={estado},{etiqueta}]", loop, ronda,
+                    repeticiones if cache else max(repeticiones // 10, 20),
+                    antes=None if cache else api_data.rate_cache.invalidate,
+                )
+                bot.enviados.clear()
+
+        # Inline: un monto popular (siempre en caché) frente a montos distintos cada vez
+        montos = iter(range(1, 10 ** 9))
+        for etiqueta, consulta in (("popular", lambda: "150"), ("nuevo", lambda: str(next(montos)))):
+            yield bench_async(
+                f"inline_query[{etiqueta}]", loop,
+                lambda consulta=consulta: inline_query(FakeUpdate(bot, 1, inline_query=consulta()), FakeContext(bot)),
+                repeticiones,
+            )
+            bot.enviados.clear()
+        print(f"Caché inline: {answer_cache.hits} aciertos, {answer_cache.misses} fallos", file=sys.stderr)
+    finally:
+        loop.run_until_complete(api_data.close_http_client())
+        loop.close()
+
+
+# --- Líneas base ---
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def guardar_baseline(nombre, resultados):
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    ruta = os.path.join(BASELINES_DIR, f"{nombre}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({'commit': _commit(), 'python': sys.version.split()[0], 'resultados': resultados}, f, indent=2)
+    return ruta
+
+
+def comparar_baseline(nombre, resultados):
+    with open(os.path.join(BASELINES_DIR, f"{nombre}.json"), encoding="utf-8") as f:
+        base = {r['caso']: r for r in json.load(f)['resultados']}
+    regresiones = 0
+    print(f"\n{'Caso':<58} | {'p50 base':>10} | {'p50 hoy':>10} | {'Cambio':>8}")
+    print("-" * 96)
+    for r in resultados:
+        anterior = base.get(r['caso'])
+        if anterior is None:
+            continue
+        cambio = r['p50_us'] / anterior['p50_us'] - 1
+        marca = "  ⚠" if cambio > UMBRAL_REGRESION else ""
+        regresiones += cambio > UMBRAL_REGRESION
+        print(f"{r['caso']:<58} | {anterior['p50_us']:>10.1f} | {r['p50_us']:>10.1f} | {cambio:>+8.1%}{marca}")
+    return regresiones
+
+
+def imprimir(resultados):
+    print(f"{'Caso':<58} | {'p50 (µs)':>10} | {'p99 (µs)':>10} | {'Pico (KB)':>10} | {'Bloques':>8}")
+    print("-" * 106)
+    for r in resultados:
+        print(f"{r['caso']:<58} | {r['p50_us']:>10.1f} | {r['p99_us']:>10.1f} | {r['pico_kb']:>10.1f} | {r['bloques']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de cálculo y de respuesta del bot.")
+    parser.add_argument("--repeticiones", type=int, default=1000)
+    parser.add_argument("--filtro", default="", help="solo correr casos cuyo nombre contenga este texto")
+    parser.add_argument("--guardar", metavar="NOMBRE", help="guardar resultados como línea base")
+    parser.add_argument("--comparar", metavar="NOMBRE", help="comparar contra una línea base guardada")
+    args = parser.parse_args(argv)
+
+    global _filtro
+    _filtro = args.filtro
+
+    # El historial, los estados y la instantánea de los benchmarks no deben ir a los archivos reales
+    from app import history, snapshot, state
+    temporal = tempfile.mkdtemp(prefix="bench-")
+    history.HISTORY_DB = os.path.join(temporal, "historial.db")
+    state.STATE_DB = os.path.join(temporal, "estados.db")
+    snapshot.SNAPSHOT_FILE = os.path.join(temporal, "ultima_tasa.json")
+
+    resultados = []
+    with StubRateServer() as stub:
+        from app import api_data
+        from app.providers import DolarApiProvider
+        api_data.configure_providers([DolarApiProvider(url=stub.url)])
+
+        for grupo in (casos_calculo(args.repeticiones), casos_grilla(args.repeticiones), casos_handler(args.repeticiones)):
+            resultados.extend(r for r in grupo if r is not None)
+
+    imprimir(resultados)
+    if args.guardar:
+        print(f"\nLínea base guardada en {guardar_baseline(args.guardar, resultados)}")
+    if args.comparar:
+        regresiones = comparar_baseline(args.comparar, resultados)
+        if regresiones:
+            print(f"\n{regresiones} caso(s) más de {UMBRAL_REGRESION:.0%} más lentos que la línea base.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# tests/test_admission.py
+"""Control de admisión (app/admission.py) con un reloj controlado por la prueba."""
+import unittest
+
+from app.admission import AVISO_LIMITE_USUARIO, AVISO_SOBRECARGA, AdmissionControl
+
+
+class Reloj:
+
+    def __init__(self, ahora=1000.0):
+        self.ahora = ahora
+
+    def __call__(self):
+        return self.ahora
+
+    def avanzar(self, segundos):
+        self.ahora += segundos
+
+
+class AdmissionControlTest(unittest.TestCase):
+
+    def setUp(self):
+        self.reloj = Reloj()
+
+    def _control(self, **opciones):
+        return AdmissionControl(reloj=self.reloj, **opciones)
+
+    def test_balde_por_usuario_se_agota_y_se_rellena(self):
+        control = self._control(rafaga_usuario=3, ritmo_usuario=1.0)
+        for _ in range(3):
+            ticket, _ = control.arrive(1)
+            control.done(ticket)
+        self.assertEqual(control.arrive(1), (None, AVISO_LIMITE_USUARIO))
+        # Otro usuario tiene su propio balde
+        self.assertIsNotNone(control.arrive(2)[0])
+
+        self.reloj.avanzar(1.0)
+        self.assertIsNotNone(control.arrive(1)[0])
+        self.assertIsNone(control.arrive(1)[0])
+
+    def test_cola_llena_rechaza_hasta_que_algo_termina(self):
+        control = self._control(max_pendientes=2)
+        primero, _ = control.arrive(1)
+        control.arrive(2)
+        self.assertEqual(control.arrive(3), (None, AVISO_SOBRECARGA))
+        self.assertEqual(control.pendientes, 2)
+
+        control.done(primero)
+        self.assertIsNotNone(control.arrive(3)[0])
+
+    def test_coalescencia_dentro_de_la_ventana(self):
+        control = self._control(ventana=2.0)
+        viejo, _ = control.arrive(1)
+        self.reloj.avanzar(1.5)
+        nuevo, _ = control.arrive(1)
+        self.assertTrue(control.superseded(viejo))
+        self.assertFalse(control.superseded(nuevo))
+
+        control.done(viejo)
+        control.done(nuevo)
+        self.assertEqual(control.pendientes, 0)
+
+    def test_sin_coalescencia_fuera_de_la_ventana(self):
+        control = self._control(ventana=2.0)
+        viejo, _ = control.arrive(1)
+        self.reloj.avanzar(2.5)
+        control.arrive(1)
+        self.assertFalse(control.superseded(viejo))
+
+    def test_un_aviso_de_rechazo_cada_intervalo(self):
+        control = self._control(rafaga_usuario=1, ritmo_usuario=0.01, aviso_intervalo=10.0)
+        control.arrive(1)
+        self.assertEqual(control.arrive(1), (None, AVISO_LIMITE_USUARIO))
+        self.reloj.avanzar(5.0)
+        self.assertEqual(control.arrive(1), (None, None))
+        self.reloj.avanzar(5.0)
+        self.assertEqual(control.arrive(1), (None, AVISO_LIMITE_USUARIO))
+
+    def test_balde_global(self):
+        control = self._control(rafaga_global=2, ritmo_global=1.0)
+        self.assertIsNotNone(control.arrive(1)[0])
+        self.assertIsNotNone(control.arrive(2)[0])
+        self.assertEqual(control.arrive(3), (None, AVISO_SOBRECARGA))
+        self.reloj.avanzar(1.0)
+        self.assertIsNotNone(control.arrive(3)[0])
+
+    def test_balde_global_sin_ritmo(self):
+        with self.assertRaises(ValueError):
+            self._control(rafaga_global=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# tests/test_alerts.py
+"""Umbrales, histéresis y cooldown de las alertas (app/alerts.py) con marcas de tiempo fijas."""
+import unittest
+
+from app.alerts import ALERTA_COOLDOWN, HISTERESIS_IAC, RateWatcher, evaluar_chat
+from app.subscriptions import SubscriptionRegistry
+
+AHORA = 1_700_000_000
+BCV = 36.0
+
+
+def _prefs(alertas, ref=40.0, arriba=False, **extra):
+    return {'alertas': alertas, 'ref_paralelo': ref, 'iac_arriba': arriba, **extra}
+
+
+class EvaluarChatTest(unittest.TestCase):
+
+    def test_primera_lectura_fija_la_referencia_sin_avisar(self):
+        motivos, cambios = evaluar_chat({'alertas': {'iac': 10}}, BCV, 40.0, AHORA)
+        self.assertEqual(motivos, [])
+        self.assertEqual(cambios, {'ref_paralelo': 40.0, 'iac_arriba': True})
+
+    def test_umbral_bs(self):
+        self.assertEqual(evaluar_chat(_prefs({'bs': 5}), BCV, 44.9, AHORA), ([], {}))
+        motivos, cambios = evaluar_chat(_prefs({'bs': 5}), BCV, 35.0, AHORA)
+        self.assertEqual(len(motivos), 1)
+        self.assertIn("-5.00 Bs/USD", motivos[0])
+        self.assertEqual(cambios, {'ref_paralelo': 35.0, 'iac_arriba': False, 'ultima_alerta': AHORA})
+
+    def test_umbral_pct(self):
+        self.assertEqual(evaluar_chat(_prefs({'pct': 1.0}), BCV, 40.3, AHORA), ([], {}))
+        motivos, _ = evaluar_chat(_prefs({'pct': 1.0}), BCV, 40.5, AHORA)
+        self.assertIn("+1.25%", motivos[0])
+
+    def test_iac_se_rearma_con_histeresis(self):
+        umbral = 10.0
+        # IAC 11.1%: cruza hacia arriba
+        motivos, cambios = evaluar_chat(_prefs({'iac': umbral}, arriba=False), BCV, 40.0, AHORA)
+        self.assertIn("subió", motivos[0])
+        self.assertTrue(cambios['iac_arriba'])
+
+        # Ya arriba: seguir arriba no avisa otra vez
+        self.assertEqual(evaluar_chat(_prefs({'iac': umbral}, arriba=True), BCV, 40.1, AHORA), ([], {}))
+
+        # Por debajo del umbral pero dentro de la histéresis: sin aviso ni rearme
+        dentro = BCV * (1 + (umbral - HISTERESIS_IAC / 2) / 100)
+        self.assertEqual(evaluar_chat(_prefs({'iac': umbral}, arriba=True), BCV, dentro, AHORA), ([], {}))
+
+        # Más allá de la histéresis: avisa la bajada y se rearma
+        fuera = BCV * (1 + (umbral - HISTERESIS_IAC - 0.1) / 100)
+        motivos, cambios = evaluar_chat(_prefs({'iac': umbral}, arriba=True), BCV, fuera, AHORA)
+        self.assertIn("bajó", motivos[0])
+        self.assertFalse(cambios['iac_arriba'])
+
+    def test_cooldown_posterga_la_alerta(self):
+        prefs = _prefs({'bs': 1}, ultima_alerta=AHORA - ALERTA_COOLDOWN + 1)
+        self.assertEqual(evaluar_chat(prefs, BCV, 42.0, AHORA), (None, {}))
+        motivos, _ = evaluar_chat(prefs, BCV, 42.0, AHORA + 1)
+        self.assertTrue(motivos)
+
+
+class RateWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registro = SubscriptionRegistry(":memory:")
+        self.addCleanup(self.registro.close)
+        self.registro.add(1)
+        self.registro.update(1, alertas={'bs': 1})
+        self.watcher = RateWatcher(self.registro)
+
+    def test_avisa_y_mueve_la_referencia(self):
+        self.assertEqual(self.watcher.check(BCV, 40.0, AHORA), [])
+        self.assertEqual(self.registro.get(1)['ref_paralelo'], 40.0)
+
+        avisos = self.watcher.check(BCV, 41.5, AHORA + 60)
+        self.assertEqual([chat_id for chat_id, _ in avisos], [1])
+        prefs = self.registro.get(1)
+        self.assertEqual((prefs['ref_paralelo'], prefs['ultima_alerta']), (41.5, AHORA + 60))
+
+    def test_pendiente_por_cooldown_se_avisa_despues(self):
+        self.watcher.check(BCV, 40.0, AHORA)
+        self.watcher.check(BCV, 41.5, AHORA + 60)
+
+        # Otro movimiento dentro del cooldown queda pendiente
+        self.assertEqual(self.watcher.check(BCV, 43.0, AHORA + 120), [])
+        # Las mismas tasas después del cooldown: se reevalúa solo al pendiente
+        avisos = self.watcher.check(BCV, 43.0, AHORA + 60 + ALERTA_COOLDOWN)
+        self.assertEqual([chat_id for chat_id, _ in avisos], [1])
+
+    def test_movimiento_revertido_no_avisa(self):
+        self.watcher.check(BCV, 40.0, AHORA)
+        self.watcher.check(BCV, 41.5, AHORA + 60)
+        self.assertEqual(self.watcher.check(BCV, 43.0, AHORA + 120), [])
+
+        # Al terminar el cooldown el paralelo ya volvió cerca de la referencia: se descarta
+        self.assertEqual(self.watcher.check(BCV, 41.6, AHORA + 60 + ALERTA_COOLDOWN), [])
+        self.assertEqual(self.watcher.check(BCV, 41.6, AHORA + 60 + 2 * ALERTA_COOLDOWN), [])
+        self.assertEqual(self.registro.get(1)['ref_paralelo'], 41.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# tests/test_analytics.py
+"""Estadísticas móviles (app/analytics.py) cargadas desde un historial en memoria."""
+import unittest
+
+from app.analytics import RateAnalytics
+from app.history import RateHistory
+
+AHORA = 1_700_000_000
+
+
+class RateAnalyticsLoadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.history = RateHistory(":memory:")
+        self.addCleanup(self.history.close)
+
+    def test_load_trae_solo_lo_nuevo(self):
+        self.history.record(36.0, 40.0, ts=AHORA - 120)
+        self.history.record(36.0, 41.0, ts=AHORA - 60)
+        analytics = RateAnalytics()
+        analytics.load(self.history, ahora=AHORA)
+        self.assertEqual(analytics.summary()['paralelo']['24h']['n'], 2)
+
+        # Otro proceso guardó una consulta nueva; la vieja que ya se vio no se repite
+        self.history.record(36.0, 42.0, ts=AHORA)
+        analytics.load(self.history, ahora=AHORA)
+        analytics.load(self.history, ahora=AHORA)
+        resumen = analytics.summary()['paralelo']
+        self.assertEqual(resumen['24h']['n'], 3)
+        self.assertEqual((resumen['ultimo'], resumen['24h']['min'], resumen['24h']['max']), (42.0, 40.0, 42.0))
+
+    def test_load_tras_una_consulta_propia(self):
+        analytics = RateAnalytics()
+        analytics.update(36.0, 40.0, ts=AHORA + 0.5)
+        self.history.record(36.0, 40.0, ts=AHORA)
+        analytics.load(self.history, ahora=AHORA + 1)
+        self.assertEqual(analytics.summary()['paralelo']['24h']['n'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
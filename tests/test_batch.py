@@ -0,0 +1,53 @@
+# tests/test_batch.py
+"""Modo por lotes (app/batch.py) con tasas fijas, sin consultar la API."""
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import unittest
+
+from app import batch
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.entrada = os.path.join(temporal.name, "precios.jsonl")
+        self.salida = os.path.join(temporal.name, "salida.csv")
+
+    def _correr(self, lineas):
+        with open(self.entrada, "w", encoding="utf-8") as f:
+            f.write("\n".join(lineas) + "\n")
+        errores = io.StringIO()
+        with contextlib.redirect_stderr(errores):
+            codigo = batch.main([self.entrada, "-o", self.salida, "--tasas", "36.5", "40", "--chunk", "2"])
+        with open(self.salida, newline="", encoding="utf-8") as f:
+            filas = list(csv.DictReader(f))
+        return codigo, filas, errores.getvalue()
+
+    def test_lote_valido(self):
+        codigo, filas, _ = self._correr(['{"sku": "a", "precio_usd": 10}', '{"sku": "b", "precio_usd": 20}'])
+        self.assertEqual(codigo, 0)
+        self.assertEqual([fila["id"] for fila in filas], ["a", "b"])
+
+    def test_lineas_invalidas_se_omiten_sin_cortar_el_lote(self):
+        codigo, filas, errores = self._correr([
+            '{"sku": "a", "precio_usd": 10}',
+            '{"sku": "b", "precio_usd": 20}',
+            '{"sku": "c", "precio_',
+            '[1, 2]',
+            '',
+            '{"sku": "d", "precio_usd": 30}',
+        ])
+        self.assertEqual(codigo, 1)
+        self.assertEqual([fila["id"] for fila in filas], ["a", "b", "d"])
+        self.assertIn("Línea 3: JSON inválido", errores)
+        self.assertIn("Línea 4: no es un objeto JSON", errores)
+        self.assertIn("2 líneas inválidas omitidas", errores)
+
+
+if __name__ == "__main__":
+    unittest.main()
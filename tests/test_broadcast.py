@@ -0,0 +1,70 @@
+# tests/test_broadcast.py
+"""Errores por destinatario del Broadcaster (app/broadcast.py) con un bot falso."""
+import datetime
+import unittest
+from unittest import mock
+
+from telegram.error import BadRequest, ChatMigrated, Forbidden, RetryAfter
+
+from app import broadcast
+from app.broadcast import Broadcaster, RateLimiter
+
+
+class BotFalso:
+    """Registra los envíos; `fallas[chat_id]` es la lista de excepciones a lanzar, en orden."""
+
+    def __init__(self, fallas=None):
+        self.fallas = fallas or {}
+        self.enviados = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        pendientes = self.fallas.get(chat_id)
+        if pendientes:
+            raise pendientes.pop(0)
+        self.enviados.append(chat_id)
+
+
+class BroadcasterTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        parche = mock.patch.object(broadcast, "PER_CHAT_INTERVAL", 0.0)
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.bloqueados = []
+        self.migrados = {}
+
+    def _broadcaster(self, bot, limiter=None):
+        return Broadcaster(bot, limiter=limiter or RateLimiter(rate=1000),
+                           on_blocked=self.bloqueados.extend, on_migrated=self.migrados.update)
+
+    async def test_retry_after_pausa_y_reintenta(self):
+        limiter = RateLimiter(rate=1000)
+        bot = BotFalso({1: [RetryAfter(datetime.timedelta(0))]})
+        with mock.patch.object(limiter, "pause", wraps=limiter.pause) as pausa:
+            conteo = await self._broadcaster(bot, limiter).broadcast([1, 2], "hola")
+        pausa.assert_called_once_with(0.0)
+        self.assertEqual(conteo, {'ok': 2, 'bloqueado': 0, 'error': 0})
+        self.assertEqual(sorted(bot.enviados), [1, 2])
+
+    async def test_forbidden_se_informa_una_vez_al_terminar(self):
+        bot = BotFalso({1: [Forbidden("bot was blocked by the user")], 3: [Forbidden("kicked")]})
+        conteo = await self._broadcaster(bot).broadcast([1, 2, 3], "hola")
+        self.assertEqual(conteo, {'ok': 1, 'bloqueado': 2, 'error': 0})
+        self.assertEqual(sorted(self.bloqueados), [1, 3])
+
+    async def test_chat_migrado_se_reenvia_al_id_nuevo(self):
+        bot = BotFalso({-1: [ChatMigrated(-1001)]})
+        conteo = await self._broadcaster(bot).broadcast([-1], "hola")
+        self.assertEqual(conteo, {'ok': 1, 'bloqueado': 0, 'error': 0})
+        self.assertEqual(bot.enviados, [-1001])
+        self.assertEqual(self.migrados, {-1: -1001})
+
+    async def test_reintentos_agotados_y_bad_request_son_error(self):
+        bot = BotFalso({1: [RetryAfter(datetime.timedelta(0))] * broadcast.MAX_REINTENTOS, 2: [BadRequest("chat not found")]})
+        conteo = await self._broadcaster(bot).broadcast([1, 2, 3], "hola")
+        self.assertEqual(conteo, {'ok': 1, 'bloqueado': 0, 'error': 2})
+        self.assertEqual(self.bloqueados, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# tests/test_columnar.py
+"""Exportación columnar (app/columnar.py) en un directorio temporal."""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from app.columnar import ColumnarSeries, ColumnarWriter, _rutas, compact
+from app.history import RateHistory
+
+
+class ColumnarTest(unittest.TestCase):
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.directorio = os.path.join(temporal.name, "columnas")
+        self.escritor = ColumnarWriter(self.directorio)
+
+    def test_agregar_y_leer_rangos(self):
+        self.assertEqual(self.escritor.append("paralelo", [10, 20, 30], [40.0, 41.0, 42.0]), 3)
+        serie = ColumnarSeries("paralelo", self.directorio)
+        self.assertEqual(len(serie), 3)
+        ts, promedio = serie.range(15, 30)
+        self.assertEqual(ts.tolist(), [20, 30])
+        self.assertEqual(promedio.tolist(), [41.0, 42.0])
+        self.assertEqual(serie.at(25), (20, 41.0))
+        self.assertIsNone(serie.at(5))
+
+        # refresh() incorpora lo agregado después de abrir
+        self.escritor.append("paralelo", [40], [43.0])
+        self.assertEqual(serie.refresh(), 4)
+        self.assertEqual(serie.at(100), (40, 43.0))
+
+    def test_solo_se_agrega_despues_del_ultimo_ts(self):
+        self.escritor.append("paralelo", [10, 20], [40.0, 41.0])
+        for ts in ([20, 30], [5]):
+            with self.subTest(ts=ts), self.assertRaises(ValueError):
+                self.escritor.append("paralelo", ts, [1.0] * len(ts))
+        with self.assertRaises(ValueError):
+            self.escritor.append("paralelo", [40, 30], [1.0, 2.0])
+        with self.assertRaises(ValueError):
+            self.escritor.append("paralelo", [40], [1.0, 2.0])
+        self.assertEqual(self.escritor.last_ts("paralelo"), 20)
+
+    def test_escritura_interrumpida_se_descarta(self):
+        self.escritor.append("paralelo", [10, 20], [40.0, 41.0])
+        ruta_ts, ruta_promedio, ruta_largo = _rutas(self.directorio, "paralelo")
+        # Una escritura que murió antes de confirmar .len deja bytes de más en las columnas
+        with open(ruta_ts, "ab") as f:
+            f.write(np.array([30, 40], dtype="<i8").tobytes()[:11])
+        with open(ruta_promedio, "ab") as f:
+            f.write(np.array([99.0], dtype="<f8").tobytes())
+
+        # El lector se guía por .len y no ve la fila a medias
+        self.assertEqual(ColumnarSeries("paralelo", self.directorio).ts.tolist(), [10, 20])
+
+        self.escritor.append("paralelo", [30], [42.0])
+        serie = ColumnarSeries("paralelo", self.directorio)
+        self.assertEqual(serie.ts.tolist(), [10, 20, 30])
+        self.assertEqual(serie.promedio.tolist(), [40.0, 41.0, 42.0])
+        self.assertEqual(os.path.getsize(ruta_ts), 3 * 8)
+        with open(ruta_largo, encoding="ascii") as f:
+            self.assertEqual(f.read(), "3")
+
+    def test_compact_exporta_solo_lo_nuevo(self):
+        history = RateHistory(":memory:")
+        self.addCleanup(history.close)
+        history.record(36.0, 40.0, ts=100)
+        history.record(36.5, 41.0, ts=200)
+        self.assertEqual(compact(history, self.directorio, hasta=1000), {'oficial': 2, 'paralelo': 2})
+
+        history.record(37.0, 42.0, ts=300)
+        self.assertEqual(compact(history, self.directorio, hasta=1000), {'oficial': 1, 'paralelo': 1})
+        self.assertEqual(compact(history, self.directorio, hasta=1000), {'oficial': 0, 'paralelo': 0})
+        self.assertEqual(ColumnarSeries("oficial", self.directorio).promedio.tolist(), [36.0, 36.5, 37.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
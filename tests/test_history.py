@@ -0,0 +1,61 @@
+# tests/test_history.py
+"""Historial de tasas (app/history.py) en una base temporal."""
+import os
+import tempfile
+import unittest
+
+from app.history import RateHistory
+
+DIA = 86400
+AHORA = 1_700_000_000 - 1_700_000_000 % 3600   # inicio de una hora
+
+
+class RateHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.history = RateHistory(os.path.join(temporal.name, "historial.db"))
+        self.addCleanup(self.history.close)
+
+    def test_rango_y_consulta_puntual(self):
+        for i, paralelo in enumerate((40.0, 41.0, 42.0)):
+            self.history.record(36.0, paralelo, ts=AHORA + i * 60)
+        # Repetir un momento no duplica la fila
+        self.history.record(36.0, 99.0, ts=AHORA)
+
+        self.assertEqual(self.history.range("paralelo", AHORA, AHORA + 60), [(AHORA, 40.0), (AHORA + 60, 41.0)])
+        self.assertEqual(self.history.at("paralelo", AHORA + 119), (AHORA + 60, 41.0))
+        self.assertIsNone(self.history.at("paralelo", AHORA - 1))
+        self.assertEqual(self.history.latest("oficial"), (AHORA + 120, 36.0))
+        resumen = self.history.summary("paralelo", AHORA, AHORA + 120)
+        self.assertEqual((resumen['consultas'], resumen['primera'], resumen['ultima']), (3, 40.0, 42.0))
+        self.assertEqual(resumen['promedio'], 41.0)
+
+    def test_retencion_borra_lo_viejo(self):
+        self.history.record(30.0, 35.0, ts=AHORA - 400 * DIA)
+        self.history.record(36.0, 40.0, ts=AHORA - 10 * DIA)
+        self.assertEqual(self.history.apply_retention(dias=365, ahora=AHORA), 2)
+        self.assertEqual(self.history.range("paralelo", 0, AHORA), [(AHORA - 10 * DIA, 40.0)])
+
+    def test_downsample_promedia_por_hora_lo_viejo(self):
+        vieja = AHORA - 10 * DIA
+        for minuto, paralelo in ((0, 40.0), (20, 41.0), (40, 45.0)):
+            self.history.record(36.0, paralelo, ts=vieja + minuto * 60)
+        self.history.record(36.0, 50.0, ts=vieja + 3600 + 60)
+        self.history.record(36.0, 60.0, ts=AHORA - DIA)
+
+        # Dos horas viejas por fuente
+        self.assertEqual(self.history.downsample(dias=7, intervalo=3600, ahora=AHORA), 4)
+        self.assertEqual(self.history.range("paralelo", 0, AHORA), [
+            (vieja, 42.0), (vieja + 3600, 50.0), (AHORA - DIA, 60.0),
+        ])
+        self.assertEqual(self.history.range("oficial", 0, vieja + 3600), [(vieja, 36.0), (vieja + 3600, 36.0)])
+
+        # Resumir de nuevo no cambia nada
+        self.history.downsample(dias=7, intervalo=3600, ahora=AHORA)
+        self.assertEqual(len(self.history.range("paralelo", 0, AHORA)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
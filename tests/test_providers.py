@@ -0,0 +1,33 @@
+# tests/test_providers.py
+"""Circuitos del agregador (app/providers.py) con proveedores locales."""
+import unittest
+
+from app.providers import BREAKER_FALLAS, ProviderError, RateAggregator, StaticProvider
+
+
+class AggregatorBreakerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_perdedor_lento_no_abre_su_circuito(self):
+        # "b" se lanza por hedging y respondería después de que cierre la gracia de "a"
+        a = StaticProvider("a", 36.5, 40.0, prioridad=0, latencia=0.07)
+        b = StaticProvider("b", 36.5, 40.0, prioridad=1, latencia=0.07)
+        agregador = RateAggregator([a, b], politica="priority", hedge_delay=0.05, gracia=0.01)
+        for _ in range(BREAKER_FALLAS + 1):
+            quote = await agregador.fetch(None)
+            self.assertEqual(quote.proveedor, "a")
+        self.assertEqual(b.llamadas, BREAKER_FALLAS + 1)
+        self.assertEqual(agregador.status(), {"a": "cerrado", "b": "cerrado"})
+
+    async def test_proveedor_colgado_abre_su_circuito(self):
+        colgado = StaticProvider("colgado", 36.5, 40.0, latencia=10.0)
+        agregador = RateAggregator([colgado], presupuesto=0.02)
+        for _ in range(BREAKER_FALLAS):
+            with self.assertRaises(ProviderError):
+                await agregador.fetch(None)
+        self.assertEqual(agregador.status(), {"colgado": "abierto"})
+        with self.assertRaisesRegex(ProviderError, "circuito abierto"):
+            await agregador.fetch(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+# tests/test_rate_cache.py
+"""Caché de tasas (app/api_data.py) con proveedores locales en lugar de la API."""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app import api_data, snapshot
+from app.providers import StaticProvider
+
+TASAS = (36.5, 40.0, 50)
+
+
+def _esperar(condicion, limite=2.0):
+    fin = time.monotonic() + limite
+    while not condicion() and time.monotonic() < fin:
+        time.sleep(0.01)
+    return condicion()
+
+
+class RateCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        # Sin historial, y la instantánea en un directorio temporal
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.instantanea = os.path.join(temporal.name, "ultima_tasa.json")
+        for parche in (mock.patch.object(api_data, "_persistir"),
+                       mock.patch.object(snapshot, "SNAPSHOT_FILE", self.instantanea),
+                       mock.patch.object(api_data, "_instantanea", None)):
+            parche.start()
+            self.addCleanup(parche.stop)
+        self.addCleanup(api_data.set_offline, False)
+        self.addCleanup(api_data.configure_providers, api_data.providers)
+        self.proveedor = StaticProvider("local", 36.5, 40.0, latencia=0.05)
+        api_data.configure_providers([self.proveedor])
+        self.cache = api_data.rate_cache
+        self.addCleanup(setattr, self.cache, "ttl", self.cache.ttl)
+        self.cache.hits = self.cache.misses = self.cache.refreshes = 0
+
+    def test_acierto_fresco_no_consulta(self):
+        self.assertEqual(api_data.get_exchange_rates(), TASAS)
+        self.assertEqual(api_data.get_exchange_rates(), TASAS)
+        self.assertEqual(self.proveedor.llamadas, 1)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5, 'refreshes': 0})
+
+    def test_sirve_lo_viejo_mientras_refresca_una_vez(self):
+        self.cache.ttl = 0.05
+        api_data.get_exchange_rates()
+        self.proveedor.tasa_mercado = 41.0
+        time.sleep(0.06)
+
+        inicio = time.perf_counter()
+        for _ in range(5):
+            self.assertEqual(api_data.get_exchange_rates(), TASAS)
+        self.assertLess(time.perf_counter() - inicio, self.proveedor.latencia)
+
+        self.assertTrue(_esperar(lambda: self.cache._valor == (36.5, 41.0, 50)))
+        self.assertEqual(self.proveedor.llamadas, 2)
+
+    def test_fallos_concurrentes_comparten_una_consulta(self):
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(api_data.get_exchange_rates()))
+                 for _ in range(10)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(resultados, [TASAS] * 10)
+        self.assertEqual(self.proveedor.llamadas, 1)
+
+    def test_fallos_concurrentes_asincronos_comparten_una_consulta(self):
+        async def consultar():
+            try:
+                return await asyncio.gather(*(api_data.get_exchange_rates_async() for _ in range(10)))
+            finally:
+                await api_data.close_http_client()
+
+        self.assertEqual(asyncio.run(consultar()), [TASAS] * 10)
+        self.assertEqual(self.proveedor.llamadas, 1)
+        self.assertEqual(self.cache.misses, 10)
+
+    def test_refresco_forzado_no_cuenta_como_fallo(self):
+        async def refrescar():
+            try:
+                return await api_data.refresh_exchange_rates_async()
+            finally:
+                await api_data.close_http_client()
+
+        api_data.get_exchange_rates()
+        self.assertEqual(asyncio.run(refrescar()), TASAS)
+        self.assertEqual(self.proveedor.llamadas, 2)
+        self.assertEqual(self.cache.stats(), {'hits': 0, 'misses': 1, 'hit_ratio': 0.0, 'refreshes': 1})
+
+    def test_consulta_fallida_no_se_guarda(self):
+        self.proveedor.tasa_bcv = 0
+        with mock.patch.object(api_data, "RETRY_BACKOFF", 0):
+            self.assertEqual(api_data.get_exchange_rates(), (None, None, None))
+        self.assertIsNone(api_data.rates_age())
+
+    def test_consulta_fallida_usa_la_ultima_instantanea(self):
+        snapshot.save_snapshot(35.0, 39.0, 40, ts=time.time() - 3600)
+        self.proveedor.tasa_bcv = 0
+        with mock.patch.object(api_data, "RETRY_BACKOFF", 0):
+            self.assertEqual(api_data.get_exchange_rates(), (35.0, 39.0, 40))
+
+            async def consultar():
+                try:
+                    return await api_data.get_exchange_rates_async()
+                finally:
+                    await api_data.close_http_client()
+
+            self.assertEqual(asyncio.run(consultar()), (35.0, 39.0, 40))
+        self.assertGreaterEqual(api_data.rates_age(), 3600)
+        self.assertIn("hace", api_data.describe_staleness())
+
+    def test_sin_conexion_lee_la_instantanea_una_vez(self):
+        snapshot.save_snapshot(35.0, 39.0, 40)
+        with mock.patch.object(api_data, "load_snapshot", wraps=snapshot.load_snapshot) as leer:
+            api_data.set_offline()
+            for _ in range(3):
+                self.assertEqual(api_data.get_exchange_rates(), (35.0, 39.0, 40))
+        self.assertEqual(leer.call_count, 1)
+        self.assertEqual(self.proveedor.llamadas, 0)
+
+    def test_seed_se_sirve_y_se_reemplaza(self):
+        self.cache.seed((35.0, 39.0, 40), time.time() - 3600)
+        self.assertEqual(api_data.get_exchange_rates(), (35.0, 39.0, 40))
+        self.assertGreaterEqual(api_data.rates_age(), 3600)
+
+        # La primera llamada dispara el refresco; la semilla queda hasta que sale bien
+        self.assertTrue(_esperar(lambda: self.cache._valor == TASAS))
+        self.assertLess(api_data.rates_age(), 60)
+        self.assertEqual(self.proveedor.llamadas, 1)
+
+        # Una semilla no pisa una consulta real
+        self.cache.seed((35.0, 39.0, 40), time.time())
+        self.assertEqual(api_data.get_exchange_rates(), TASAS)
+
+
+if __name__ == "__main__":
+    unittest.main()
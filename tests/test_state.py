@@ -0,0 +1,61 @@
+# tests/test_state.py
+"""Almacenes de estado de conversación (app/state.py) en archivos temporales."""
+import os
+import tempfile
+import time
+import unittest
+
+from app.state import DbmStateStore, SQLiteStateStore
+
+
+class StateStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temporal.cleanup)
+
+    def _almacenes(self):
+        return (
+            ("sqlite", lambda: SQLiteStateStore(os.path.join(self.temporal.name, "estados.db"))),
+            ("dbm", lambda: DbmStateStore(os.path.join(self.temporal.name, "estados.dbm"))),
+        )
+
+    def test_sobrevive_a_reinicios(self):
+        for nombre, abrir in self._almacenes():
+            with self.subTest(backend=nombre):
+                almacen = abrir()
+                almacen.put(42, {'state': 1})
+                almacen.put(43, {'state': 2})
+                almacen.delete(43)
+                almacen.close()
+
+                almacen = abrir()
+                self.assertEqual(almacen.get(42), {'state': 1})
+                self.assertEqual(almacen.get(43), {})
+                almacen.close()
+
+    def test_purge_borra_los_caducados(self):
+        for nombre, abrir in self._almacenes():
+            with self.subTest(backend=nombre):
+                almacen = abrir()
+                self.addCleanup(almacen.close)
+                almacen.put(42, {'state': 1})
+                self.assertEqual(almacen.purge(ttl=3600), 0)
+                self.assertEqual(almacen.purge(ttl=0, ahora=2e9), 1)
+                self.assertEqual(almacen.get(42), {})
+
+    def test_purge_usa_el_ttl_del_almacen(self):
+        for nombre, abrir in (
+            ("sqlite", lambda: SQLiteStateStore(os.path.join(self.temporal.name, "corto.db"), ttl=60)),
+            ("dbm", lambda: DbmStateStore(os.path.join(self.temporal.name, "corto.dbm"), ttl=60)),
+        ):
+            with self.subTest(backend=nombre):
+                almacen = abrir()
+                self.addCleanup(almacen.close)
+                almacen.put(42, {'state': 1})
+                self.assertEqual(almacen.purge(ahora=time.time() + 30), 0)
+                self.assertEqual(almacen.purge(ahora=time.time() + 120), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
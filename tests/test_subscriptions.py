@@ -0,0 +1,44 @@
+# tests/test_subscriptions.py
+"""Registro de suscriptores (app/subscriptions.py) en una base temporal."""
+import os
+import tempfile
+import unittest
+
+from app.subscriptions import SubscriptionRegistry
+
+
+class SubscriptionRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.db = os.path.join(temporal.name, "suscriptores.db")
+
+    def _abrir(self):
+        registro = SubscriptionRegistry(self.db)
+        self.addCleanup(registro.close)
+        return registro
+
+    def test_seed_solo_en_el_primer_arranque(self):
+        registro = self._abrir()
+        registro.seed(99)
+        self.assertEqual(registro.chat_ids(), [99])
+        registro.remove(99)
+        registro.close()
+
+        # Ya existía la base: quien se desuscribió no vuelve a quedar suscrito
+        registro = self._abrir()
+        registro.seed(99)
+        self.assertEqual(registro.chat_ids(), [])
+
+    def test_migrar_conserva_las_preferencias(self):
+        registro = self._abrir()
+        registro.add(-1)
+        registro.update(-1, alertas={'bs': 2})
+        self.assertEqual(registro.migrate({-1: -1001, -2: -1002}), 1)
+        self.assertIsNone(registro.get(-1))
+        self.assertEqual(registro.get(-1001), {'alertas': {'bs': 2}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+# tests/test_webhook.py
+"""Respuestas del endpoint del webhook (app/webhook.py) sin levantar el bot."""
+import asyncio
+import unittest
+from unittest import mock
+
+from aiohttp.test_utils import TestClient, TestServer
+from telegram.ext import ApplicationBuilder, ExtBot, MessageHandler, filters
+
+from app.sharding import PerUserUpdateProcessor
+from app.webhook import HEADER_SECRETO, WebhookServer
+
+SECRETO = "secreto-de-prueba"
+RUTA = "/telegram"
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 10, "date": 1700000000, "text": "100",
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Ana"},
+    },
+}
+
+
+class WebhookHandleTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        aplicacion = ApplicationBuilder().token("123:ABC").updater(None).build()
+        self.servidor = WebhookServer(aplicacion, SECRETO, ruta=RUTA, cola_maxima=1, peers=[])
+        self.cliente = TestClient(TestServer(self.servidor.make_app()))
+        await self.cliente.start_server()
+
+    async def asyncTearDown(self):
+        await self.cliente.close()
+
+    async def _post(self, secreto=SECRETO, **kwargs):
+        async with self.cliente.post(RUTA, headers={HEADER_SECRETO: secreto}, **kwargs) as respuesta:
+            return respuesta.status
+
+    async def test_secreto_incorrecto_403(self):
+        self.assertEqual(await self._post(secreto="otro", json=UPDATE), 403)
+        self.assertEqual(self.servidor.cola.qsize(), 0)
+
+    async def test_sin_secreto_403(self):
+        async with self.cliente.post(RUTA, json=UPDATE) as respuesta:
+            self.assertEqual(respuesta.status, 403)
+
+    async def test_cuerpo_invalido_400(self):
+        cuerpos = ["no es json", "[1, 2]", '"x"', "5", "null", '{"update_id": 1, "message": 5}']
+        for cuerpo in cuerpos:
+            with self.subTest(cuerpo=cuerpo):
+                self.assertEqual(await self._post(data=cuerpo), 400)
+        self.assertEqual(self.servidor.cola.qsize(), 0)
+
+    async def test_update_valido_200(self):
+        self.assertEqual(await self._post(json=UPDATE), 200)
+        update = self.servidor.cola.get_nowait()
+        self.assertEqual(update.update_id, 1)
+        self.assertEqual(update.effective_user.id, 42)
+
+    async def test_cola_llena_503(self):
+        self.assertEqual(await self._post(json=UPDATE), 200)
+        self.assertEqual(await self._post(json=dict(UPDATE, update_id=2)), 503)
+        self.assertEqual(self.servidor.cola.qsize(), 1)
+
+    async def test_healthz(self):
+        async with self.cliente.get("/healthz") as respuesta:
+            self.assertEqual(respuesta.status, 200)
+            self.assertEqual(await respuesta.json(), {'pendientes': 0, 'en_proceso': 0})
+
+
+def _update(update_id, user_id):
+    mensaje = dict(UPDATE["message"], chat={"id": user_id, "type": "private"},
+                   **{"from": {"id": user_id, "is_bot": False, "first_name": "Ana"}})
+    return {"update_id": update_id, "message": mensaje}
+
+
+class WebhookDespachoTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_usuario_bloqueado_no_frena_a_los_demas(self):
+        liberar = asyncio.Event()
+        atendidos = []
+
+        async def handler(update, context):
+            if update.effective_user.id == 1:
+                await liberar.wait()
+            atendidos.append(update.update_id)
+
+        procesador = PerUserUpdateProcessor(max_concurrent_updates=4, max_en_proceso=64)
+        aplicacion = ApplicationBuilder().token("123:ABC").updater(None).concurrent_updates(procesador).build()
+        aplicacion.add_handler(MessageHandler(filters.TEXT, handler))
+        # Sin red: el bot no consulta getMe al inicializarse
+        with mock.patch.object(ExtBot, "initialize", mock.AsyncMock()):
+            await aplicacion.initialize()
+        servidor = WebhookServer(aplicacion, SECRETO, ruta=RUTA, peers=[])
+        cliente = TestClient(TestServer(servidor.make_app()))
+        await cliente.start_server()
+        despachador = asyncio.create_task(servidor._despachar())
+        try:
+            # Muchos más updates del usuario 1 que lugares de atención, y después uno del usuario 2
+            for update_id in range(40):
+                async with cliente.post(RUTA, json=_update(update_id, 1), headers={HEADER_SECRETO: SECRETO}):
+                    pass
+            async with cliente.post(RUTA, json=_update(100, 2), headers={HEADER_SECRETO: SECRETO}):
+                pass
+            for _ in range(100):
+                if atendidos:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(atendidos, [100])
+
+            liberar.set()
+            await asyncio.wait_for(servidor.cola.join(), 5)
+            self.assertEqual(atendidos[1:], list(range(40)))
+        finally:
+            despachador.cancel()
+            await cliente.close()
+
+
+if __name__ == "__main__":
+    unittest.main()